@@ -0,0 +1,276 @@
+"""
+Headless benchmarks for decode, resize, scan, move and undo throughput.
+
+Builds synthetic corpora in a scratch directory, times the hot paths of the
+application and writes the results as JSON so runs can be compared:
+
+    python benchmarks/benchmark.py --output results.json
+    python benchmarks/benchmark.py --quick
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, os.path.abspath(SRC_DIR))
+
+import numpy as np
+from PIL import Image
+
+# Preview size used by show_image in the default 800x600 window
+PREVIEW_SIZE = (640, 480)
+
+def make_photo(width, height, seed=0):
+    """Create a photo-like test image: smooth gradients plus sensor noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    noise = rng.integers(-12, 12, (height, width, 3))
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+def write_synthetic_dng(path, width, height, seed=0):
+    """
+    Write a minimal uncompressed Bayer DNG that LibRaw can demosaic
+    Args:
+        path: Output file path
+        width: Sensor width in pixels
+        height: Sensor height in pixels
+        seed: Noise seed
+    """
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 4096, (height, width), dtype=np.uint16).tobytes()
+
+    # (tag, type, values); types: 1 BYTE, 2 ASCII, 3 SHORT, 4 LONG, 5 RATIONAL, 10 SRATIONAL
+    entries = sorted([
+        (254, 4, [0]), (256, 4, [width]), (257, 4, [height]), (258, 3, [16]), (259, 3, [1]),
+        (262, 3, [32803]), (271, 2, b"Sortify\0"), (272, 2, b"Synthetic DNG\0"), (273, 4, [0]),
+        (277, 3, [1]), (278, 4, [height]), (279, 4, [len(pixels)]), (284, 3, [1]),
+        (33421, 3, [2, 2]), (33422, 1, [0, 1, 1, 2]), (50706, 1, [1, 4, 0, 0]),
+        (50708, 2, b"Sortify Synthetic\0"),
+        (50721, 10, [1, 1, 0, 1, 0, 1, 0, 1, 1, 1, 0, 1, 0, 1, 0, 1, 1, 1]),
+        (50728, 5, [1, 1, 1, 1, 1, 1]),
+    ])
+    formats = {1: "B", 3: "H", 4: "I", 5: "I", 10: "i"}
+
+    extra_offset = 8 + 2 + len(entries) * 12 + 4
+    extra = b""
+    records = []
+    for tag, tag_type, values in entries:
+        payload = values if tag_type == 2 else struct.pack(f"<{len(values)}{formats[tag_type]}", *values)
+        count = len(values) // 2 if tag_type in (5, 10) else len(values)
+        if len(payload) <= 4:
+            records.append((tag, tag_type, count, payload.ljust(4, b"\0")))
+        else:
+            records.append((tag, tag_type, count, struct.pack("<I", extra_offset + len(extra))))
+            extra += payload + b"\0" * (len(payload) % 2)
+    strip_offset = extra_offset + len(extra)
+
+    header = bytearray(b"II*\0" + struct.pack("<I", 8) + struct.pack("<H", len(entries)))
+    for tag, tag_type, count, value in records:
+        if tag == 273:
+            value = struct.pack("<I", strip_offset)
+        header += struct.pack("<HHI", tag, tag_type, count) + value
+    header += struct.pack("<I", 0)
+
+    with open(path, "wb") as dng:
+        dng.write(bytes(header) + extra + pixels)
+
+def build_image_corpus(root, scale):
+    """
+    Create one large file per format
+    Returns:
+        Dictionary of format name -> file path
+    """
+    width, height = int(6000 * scale), int(4000 * scale)
+    photo = make_photo(width, height)
+    corpus = {}
+
+    corpus['jpeg'] = os.path.join(root, "large.jpg")
+    photo.save(corpus['jpeg'], quality=92)
+
+    corpus['png'] = os.path.join(root, "large.png")
+    photo.save(corpus['png'])
+
+    try:
+        import pillow_heif
+        corpus['heic'] = os.path.join(root, "large.heic")
+        pillow_heif.from_pillow(photo).save(corpus['heic'], quality=90)
+    except Exception as e:
+        print(f"HEIC corpus skipped: {e}")
+
+    corpus['dng'] = os.path.join(root, "large.dng")
+    write_synthetic_dng(corpus['dng'], width, height)
+    return corpus
+
+def build_scan_folder(root, file_count):
+    """
+    Create a folder of non-image files with a single image sorted last by name
+    Returns:
+        Folder path
+    """
+    folder = os.path.join(root, "scan")
+    os.makedirs(folder)
+    for index in range(file_count):
+        open(os.path.join(folder, f"sidecar_{index:06d}.xmp"), "wb").close()
+    open(os.path.join(folder, "zzz_last.jpg"), "wb").close()
+    return folder
+
+def build_collision_corpus(root, file_count, existing):
+    """
+    Create source files that all share a few names plus a destination full of those names
+    Returns:
+        (list of source paths, destination folder)
+    """
+    destination = os.path.join(root, "collisions", "Category")
+    os.makedirs(destination)
+    names = [f"IMG_{index:04d}.jpg" for index in range(10)]
+    for name in names:
+        base, ext = os.path.splitext(name)
+        open(os.path.join(destination, name), "wb").close()
+        for counter in range(1, existing + 1):
+            open(os.path.join(destination, f"{base}_{counter}{ext}"), "wb").close()
+
+    sources = []
+    for index in range(file_count):
+        folder = os.path.join(root, "collisions", f"card_{index // len(names):05d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, names[index % len(names)])
+        open(path, "wb").close()
+        sources.append(path)
+    return sources, destination
+
+def measure(name, function, repeat, items=1, **params):
+    """
+    Time a function several times
+    Returns:
+        Result dictionary for the JSON report
+    """
+    timings = []
+    detail = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        detail = function()
+        timings.append(time.perf_counter() - start)
+    result = {
+        'name': name,
+        'params': params,
+        'runs': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'items': items,
+        'items_per_s': items / statistics.median(timings) if statistics.median(timings) > 0 else None
+    }
+    if isinstance(detail, dict):
+        result['detail'] = detail
+    print(f"{name:40s} median {result['median_s'] * 1000:9.2f} ms  {params}")
+    return result
+
+def bench_decode(corpus, repeat):
+    """Decode and resize benchmarks for every format"""
+    from image_loader import RAW_MODES, load_preview, load_raw_image, ensure_heif_support
+    ensure_heif_support()
+    results = []
+
+    def legacy_path(path):
+        # The original show_image path: full decode, then an in-place LANCZOS thumbnail
+        image = Image.open(path)
+        image.thumbnail(PREVIEW_SIZE, Image.LANCZOS)
+        return {'size': list(image.size)}
+
+    for name, path in corpus.items():
+        if name == 'dng':
+            for mode in RAW_MODES:
+                def raw(mode=mode):
+                    image = load_raw_image(path, mode, PREVIEW_SIZE)
+                    return {'decode_path': image.info['raw_decode_path'], 'size': list(image.size)}
+                results.append(measure("load_raw_image", raw, repeat, format=name, mode=mode))
+        else:
+            results.append(measure("open_thumbnail_legacy", lambda path=path: legacy_path(path), repeat, format=name))
+        results.append(measure("load_preview", lambda path=path: {'size': list(load_preview(path, PREVIEW_SIZE).size)},
+                               repeat, format=name))
+    return results
+
+def bench_scan(folder, file_count, repeat):
+    """Folder validation and full scan benchmarks"""
+    from utils import is_valid_folder, iter_images
+    return [
+        measure("is_valid_folder", lambda: {'valid': is_valid_folder(folder)}, repeat,
+                items=file_count + 1, files=file_count + 1),
+        measure("iter_images_full_scan", lambda: {'images': sum(1 for _ in iter_images(folder))}, repeat,
+                items=file_count + 1, files=file_count + 1),
+    ]
+
+def bench_move_and_undo(sources, destination, existing):
+    """Conflict-resolving moves into a crowded folder, then undo of all of them"""
+    from sorter import action_tracker, move_image
+
+    moved = []
+    def move_all():
+        for path in sources:
+            moved.append(move_image(path, destination))
+        return {'failed': moved.count(None)}
+
+    results = [measure("move_image_conflicts", move_all, 1, items=len(sources),
+                       files=len(sources), existing_suffixes=existing)]
+    results.append(measure("action_tracker_undo", lambda: {'undone': len(action_tracker.undo_last(len(sources)))},
+                           1, items=len(sources), files=len(sources)))
+    return results
+
+def main(argv=None):
+    """Build corpora, run every benchmark and write the JSON report"""
+    parser = argparse.ArgumentParser(description="SortifyV1 performance benchmarks")
+    parser.add_argument("--output", help="JSON report path (default: print only)")
+    parser.add_argument("--workdir", help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per decode/scan benchmark")
+    parser.add_argument("--scale", type=float, default=1.0, help="Image size relative to 6000x4000")
+    parser.add_argument("--files", type=int, default=20000, help="Files in the scan folder")
+    parser.add_argument("--moves", type=int, default=2000, help="Files moved in the conflict benchmark")
+    parser.add_argument("--existing", type=int, default=200, help="Existing _N copies of each name at the destination")
+    parser.add_argument("--quick", action="store_true", help="Small corpora for a fast smoke run")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.repeat, args.scale, args.files, args.moves, args.existing = 2, 0.25, 2000, 200, 20
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sortify-bench-")
+    # Keep the journal and preview cache of the benchmark away from the user's own
+    os.environ["SORTIFY_HOME"] = os.path.join(workdir, "home")
+
+    try:
+        print(f"Building corpora in {workdir}")
+        corpus = build_image_corpus(workdir, args.scale)
+        scan_folder = build_scan_folder(workdir, args.files)
+        sources, destination = build_collision_corpus(workdir, args.moves, args.existing)
+
+        results = bench_decode(corpus, args.repeat)
+        results += bench_scan(scan_folder, args.files, args.repeat)
+        results += bench_move_and_undo(sources, destination, args.existing)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pillow': Image.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+        'results': results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"Wrote {args.output}")
+    return report
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
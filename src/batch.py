@@ -0,0 +1,158 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from metadata import extract_metadata
+from metrics import metrics
+from sorter import move_image
+from transfer import DEFAULT_WORKERS
+from utils import iter_images
+
+# Characters that cannot appear in folder names on Windows
+INVALID_FOLDER_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+def safe_folder_name(name):
+    """
+    Make a metadata value usable as a category folder name
+    Args:
+        name: Raw category name
+    Returns:
+        Sanitized folder name
+    """
+    return INVALID_FOLDER_CHARS.sub("_", name).strip(" .") or "_"
+
+class DateRule:
+    """Sort by EXIF capture date, falling back to the file modification time"""
+    needs_metadata = True
+
+    def __init__(self, date_format="%Y-%m"):
+        self.date_format = date_format
+
+    def category(self, metadata):
+        return metadata['capture_time'].strftime(self.date_format)
+
+class CameraRule:
+    """Sort by camera make and model"""
+    needs_metadata = True
+
+    def __init__(self, unknown="Unknown Camera"):
+        self.unknown = unknown
+
+    def category(self, metadata):
+        return metadata['camera'] or self.unknown
+
+class ExtensionRule:
+    """Sort by file extension"""
+    needs_metadata = False
+
+    def category(self, metadata):
+        return metadata['extension'].lstrip(".").upper()
+
+class PatternRule:
+    """Sort by the first filename regex that matches"""
+    needs_metadata = False
+
+    def __init__(self, patterns, default=None):
+        """
+        Args:
+            patterns: Iterable of (regex, category) pairs, checked in order
+            default: Category for files no pattern matches, None to leave them in place
+        """
+        self.patterns = [(re.compile(pattern, re.IGNORECASE), category) for pattern, category in patterns]
+        self.default = default
+
+    def category(self, metadata):
+        filename = os.path.basename(metadata['path'])
+        for pattern, category in self.patterns:
+            if pattern.search(filename):
+                return category
+        return self.default
+
+class BatchSorter:
+    """Headless rule-based sorting of a whole folder"""
+    def __init__(self, folder_path, rule, recursive=False, workers=None, transfer_workers=DEFAULT_WORKERS,
+                 verify=False):
+        """
+        Args:
+            folder_path: Folder whose images are sorted into subfolders of it
+            rule: Rule object with needs_metadata and category(metadata)
+            recursive: Also sort images inside subfolders
+            workers: Metadata worker processes, defaults to the CPU count
+            transfer_workers: Files moved at the same time
+            verify: Checksum cross-device copies before removing the sources
+        """
+        self.folder_path = folder_path
+        self.rule = rule
+        self.recursive = recursive
+        self.workers = workers
+        self.transfer_workers = transfer_workers
+        self.verify = verify
+
+    def collect_metadata(self, paths):
+        """
+        Extract metadata for every path, in a process pool when the rule needs EXIF
+        Args:
+            paths: Absolute image paths
+        Returns:
+            List of metadata dictionaries in the same order
+        """
+        if not self.rule.needs_metadata:
+            return [{'path': path, 'extension': os.path.splitext(path)[1].lower()} for path in paths]
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(extract_metadata, paths, chunksize=32))
+
+    def plan(self):
+        """
+        Decide the destination of every image before anything is moved
+        Returns:
+            List of (source_path, destination_folder) pairs
+        """
+        with metrics.timer("scan"):
+            paths = [os.path.join(self.folder_path, relative_path)
+                     for relative_path in iter_images(self.folder_path, self.recursive)]
+
+        with metrics.timer("metadata"):
+            all_metadata = self.collect_metadata(paths)
+
+        moves = []
+        for metadata in all_metadata:
+            category = self.rule.category(metadata)
+            if category is None:
+                continue
+            destination_folder = os.path.join(self.folder_path, safe_folder_name(category))
+            # Already sorted files stay where they are
+            if os.path.dirname(metadata['path']) != destination_folder:
+                moves.append((metadata['path'], destination_folder))
+        return moves
+
+    def run(self, dry_run=False):
+        """
+        Plan and execute the sort
+        Args:
+            dry_run: Only plan, do not move anything
+        Returns:
+            Dictionary with the plan, moved/failed counts and timings
+        """
+        start = time.perf_counter()
+        moves = self.plan()
+        plan_seconds = time.perf_counter() - start
+
+        moved = failed = 0
+        start = time.perf_counter()
+        if not dry_run:
+            with ThreadPoolExecutor(max_workers=max(1, self.transfer_workers)) as executor:
+                for result in executor.map(lambda move: move_image(move[0], move[1], self.verify), moves):
+                    if result:
+                        moved += 1
+                    else:
+                        failed += 1
+        move_seconds = time.perf_counter() - start
+
+        return {
+            'plan': moves,
+            'moved': moved,
+            'failed': failed,
+            'plan_seconds': plan_seconds,
+            'move_seconds': move_seconds
+        }
\ No newline at end of file
@@ -0,0 +1,103 @@
+import argparse
+import logging
+import multiprocessing
+import os
+from batch import BatchSorter, CameraRule, DateRule, ExtensionRule, PatternRule
+from metrics import metrics
+from sorter import action_tracker
+from transfer import DEFAULT_WORKERS
+
+def parse_pattern(value):
+    """Split a REGEX=CATEGORY command line argument"""
+    pattern, separator, category = value.rpartition("=")
+    if not separator or not pattern or not category:
+        raise argparse.ArgumentTypeError(f"Expected REGEX=CATEGORY, got '{value}'")
+    return pattern, category
+
+def build_rule(args):
+    """Create the sorting rule selected on the command line"""
+    if args.by == "date":
+        return DateRule(args.date_format)
+    if args.by == "camera":
+        return CameraRule()
+    if args.by == "extension":
+        return ExtensionRule()
+    if not args.pattern:
+        raise SystemExit("--by pattern needs at least one --pattern REGEX=CATEGORY")
+    return PatternRule(args.pattern, args.default)
+
+def rate(count, seconds):
+    """Format a files-per-second figure"""
+    return f"{count / seconds:.1f} files/s" if seconds > 0 else "n/a"
+
+def undo(args):
+    """Undo recorded moves instead of sorting"""
+    if args.undo is not None:
+        undone = action_tracker.undo_last(args.undo)
+    else:
+        undone = action_tracker.undo_category(args.undo_category)
+    for action in undone:
+        print(f"{action['destination_path']} -> {action['original_path']}")
+    print(f"Undid {len(undone)} actions")
+    return 0
+
+def main(argv=None):
+    """Command line entry point for headless batch sorting"""
+    parser = argparse.ArgumentParser(prog="sortify", description="Sort a folder of images by rules, without the GUI")
+    parser.add_argument("folder", nargs="?", help="Folder containing the images to sort")
+    parser.add_argument("--by", choices=["date", "camera", "extension", "pattern"],
+                        help="Rule used to pick each image's category folder")
+    parser.add_argument("--date-format", default="%Y-%m", help="strftime format of date categories (default: %(default)s)")
+    parser.add_argument("--pattern", action="append", type=parse_pattern, default=[],
+                        help="REGEX=CATEGORY filename rule, may be repeated; the first match wins")
+    parser.add_argument("--default", help="Category for files no --pattern matches (default: leave in place)")
+    parser.add_argument("--recursive", action="store_true", help="Also sort images in subfolders")
+    parser.add_argument("--workers", type=int, help="Metadata worker processes (default: CPU count)")
+    parser.add_argument("--transfer-workers", type=int, default=DEFAULT_WORKERS,
+                        help="Files moved at the same time (default: %(default)s)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Checksum copies to another drive before deleting the originals")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without moving anything")
+    parser.add_argument("--metrics", help="Export per-stage timing percentiles to this .json or .csv file")
+    parser.add_argument("--quiet", action="store_true", help="Only report errors and the summary")
+    undo_group = parser.add_mutually_exclusive_group()
+    undo_group.add_argument("--undo", type=int, metavar="N", help="Undo the last N moves instead of sorting")
+    undo_group.add_argument("--undo-category", metavar="NAME",
+                            help="Move every file recorded into category NAME back instead of sorting")
+    args = parser.parse_args(argv)
+    undoing = args.undo is not None or args.undo_category is not None
+    if not undoing and (args.folder is None or args.by is None):
+        parser.error("the folder and --by are required unless undoing")
+
+    logging.basicConfig(level=logging.ERROR if args.quiet else logging.INFO, format="%(message)s")
+    metrics.enabled = bool(args.metrics) or metrics.enabled
+
+    # Finish or roll back moves a crash left halfway before touching any file
+    for action, outcome in action_tracker.repair_interrupted():
+        logging.warning("Interrupted move of %s %s", action.original_path, outcome)
+    if undoing:
+        return undo(args)
+
+    if not os.path.isdir(args.folder):
+        raise SystemExit(f"Not a folder: {args.folder}")
+
+    sorter = BatchSorter(os.path.abspath(args.folder), build_rule(args), args.recursive, args.workers,
+                         args.transfer_workers, args.verify)
+    result = sorter.run(dry_run=args.dry_run)
+
+    if args.dry_run:
+        for source_path, destination_folder in result['plan']:
+            print(f"{os.path.relpath(source_path, args.folder)} -> {os.path.relpath(destination_folder, args.folder)}")
+
+    planned = len(result['plan'])
+    print(f"Planned {planned} moves in {result['plan_seconds']:.2f}s ({rate(planned, result['plan_seconds'])})")
+    if not args.dry_run:
+        print(f"Moved {result['moved']}, failed {result['failed']} in {result['move_seconds']:.2f}s "
+              f"({rate(result['moved'], result['move_seconds'])})")
+    if args.metrics:
+        metrics.export(args.metrics)
+    return 1 if result['failed'] else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Required for process pools in PyInstaller builds
+    raise SystemExit(main())
\ No newline at end of file
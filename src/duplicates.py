@@ -0,0 +1,296 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import defaultdict, namedtuple
+import numpy as np
+from PIL import Image
+from image_loader import RAW_MODE_EMBEDDED, load_raw_image, open_scaled
+from metrics import metrics
+from utils import RAW_EXTENSIONS, get_app_dir, iter_images, open_database, process_pool
+
+logger = logging.getLogger(__name__)
+
+# Files in a duplicate group, best copy first; exact groups have identical bytes
+DuplicateGroup = namedtuple('DuplicateGroup', ['paths', 'exact'])
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DHASH_SIZE = 8  # 8x8 gradient bits, one 64-bit hash per image
+
+def content_hash(image_path):
+    """
+    Hash the file bytes
+    Args:
+        image_path: Source file path
+    Returns:
+        Hex blake2b digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(image_path, "rb") as source:
+        while chunk := source.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def perceptual_hash(image_path):
+    """
+    Difference hash of the image content, robust to resizing and recompression
+    Args:
+        image_path: Source file path
+    Returns:
+        64-bit integer
+    """
+    # Only a tiny image is needed: JPEG DCT scaling and RAW embedded previews skip most of the decode
+    box = (DHASH_SIZE * 8, DHASH_SIZE * 8)
+    if os.path.splitext(image_path)[1].lower() in RAW_EXTENSIONS:
+        image = load_raw_image(image_path, RAW_MODE_EMBEDDED, box)
+    else:
+        image = open_scaled(image_path, box)
+
+    pixels = np.asarray(image.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hash_file(job):
+    """
+    Worker process body
+    Args:
+        job: (path, need_content, need_perceptual) tuple
+    Returns:
+        (content hash or None, perceptual hash or None); None also marks a file that could not be read
+    """
+    image_path, need_content, need_perceptual = job
+    content = perceptual = None
+    try:
+        if need_content:
+            content = content_hash(image_path)
+        if need_perceptual:
+            perceptual = perceptual_hash(image_path)
+    except Exception:
+        pass
+    return content, perceptual
+
+def hamming_pairs(hashes, threshold, block=256):
+    """
+    Find all pairs of hashes within a Hamming distance, vectorized in row blocks
+    Args:
+        hashes: 1-D uint64 array
+        threshold: Largest distance that still counts as a match
+        block: Rows compared at once, bounding memory to block * len(hashes) bytes
+    Returns:
+        Iterator of (i, j) index pairs with i < j
+    """
+    for start in range(0, len(hashes), block):
+        rows = hashes[start:start + block]
+        distances = np.bitwise_count(rows[:, None] ^ hashes[None, :])
+        for i, j in zip(*np.nonzero(distances <= threshold)):
+            if start + i < j:
+                yield start + i, j
+
+class HashStore:
+    """Persistent SQLite cache of content and perceptual hashes keyed by file identity"""
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: SQLite file, defaults to hashes.db in the app directory
+        """
+        self.db_path = db_path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open hashes.db when the first lookup needs it"""
+        if self._connection is None:
+            if self.db_path is None:
+                self.db_path = os.path.join(get_app_dir(), "hashes.db")
+            self._connection = open_database(self.db_path, """
+                CREATE TABLE IF NOT EXISTS hashes (
+                    path TEXT PRIMARY KEY,
+                    file_size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content TEXT,
+                    perceptual BLOB
+                )""")
+        return self._connection
+
+    def lookup(self, folder_path, identities):
+        """
+        Fetch stored hashes of files that are unchanged
+        Args:
+            folder_path: Folder the files are in, limiting the rows read to a key range
+            identities: Dictionary of path -> (file_size, mtime_ns)
+        Returns:
+            Dictionary of path -> (content hash or None, perceptual hash or None)
+        """
+        prefix = os.path.join(folder_path, "")
+        found = {}
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT path, file_size, mtime_ns, content, perceptual FROM hashes WHERE path >= ? AND path < ?",
+                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+            for path, file_size, mtime_ns, content, perceptual in cursor:
+                if identities.get(path) == (file_size, mtime_ns):
+                    found[path] = (content, int.from_bytes(perceptual, "big") if perceptual is not None else None)
+        return found
+
+    def store(self, rows):
+        """
+        Save hashes
+        Args:
+            rows: Iterable of (path, file_size, mtime_ns, content hash, perceptual hash)
+        """
+        with self._lock:
+            self._connect().executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                [(path, file_size, mtime_ns, content,
+                  perceptual.to_bytes(8, "big") if perceptual is not None else None)
+                 for path, file_size, mtime_ns, content, perceptual in rows])
+            self._connection.commit()
+
+class DuplicateFinder:
+    """Group exact copies and near-identical shots of a folder"""
+    def __init__(self, folder_path, recursive=False, exclude=(), threshold=6, workers=None, store=None):
+        """
+        Args:
+            folder_path: Folder to search
+            recursive: Also search subfolders
+            exclude: Top-level subfolder names to skip, such as the categories
+            threshold: Largest perceptual hash distance (of 64 bits) treated as a near-duplicate
+            workers: Hashing worker processes, defaults to the CPU count
+            store: HashStore, defaults to the shared one
+        """
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.exclude = exclude
+        self.threshold = threshold
+        self.workers = workers
+        self.store = store or hash_store
+
+    def find(self, progress=None):
+        """
+        Hash the folder, reusing stored hashes, and group duplicates
+        Args:
+            progress: Optional callable (done, total) called as hashes arrive
+        Returns:
+            List of DuplicateGroup with relative paths, in folder order of their first file
+        """
+        with metrics.timer("scan"):
+            relative_paths = list(iter_images(self.folder_path, self.recursive, self.exclude))
+
+        identities = {}
+        for relative_path in relative_paths:
+            try:
+                stat = os.stat(os.path.join(self.folder_path, relative_path))
+            except OSError:
+                continue
+            identities[os.path.join(self.folder_path, relative_path)] = (stat.st_size, stat.st_mtime_ns)
+
+        # Only files sharing a size with another file can be exact copies
+        sizes = defaultdict(int)
+        for file_size, _ in identities.values():
+            sizes[file_size] += 1
+
+        stored = self.store.lookup(self.folder_path, identities)
+        hashes = {path: stored.get(path, (None, None)) for path in identities}
+        jobs = []
+        for path, (file_size, _) in identities.items():
+            content, perceptual = hashes[path]
+            need_content = sizes[file_size] > 1 and content is None
+            if need_content or perceptual is None:
+                jobs.append((path, need_content, perceptual is None))
+
+        if jobs:
+            with metrics.timer("hash"):
+                self._hash(jobs, identities, hashes, progress)
+        logger.info("Duplicate scan: %d files, %d hashed, %d from cache", len(identities), len(jobs),
+                    len(identities) - len(jobs))
+
+        groups = self.group(hashes)
+        return [DuplicateGroup([os.path.relpath(path, self.folder_path) for path in self.rank(paths)], exact)
+                for paths, exact in groups]
+
+    def _hash(self, jobs, identities, hashes, progress):
+        """Compute missing hashes in worker processes and store them in batches"""
+        rows = []
+        with process_pool(self.workers) as executor:
+            for done, (job, (content, perceptual)) in enumerate(
+                    zip(jobs, executor.map(hash_file, jobs, chunksize=64)), 1):
+                path = job[0]
+                old_content, old_perceptual = hashes[path]
+                hashes[path] = (content or old_content, perceptual if perceptual is not None else old_perceptual)
+                rows.append((path,) + identities[path] + hashes[path])
+                if len(rows) >= 512:
+                    self.store.store(rows)
+                    rows = []
+                if progress is not None:
+                    progress(done, len(jobs))
+        self.store.store(rows)
+
+    def group(self, hashes):
+        """
+        Union files with equal content hashes or close perceptual hashes
+        Args:
+            hashes: Dictionary of path -> (content hash, perceptual hash)
+        Returns:
+            List of (paths, exact) pairs for groups of two or more
+        """
+        paths = list(hashes)
+        parent = list(range(len(paths)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            parent[find(i)] = find(j)
+
+        by_content = {}
+        for i, path in enumerate(paths):
+            content = hashes[path][0]
+            if content is not None:
+                if content in by_content:
+                    union(i, by_content[content])
+                else:
+                    by_content[content] = i
+
+        indexed = [i for i, path in enumerate(paths) if hashes[path][1] is not None]
+        if indexed:
+            # Identical perceptual hashes are joined directly, only distinct values are compared
+            values, first, inverse = np.unique(np.array([hashes[paths[i]][1] for i in indexed], dtype=np.uint64),
+                                               return_index=True, return_inverse=True)
+            for position, unique in enumerate(inverse):
+                union(indexed[position], indexed[first[unique]])
+
+            # Pigeonhole: hashes within threshold bits share at least one of threshold + 1 bands exactly,
+            # so only values sharing a band are compared
+            band_count = min(self.threshold + 1, 64)
+            edges = np.linspace(0, 64, band_count + 1).astype(np.uint64)
+            for low, high in zip(edges[:-1], edges[1:]):
+                bands = (values >> low) & np.uint64((1 << int(high - low)) - 1)
+                order = np.argsort(bands, kind="stable")
+                splits = np.nonzero(np.diff(bands[order]))[0] + 1
+                for bucket in np.split(order, splits):
+                    if len(bucket) > 1:
+                        for a, b in hamming_pairs(values[bucket], self.threshold):
+                            union(indexed[first[bucket[a]]], indexed[first[bucket[b]]])
+
+        members = defaultdict(list)
+        for i in range(len(paths)):
+            members[find(i)].append(i)
+
+        groups = []
+        for indices in members.values():
+            if len(indices) < 2:
+                continue
+            contents = {hashes[paths[i]][0] for i in indices}
+            groups.append((sorted(indices), len(contents) == 1 and None not in contents))
+        groups.sort()
+        return [([paths[i] for i in indices], exact) for indices, exact in groups]
+
+    def rank(self, paths):
+        """Order a group best copy first: largest file, then folder order"""
+        return sorted(paths, key=lambda path: -os.path.getsize(path) if os.path.exists(path) else 0)
+
+# Global instance shared by every folder
+hash_store = HashStore()
\ No newline at end of file
@@ -0,0 +1,76 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+class FileOperationExecutor:
+    """Run file operations one at a time, in submission order, on a background thread"""
+    def __init__(self):
+        self._operations = queue.Queue()
+        self._completed = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="file-ops", daemon=True)
+        self._worker.start()
+
+    def submit(self, function, *args, on_done=None, on_error=None):
+        """
+        Queue a file operation behind every operation submitted before it
+        Args:
+            function: Callable doing the file work
+            args: Positional arguments for function
+            on_done: Called with the result from process_completed
+            on_error: Called with the exception from process_completed
+        """
+        with self._lock:
+            self._pending += 1
+        self._operations.put((function, args, on_done, on_error))
+
+    def pending(self):
+        """
+        Count operations submitted but not yet finished
+        Returns:
+            Number of queued or running operations
+        """
+        with self._lock:
+            return self._pending
+
+    def process_completed(self):
+        """
+        Run callbacks of finished operations on the calling thread (the Tk thread in the GUI)
+        Returns:
+            Number of operations processed
+        """
+        processed = 0
+        while True:
+            try:
+                callback, value = self._completed.get_nowait()
+            except queue.Empty:
+                return processed
+            if callback is not None:
+                try:
+                    callback(value)
+                except Exception:
+                    # One failing view update must not strand the results queued behind it
+                    logger.exception("File operation callback failed")
+            processed += 1
+
+    def wait(self):
+        """Block until every submitted operation has finished"""
+        self._operations.join()
+
+    def _run(self):
+        """Worker loop executing operations in order"""
+        while True:
+            function, args, on_done, on_error = self._operations.get()
+            try:
+                result = function(*args)
+            except Exception as e:
+                self._completed.put((on_error, e))
+            else:
+                self._completed.put((on_done, result))
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                self._operations.task_done()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import math
+import os
+import tkinter as tk
+from tkinter import ttk
+from PIL import ImageTk
+from prefetch import ImagePrefetcher
+
+class ThumbnailGrid:
+    """Virtualized contact sheet of the sorting queue with multi-select"""
+    def __init__(self, master, loader, thumb_size=160, padding=8, margin_rows=2, max_workers=4,
+                 cache_mb=64, bg_color="#2b2b2b", select_color="#1a73e8", on_open=None):
+        """
+        Args:
+            master: Parent widget
+            loader: Callable (path, size) -> Pillow image, run on worker threads
+            thumb_size: Edge of the square thumbnail cells
+            padding: Space between cells
+            margin_rows: Rows above and below the viewport that are loaded ahead of scrolling
+            max_workers: Thumbnail decode threads
+            cache_mb: Memory cap of decoded thumbnails
+            on_open: Called with a queue index when a thumbnail is double-clicked
+        """
+        self.thumb_size = thumb_size
+        self.cell_size = thumb_size + padding
+        self.margin_rows = margin_rows
+        self.select_color = select_color
+        self.on_open = on_open
+        self.folder_path = ""
+        self.items = []          # The app's image_list, shared by reference
+        self.selection = set()   # Selected relative paths
+        self.anchor = None       # Index shift-click ranges start from
+        self.columns = 1
+        self._cells = {}         # Index -> (frame item, image item)
+        self._photos = {}        # Index -> PhotoImage of visible cells only
+        self._poll_job = None
+        self.thumbnails = ImagePrefetcher(loader, max_workers=max_workers, max_bytes=cache_mb * 1024 * 1024)
+
+        self.frame = ttk.Frame(master)
+        self.canvas = tk.Canvas(self.frame, bg=bg_color, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scroll)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Control-Button-1>", self.on_ctrl_click)
+        self.canvas.bind("<Shift-Button-1>", self.on_shift_click)
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self.canvas.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_units(-1))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_units(1))
+
+    def set_items(self, folder_path, items):
+        """
+        Show a queue of images
+        Args:
+            folder_path: Folder the relative paths are based on
+            items: List of relative paths; the grid keeps the reference and follows its changes
+        """
+        self.folder_path = folder_path
+        self.items = items
+        self.selection.clear()
+        self.anchor = None
+        self.thumbnails.cancel()
+        self.refresh()
+
+    def refresh(self):
+        """Re-layout after the queue or the canvas size changed"""
+        width = max(self.canvas.winfo_width(), self.cell_size)
+        self.columns = max(1, width // self.cell_size)
+        rows = math.ceil(len(self.items) / self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell_size, rows * self.cell_size))
+        self.selection.intersection_update(self.items)
+
+        # Indices shift when images leave the queue, so rebuild the visible cells
+        self.canvas.delete("all")
+        self._cells.clear()
+        self._photos.clear()
+        self.update_visible()
+
+    def visible_range(self):
+        """
+        Queue indices of the viewport plus the scroll margin
+        Returns:
+            range of indices
+        """
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(max(self.canvas.winfo_height(), 1))
+        first_row = max(0, int(top // self.cell_size) - self.margin_rows)
+        last_row = int(bottom // self.cell_size) + self.margin_rows
+        return range(first_row * self.columns, min(len(self.items), (last_row + 1) * self.columns))
+
+    def update_visible(self):
+        """Create cells entering the margin, drop cells leaving it and queue their thumbnails"""
+        visible = self.visible_range()
+
+        for index in [index for index in self._cells if index not in visible]:
+            for item in self._cells.pop(index):
+                self.canvas.delete(item)
+            self._photos.pop(index, None)
+
+        for index in visible:
+            if index not in self._cells:
+                self._create_cell(index)
+
+        size = (self.thumb_size, self.thumb_size)
+        self.thumbnails.schedule([self.path(index) for index in visible], size)
+        self._poll_thumbnails()
+
+    def _create_cell(self, index):
+        """Draw the frame and placeholder of one thumbnail cell"""
+        row, column = divmod(index, self.columns)
+        x0, y0 = column * self.cell_size, row * self.cell_size
+        selected = self.items[index] in self.selection
+        frame = self.canvas.create_rectangle(x0 + 2, y0 + 2, x0 + self.cell_size - 2, y0 + self.cell_size - 2,
+                                             outline=self.select_color if selected else "#444444",
+                                             width=3 if selected else 1)
+        image = self.canvas.create_text(x0 + self.cell_size // 2, y0 + self.cell_size // 2,
+                                        text=os.path.basename(self.items[index])[:20], fill="#888888")
+        self._cells[index] = (frame, image)
+
+    def _poll_thumbnails(self):
+        """Swap placeholders for thumbnails that finished decoding"""
+        if self._poll_job is not None:
+            self.canvas.after_cancel(self._poll_job)
+            self._poll_job = None
+
+        size = (self.thumb_size, self.thumb_size)
+        waiting = False
+        for index, (frame, item) in list(self._cells.items()):
+            if index in self._photos:
+                continue
+            key = (self.path(index), size)
+            thumbnail = self.thumbnails.cache.get(key)
+            if thumbnail is None:
+                if key in self.thumbnails.failed:
+                    # Unreadable file: mark the placeholder and stop waiting for it
+                    self._photos[index] = None
+                    self.canvas.itemconfigure(item, text=f"{os.path.basename(self.items[index])[:20]}\nCannot load",
+                                              fill="#cc6666")
+                    continue
+                waiting = True
+                continue
+            self._photos[index] = ImageTk.PhotoImage(thumbnail)
+            x, y = self.canvas.coords(item)
+            self.canvas.delete(item)
+            self._cells[index] = (frame, self.canvas.create_image(x, y, image=self._photos[index]))
+
+        if waiting:
+            self._poll_job = self.canvas.after(100, self._poll_thumbnails)
+
+    def path(self, index):
+        """Absolute path of a queue entry"""
+        return os.path.join(self.folder_path, self.items[index])
+
+    def index_at(self, event):
+        """
+        Queue index under the mouse
+        Returns:
+            Index or None outside the thumbnails
+        """
+        column = int(self.canvas.canvasx(event.x) // self.cell_size)
+        row = int(self.canvas.canvasy(event.y) // self.cell_size)
+        index = row * self.columns + column
+        if column >= self.columns or index >= len(self.items):
+            return None
+        return index
+
+    def on_click(self, event):
+        """Select only the clicked thumbnail"""
+        index = self.index_at(event)
+        self.selection = {self.items[index]} if index is not None else set()
+        self.anchor = index
+        self._redraw_selection()
+
+    def on_ctrl_click(self, event):
+        """Toggle the clicked thumbnail"""
+        index = self.index_at(event)
+        if index is None:
+            return
+        self.selection.symmetric_difference_update({self.items[index]})
+        self.anchor = index
+        self._redraw_selection()
+
+    def on_shift_click(self, event):
+        """Select the range from the last clicked thumbnail"""
+        index = self.index_at(event)
+        if index is None:
+            return
+        start = self.anchor if self.anchor is not None else index
+        low, high = sorted((start, index))
+        self.selection.update(self.items[low:high + 1])
+        self._redraw_selection()
+
+    def on_double_click(self, event):
+        """Open a thumbnail in the single image view"""
+        index = self.index_at(event)
+        if index is not None and self.on_open is not None:
+            self.on_open(index)
+
+    def select_all(self):
+        """Select every image in the queue"""
+        self.selection = set(self.items)
+        self._redraw_selection()
+
+    def selected_paths(self):
+        """
+        Selected images in queue order
+        Returns:
+            List of relative paths
+        """
+        return [item for item in self.items if item in self.selection]
+
+    def _redraw_selection(self):
+        """Update the outlines of the visible cells"""
+        for index, (frame, _) in self._cells.items():
+            selected = self.items[index] in self.selection
+            self.canvas.itemconfigure(frame, outline=self.select_color if selected else "#444444",
+                                      width=3 if selected else 1)
+
+    def on_scroll(self, *args):
+        """Scrollbar callback"""
+        self.canvas.yview(*args)
+        self.update_visible()
+
+    def scroll_units(self, units):
+        """Scroll by rows"""
+        self.canvas.yview_scroll(units, "units")
+        self.update_visible()
+
+    def on_mouse_wheel(self, event):
+        """Mouse wheel scrolling on Windows and macOS"""
+        self.scroll_units(-1 if event.delta > 0 else 1)
+
+    def close(self):
+        """Stop background thumbnail work"""
+        if self._poll_job is not None:
+            self.canvas.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.thumbnails.shutdown()
\ No newline at end of file
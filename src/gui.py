@@ -1,13 +1,33 @@
 import os
+import logging
+import threading
+import time
+import queue
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from PIL import Image, ImageTk
-import pillow_heif
-pillow_heif.register_heif_opener()  # Enable HEIF/HEIC support
-from sorter import move_image, delete_image, undo_last_action
-from utils import is_valid_folder
-import threading
-import rawpy
+from image_loader import (configure_heif_decoding, fit_image, load_preview, mip_level, HEIF_DECODE_WORKERS,
+                          RAW_MODE_EMBEDDED, RAW_MODES)
+from sorter import action_tracker, move_image, move_images, delete_image, delete_images, undo_last_action
+from utils import is_valid_folder, iter_images, list_subfolders, get_app_dir, relative_to_folder, startup_timer
+from prefetch import ImagePrefetcher
+from preview_store import preview_store
+from metrics import metrics
+from file_ops import FileOperationExecutor
+from transfer import DEFAULT_WORKERS
+from grid_view import ThumbnailGrid
+from metadata_index import MetadataIndex
+from watcher import ADDED, REMOVED, RENAMED, FolderWatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = (800, 600)
+
+# Queue filter choices that do not come from the metadata index
+ORDER_FOLDER = "Folder order"
+ORDER_CAPTURE_TIME = "Capture time"
+ALL_CAMERAS = "All cameras"
+ANY_DATE = "Any date"
 
 class ThemedTk(tk.Tk):
     """Custom Tkinter root window with modern theming"""
@@ -36,33 +56,95 @@ class ThemedTk(tk.Tk):
                             font=('Arial', 10, 'bold'), 
                             padding=10)
         self.style.map('TButton', background=[('active', self.hover_color)])
+        # Category button the suggester expects for the current image
+        self.style.configure('Suggested.TButton', background=self.success_color)
+        self.style.map('Suggested.TButton', background=[('active', self.hover_color)])
         
         self.configure(bg=self.bg_color)
 
-def load_raw_image(raw_path):
-    """Reads RAW image files and converts them to Pillow format"""
-    with rawpy.imread(raw_path) as raw:
-        rgb = raw.postprocess()  # Convert RAW to RGB array
-        return Image.fromarray(rgb)  # Convert array to Pillow Image
-
 class SortifyV1:
-    def __init__(self, root):
+    def __init__(self, root, prefetch_depth=3, preview_cache_mb=256, raw_mode=RAW_MODE_EMBEDDED,
+                 persistent_cache=True, recursive_scan=False, show_splash=True, detect_duplicates=True,
+                 heif_decode_workers=HEIF_DECODE_WORKERS, transfer_workers=DEFAULT_WORKERS, verify_transfers=False,
+                 watch_folder=True, suggest_categories=True):
         """Initialize main application"""
         self.root = root
+        # Learns from past moves; suggestions are computed on the prefetch threads along with the previews.
+        # Created when sorting starts so numpy is not imported before the main menu is shown
+        self.suggest_categories = suggest_categories
+        self.suggester = None
+        self.suggested_category = None
+        self.category_buttons = {}
+        self.watch_folder = watch_folder
+        self.transfer_workers = transfer_workers
+        self.verify_transfers = verify_transfers
+        configure_heif_decoding(heif_decode_workers)
+        self.detect_duplicates = detect_duplicates
+        self.raw_mode = raw_mode
+        self.persistent_cache = persistent_cache
+        self.recursive_scan = recursive_scan
         self.root.title("SortifyV1")
-        self.root.geometry("800x600")
+        self.root.geometry(f"{DEFAULT_WINDOW_SIZE[0]}x{DEFAULT_WINDOW_SIZE[1]}")
         self.image_list = []
         self.current_index = 0
         self.categories = []
         self.folder_path = ""
         self.total_images = 0
         self.sorted_images = 0
-        self.create_splash_screen()
+        self.scan_generation = 0
+        self.queued_paths = set()  # Every image that entered the queue since sorting started
+        self.watcher = None  # Follows files arriving in the folder during sorting
+        self.progress_label = None
+        self.pending_label = None
+        self.sorting_view = None
+        self.grid = None  # Thumbnail grid while the grid screen is open
+        self.metadata_index = None
+        self.hidden_images = []  # Unsorted images excluded by the queue filter
+        self.queue_filter = (ORDER_FOLDER, ALL_CAMERAS, ANY_DATE, ANY_DATE)
+        self.index_status = ""
+        self.duplicate_finder = None
+        self.duplicate_groups = None  # None while the duplicate scan is running
+        self.duplicate_index = 0
+        self.duplicate_grid = None
+        self.duplicates_button = None
+        self.transition_start = None  # When the action leading to the next image started
+        self.current_mip = None
+        self.current_mip_level = None
+        self.current_mip_path = None
+        self.prefetch_level = mip_level(DEFAULT_WINDOW_SIZE)
+        self.window_size = None
+        self.resize_render_job = None
+        self.resize_settle_job = None
+        self.root.bind("<Configure>", self.on_window_resize)
+        self.show_metrics_overlay = False
+        # Moves and deletes run in order on a background thread
+        self.file_ops = FileOperationExecutor()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Decode upcoming images in the background so show_image only has to display them
+        self.prefetcher = ImagePrefetcher(self.load_preview, lookahead=prefetch_depth,
+                                          max_bytes=preview_cache_mb * 1024 * 1024, fitter=fit_image)
+        self.poll_file_ops()
+        startup_timer.mark("app init")
+        if show_splash:
+            self.create_splash_screen()
+        else:
+            for name, step in self.startup_steps():
+                self.run_startup_step(name, step)
+            self.create_main_menu()
+            self.root.after_idle(self.report_startup)
     
     def clear_window(self):
         """Clear all widgets from the window"""
         for widget in self.root.winfo_children():
             widget.destroy()
+        self.sorting_view = None
+        self.duplicates_button = None
+        if self.grid is not None:
+            self.grid.close()
+            self.grid = None
+        if self.duplicate_grid is not None:
+            self.duplicate_grid.close()
+            self.duplicate_grid = None
     
     def create_splash_screen(self):
         """Show loading splash screen with progress bar"""
@@ -77,15 +159,48 @@ class SortifyV1:
         progress = ttk.Progressbar(self.splash_frame, mode="determinate", length=300)
         progress.pack(pady=10)
         
-        def simulate_loading():
-            """Simulate loading progress with thread"""
-            for i in range(1, 101, 5):
-                self.root.after(i * 20, lambda value=i: progress.configure(value=value))
-            self.root.after(2000, self.create_main_menu)
-        
-        loading_thread = threading.Thread(target=simulate_loading)
-        loading_thread.start()
+        # Real initialization work, run one step at a time so the progress bar can repaint
+        steps = self.startup_steps()
+
+        def run_step(index):
+            if index == len(steps):
+                self.create_main_menu()
+                self.root.after_idle(self.report_startup)
+                return
+            name, step = steps[index]
+            label.configure(text=f"SortifyV1 - {name}...")
+            self.run_startup_step(name, step)
+            progress.configure(value=(index + 1) * 100 / len(steps))
+            self.root.after(1, run_step, index + 1)
+
+        self.root.after(1, run_step, 0)
+
+    def startup_steps(self):
+        """Initialization work done before the main menu is shown"""
+        return [
+            ("Loading undo history", action_tracker.load),
+            ("Repairing interrupted moves", self.repair_interrupted_moves),
+            ("Opening preview cache", preview_store.open),
+        ]
+
+    def repair_interrupted_moves(self):
+        """Finish or roll back moves a crash left halfway, before any new file operation"""
+        for action, outcome in action_tracker.repair_interrupted():
+            logger.warning("Interrupted move of %s %s", action.original_path, outcome)
+
+    def run_startup_step(self, name, step):
+        """Run and time one initialization step"""
+        try:
+            step()
+        except Exception as e:
+            logger.error("Startup step failed (%s): %s", name, e)
+        startup_timer.mark(name)
     
+    def report_startup(self):
+        """Record startup timings once the main menu has been drawn"""
+        startup_timer.mark("main menu")
+        startup_timer.report()
+
     def create_main_menu(self):
         """Create main menu interface"""
         self.clear_window()
@@ -102,15 +217,14 @@ class SortifyV1:
     def choose_folder(self):
         """Handle folder selection and initialize categories"""
         folder = filedialog.askdirectory()
-        if folder and is_valid_folder(folder):
+        if folder and is_valid_folder(folder, self.recursive_scan):
             # Reset categories and get subfolders
             self.categories = []
             self.folder_path = folder
-            subfolders = [f for f in os.listdir(folder) 
-                          if os.path.isdir(os.path.join(folder, f))]
-
+            self.reset_prefetch()
             # Use subfolders as default categories
-            self.categories = subfolders
+            self.categories = list_subfolders(folder)
+            self.start_duplicate_scan()
             self.create_category_menu()
         else:
             self.show_notification("Invalid folder or no images found!", "error")
@@ -141,10 +255,67 @@ class SortifyV1:
             category_button.pack(side="left", padx=5, pady=5, ipadx=10, ipady=5)
             category_button.bind("<Button-1>", lambda e, cat=category: self.delete_category(cat))
 
+        if self.detect_duplicates:
+            self.duplicates_button = ttk.Button(self.category_frame, command=self.show_duplicates, style='TButton')
+            self.duplicates_button.pack(pady=5, ipadx=20, ipady=5)
+            self.update_duplicates_button()
+
         ttk.Button(self.category_frame, text="Start Sorting", command=self.start_sorting, style='TButton').pack(pady=10, ipadx=20, ipady=10)
 
         self.github_credit()
 
+    def start_duplicate_scan(self):
+        """Hash the new folder in worker processes to find exact copies and near-identical shots"""
+        if not self.detect_duplicates:
+            return
+        from duplicates import DuplicateFinder  # Deferred: pulls in numpy
+        finder = self.duplicate_finder = DuplicateFinder(self.folder_path, self.recursive_scan, exclude=self.categories)
+        self.duplicate_groups = None
+        self.duplicate_index = 0
+        results = queue.Queue()
+
+        def run():
+            try:
+                results.put(finder.find(progress=lambda done, total: results.put((done, total))))
+            except Exception as e:
+                logger.error("Duplicate scan failed: %s", e)
+                results.put([])
+
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(200, self.poll_duplicate_scan, results, finder)
+
+    def poll_duplicate_scan(self, results, finder):
+        """Show duplicate scan progress and its result once finished"""
+        if finder is not self.duplicate_finder:
+            return  # Folder changed
+        while True:
+            try:
+                item = results.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, list):
+                self.duplicate_groups = item
+                self.update_duplicates_button()
+                if item:
+                    self.show_notification(f"Found {len(item)} groups of duplicate images", "info")
+                return
+            if self.duplicates_button is not None:
+                self.duplicates_button.configure(text=f"Checking duplicates {item[0]}/{item[1]}")
+        self.root.after(200, self.poll_duplicate_scan, results, finder)
+
+    def update_duplicates_button(self):
+        """Reflect the duplicate scan state on the category menu button"""
+        if self.duplicates_button is None:
+            return
+        if self.duplicate_groups is None:
+            self.duplicates_button.configure(text="Checking duplicates...", state="disabled")
+        elif self.duplicate_groups:
+            remaining = len(self.duplicate_groups) - self.duplicate_index
+            self.duplicates_button.configure(text=f"Review Duplicates ({remaining})",
+                                             state="normal" if remaining else "disabled")
+        else:
+            self.duplicates_button.configure(text="No duplicates found", state="disabled")
+
     def add_category(self):
         """Add new category from user input"""
         category = self.category_entry.get().strip()
@@ -170,73 +341,368 @@ class SortifyV1:
             except OSError:
                 self.show_notification(f"Cannot delete non-empty category: {category}", "error")
     
+    def show_duplicates(self):
+        """Review the next duplicate group: keep some, or move or delete the whole group"""
+        groups = self.duplicate_groups or []
+        while self.duplicate_index < len(groups):
+            group = groups[self.duplicate_index]
+            # Files handled elsewhere since the scan are left out
+            paths = [path for path in group.paths if os.path.exists(os.path.join(self.folder_path, path))]
+            if len(paths) > 1:
+                break
+            self.duplicate_index += 1
+        else:
+            self.show_notification("All duplicate groups reviewed", "info")
+            self.create_category_menu()
+            return
+
+        self.clear_window()
+
+        main_frame = ttk.Frame(self.root, padding=10)
+        main_frame.pack(fill="both", expand=True)
+
+        kind = "Identical files" if group.exact else "Similar images"
+        ttk.Label(main_frame, text=f"Duplicates {self.duplicate_index + 1}/{len(groups)}: {kind}, {len(paths)} files",
+                  font=('Arial', 12)).pack(pady=5)
+        ttk.Label(main_frame, text="Select the images to keep; the largest file is selected by default",
+                  font=('Arial', 10)).pack()
+
+        self.duplicate_grid = ThumbnailGrid(main_frame, self.load_preview, thumb_size=240,
+                                            bg_color=self.root.bg_color, select_color=self.root.accent_color)
+        self.duplicate_grid.frame.pack(fill="both", expand=True, pady=5)
+        self.duplicate_grid.set_items(self.folder_path, paths)
+        self.duplicate_grid.selection = {paths[0]}
+        self.duplicate_grid.refresh()
+
+        # Category buttons move the whole group as one undoable batch
+        category_row = ttk.Frame(main_frame)
+        category_row.pack(pady=5)
+        for category in self.categories:
+            ttk.Button(category_row, text=category, command=lambda cat=category: self.move_duplicate_group(paths, cat),
+                       style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+
+        button_row = ttk.Frame(main_frame)
+        button_row.pack(pady=5)
+        ttk.Button(button_row, text="Keep Selected", command=lambda: self.keep_duplicates(paths), style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row, text="Delete Group", command=lambda: self.delete_duplicate_files(paths), style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row, text="Skip", command=self.next_duplicate_group, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row, text="Done", command=self.create_category_menu, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+
+        self.github_credit()
+
+    def next_duplicate_group(self):
+        """Go to the next duplicate group"""
+        self.duplicate_index += 1
+        self.show_duplicates()
+
+    def move_duplicate_group(self, paths, category):
+        """Move every file of a duplicate group to a category"""
+        self.file_ops.submit(move_images, [os.path.join(self.folder_path, path) for path in paths],
+                             os.path.join(self.folder_path, category), self.transfer_workers, self.verify_transfers,
+                             on_done=lambda results: None in results and self.show_notification(
+                                 f"Failed to move {results.count(None)} duplicates", "error"),
+                             on_error=lambda error: self.show_notification(f"Move failed: {error}", "error"))
+        self.next_duplicate_group()
+
+    def keep_duplicates(self, paths):
+        """Delete the files of a group that are not selected"""
+        keep = self.duplicate_grid.selection
+        if not keep:
+            self.show_notification("Select at least one image to keep", "error")
+            return
+        self.delete_duplicate_files([path for path in paths if path not in keep])
+
+    def delete_duplicate_files(self, paths):
+        """Permanently delete duplicates after confirmation"""
+        if paths and not messagebox.askyesno("Delete Duplicates", f"Permanently delete {len(paths)} files?"):
+            return
+        if paths:
+            self.file_ops.submit(delete_images, [os.path.join(self.folder_path, path) for path in paths],
+                                 on_done=lambda results: all(results) or self.show_notification(
+                                     f"Failed to delete {results.count(False)} duplicates", "error"),
+                                 on_error=lambda error: self.show_notification(f"Delete failed: {error}", "error"))
+        self.next_duplicate_group()
+
     def start_sorting(self):
         """Initialize image sorting process"""
         if not self.categories:
             self.show_notification("No categories created!", "error")
             return
         
-        # Get supported image formats
-        self.image_list = [f for f in os.listdir(self.folder_path) if f.lower().endswith((
-            ".jpg", ".png", ".jpeg", ".heif", ".heic", ".cr2", ".nef", ".dng", ".arw", ".rw2", ".orf"
-        ))]
+        # Show the first image right away and stream the rest of the folder in the background
+        scan_start = time.perf_counter()
+        scanner = iter_images(self.folder_path, self.recursive_scan, exclude=self.categories)
+        first_image = next(scanner, None)
         
-        if not self.image_list:
+        if first_image is None:
             self.show_notification("No images found!", "error")
             return
         
-        self.total_images = len(self.image_list)
+        self.stop_watching()
+        self.image_list = [first_image]
+        self.queued_paths = {first_image}
+        self.hidden_images = []
+        self.metadata_index = None
+        self.queue_filter = (ORDER_FOLDER, ALL_CAMERAS, ANY_DATE, ANY_DATE)
+        self.total_images = 1
         self.sorted_images = 0
         self.current_index = 0
+        self.start_scan(scanner, scan_start)
+        if self.suggest_categories and self.suggester is None:
+            from suggest import CategorySuggester  # Deferred: pulls in numpy
+            self.suggester = CategorySuggester()
+        self.learn_from_moves()  # The first pass also learns from moves of earlier sessions
         self.show_image()
+
+    def start_scan(self, scanner, scan_start):
+        """Feed the remaining scanner output into the sorting queue from a worker thread"""
+        self.scan_generation += 1
+        generation = self.scan_generation
+        found = queue.Queue()
+
+        def scan():
+            for relative_path in scanner:
+                if generation != self.scan_generation:
+                    return  # Folder changed, abandon this scan
+                found.put(relative_path)
+            metrics.record("scan", time.perf_counter() - scan_start)
+            found.put(None)
+
+        threading.Thread(target=scan, daemon=True).start()
+        self.root.after(50, self.poll_scan, found, generation)
+
+    def poll_scan(self, found, generation):
+        """Append newly scanned images to the queue on the Tk thread"""
+        if generation != self.scan_generation:
+            return
+
+        added = 0
+        finished = False
+        while True:
+            try:
+                relative_path = found.get_nowait()
+            except queue.Empty:
+                break
+            if relative_path is None:
+                finished = True
+                break
+            self.image_list.append(relative_path)
+            self.queued_paths.add(relative_path)
+            added += 1
+
+        if added:
+            self.total_images += added
+            if self.progress_label is not None and self.progress_label.winfo_exists():
+                self.progress_label.configure(text=f"Images: {self.sorted_images}/{self.total_images}")
+            if self.grid is not None:
+                self.grid.refresh()
+            self.schedule_prefetch()
+
+        if finished:
+            self.start_indexing()
+            self.start_watching()
+        else:
+            self.root.after(50, self.poll_scan, found, generation)
+
+    def start_watching(self):
+        """Follow images arriving in, leaving or renamed in the folder while it is sorted"""
+        if not self.watch_folder:
+            return
+        watcher = self.watcher = FolderWatcher(self.folder_path, self.recursive_scan, exclude=self.categories)
+        watcher.start(known=self.queued_paths)
+        self.root.after(250, self.poll_watcher, watcher, self.scan_generation)
+
+    def stop_watching(self):
+        """Stop following the folder"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def poll_watcher(self, watcher, generation):
+        """Apply folder changes to the queue on the Tk thread"""
+        if watcher is not self.watcher or generation != self.scan_generation:
+            watcher.stop()
+            return
+
+        added, gone, renamed = [], set(), {}
+        while True:
+            try:
+                event = watcher.events.get_nowait()
+            except queue.Empty:
+                break
+            if event.kind == ADDED:
+                if event.path not in self.queued_paths:
+                    self.queued_paths.add(event.path)
+                    added.append(event.path)
+            elif event.kind == REMOVED:
+                self.queued_paths.discard(event.path)
+                if event.path in added:
+                    added.remove(event.path)
+                else:
+                    gone.add(event.path)
+            elif event.kind == RENAMED:
+                self.queued_paths.discard(event.old_path)
+                self.queued_paths.add(event.path)
+                if event.old_path in added:
+                    added[added.index(event.old_path)] = event.path
+                else:
+                    renamed[event.old_path] = event.path
+        if added or gone or renamed:
+            self.apply_folder_changes(added, gone, renamed)
+        self.root.after(250, self.poll_watcher, watcher, generation)
+
+    def apply_folder_changes(self, added, gone, renamed):
+        """
+        Update the queue in one pass without changing the image on screen
+        Args:
+            added: New relative paths, appended to the queue
+            gone: Relative paths that left the folder
+            renamed: Dictionary of old -> new relative path
+        """
+        current = self.image_list[self.current_index] if self.current_index < len(self.image_list) else None
+        queued = len(self.image_list) + len(self.hidden_images)
+        # A file that left and came back within one poll, e.g. after a quick move and undo, keeps its place
+        gone = gone - set(added)
+        for path in gone | renamed.keys():
+            self.prefetcher.discard(os.path.join(self.folder_path, path))
+
+        # The image on screen stays even if its file is gone; moving it then fails and it leaves the queue
+        self.image_list[:] = [renamed.get(path, path) for path in self.image_list if path not in gone or path == current]
+        self.hidden_images = [renamed.get(path, path) for path in self.hidden_images if path not in gone]
+        if current is not None:
+            self.current_index = self.image_list.index(renamed.get(current, current))
+
+        # An undo finished before this poll may already have put the file back
+        present = set(self.image_list).union(self.hidden_images)
+        added = [path for path in added if path not in present]
+
+        # New images cannot be checked against an active camera or date filter, so they wait with the hidden ones
+        _, camera, start, end = self.queue_filter
+        if (camera, start, end) == (ALL_CAMERAS, ANY_DATE, ANY_DATE):
+            self.image_list.extend(added)
+        else:
+            self.hidden_images.extend(added)
+        if current is None:
+            self.current_index = min(self.current_index, len(self.image_list))
+        self.total_images += len(self.image_list) + len(self.hidden_images) - queued
+
+        if added:
+            self.show_notification(f"{len(added)} new images", "info")
+        if self.grid is not None:
+            self.refresh_view()
+        elif self.sorting_view is not None:
+            if current is None and self.current_index < len(self.image_list):
+                self.show_image()  # The queue had run out: show the first arrival
+            else:
+                self.progress_label.configure(text=f"Images: {self.sorted_images}/{self.total_images}")
+                self.schedule_prefetch()
+
+    def requeue_images(self, relative_paths):
+        """
+        Put images back into the queue at the current position
+        Args:
+            relative_paths: Paths in queue order; copies the folder watch already appended are moved here
+        """
+        returning = set(relative_paths)
+        if self.watcher is not None:
+            queued = len(self.image_list) + len(self.hidden_images)
+            before = sum(1 for path in self.image_list[:self.current_index] if path in returning)
+            self.image_list[:] = [path for path in self.image_list if path not in returning]
+            self.hidden_images = [path for path in self.hidden_images if path not in returning]
+            self.current_index -= before
+            # The folder watch counted those copies as new images
+            self.total_images -= queued - len(self.image_list) - len(self.hidden_images)
+        self.image_list[self.current_index:self.current_index] = relative_paths
+        self.queued_paths.update(returning)
+
+    def start_indexing(self):
+        """Extract EXIF of the scanned queue in worker processes for ordering, filtering and orientation"""
+        index = self.metadata_index = MetadataIndex(self.folder_path)
+        relative_paths = list(self.image_list)
+        progress = queue.Queue()
+
+        def run():
+            try:
+                updated = index.update(relative_paths, progress=lambda done, total: progress.put((done, total)))
+                logger.info("Metadata index: %d of %d images extracted", updated, len(relative_paths))
+            except Exception as e:
+                logger.error("Metadata indexing failed: %s", e)
+            progress.put(None)
+
+        self.index_status = "Indexing..."
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(200, self.poll_indexing, progress, index)
+
+    def poll_indexing(self, progress, index):
+        """Show indexing progress and enable the queue filter once it finished"""
+        if index is not self.metadata_index:
+            return  # Folder changed
+        finished = False
+        while True:
+            try:
+                item = progress.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+            self.index_status = f"Indexing {item[0]}/{item[1]}"
+
+        if finished:
+            self.index_status = "" if index.ready else "Index unavailable"
+            self.update_filter_choices()
+        elif self.sorting_view is not None:
+            self.index_label.configure(text=self.index_status)
+        if not finished:
+            self.root.after(200, self.poll_indexing, progress, index)
     
-    def show_image(self):
-        """Display current image with controls"""
+    def build_sorting_view(self):
+        """Create the sorting screen widgets once; show_image only updates them"""
         self.clear_window()
         
         main_frame = ttk.Frame(self.root, padding=20)
         main_frame.place(relx=0.5, rely=0.5, anchor='center')
         
         # Display progress counter
-        ttk.Label(main_frame, text=f"Images: {self.sorted_images}/{self.total_images}", font=('Arial', 12)).pack(pady=5)
-        
-        if self.current_index < len(self.image_list):
-            image_path = os.path.join(self.folder_path, self.image_list[self.current_index])
-            file_extension = os.path.splitext(image_path)[1].lower()
-            
-            try:
-                # Load image based on format
-                if file_extension in ['.cr2', '.nef', '.dng', '.arw', '.rw2', '.orf']:
-                    image = load_raw_image(image_path)
-                elif file_extension in ['.heif', '.heic']:
-                    image = Image.open(image_path)
-                else:
-                    image = Image.open(image_path)
-                
-                # Dynamic image resizing
-                window_width = self.root.winfo_width()
-                window_height = self.root.winfo_height()
-                max_width = int(window_width * 0.8)
-                max_height = int(window_height * 0.8)
-                image.thumbnail((max_width, max_height), Image.LANCZOS)
-                
-                self.current_image = ImageTk.PhotoImage(image)
-                image_label = ttk.Label(main_frame, image=self.current_image)
-                image_label.pack(expand=True)
-            
-            except Exception as e:
-                self.show_notification(f"Failed to load image: {e}", "error")
-                return
+        self.progress_label = ttk.Label(main_frame, text="", font=('Arial', 12))
+        self.progress_label.pack(pady=5)
+        self.pending_label = ttk.Label(main_frame, text="", font=('Arial', 10))
+        self.pending_label.pack()
 
-        # Action buttons
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(pady=10)
+        self.image_label = ttk.Label(main_frame)
+        self.image_label.pack(expand=True)
 
-        # Category selection buttons
-        for category in self.categories:
-            ttk.Button(button_frame, text=category, 
-                       command=lambda cat=category: self.move_image_to_category(cat), 
-                       style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        # Optional timing overlay, toggled with F2
+        self.metrics_label = ttk.Label(main_frame, text="", font=('Arial', 9))
+        if self.show_metrics_overlay:
+            self.metrics_label.pack()
+
+        # Category selection buttons, filled by update_category_buttons
+        self.category_button_frame = ttk.Frame(main_frame)
+        self.category_button_frame.pack(pady=10)
+        self.button_categories = None
+
+        # Queue order and filters, answered from the metadata index without decoding
+        filter_row = ttk.Frame(main_frame)
+        filter_row.pack(pady=5)
+        order, camera, start, end = self.queue_filter
+        self.order_choice = ttk.Combobox(filter_row, values=[ORDER_FOLDER, ORDER_CAPTURE_TIME], state="readonly", width=13)
+        self.order_choice.set(order)
+        self.order_choice.pack(side="left", padx=2)
+        self.camera_choice = ttk.Combobox(filter_row, state="readonly", width=20)
+        self.camera_choice.set(camera)
+        self.camera_choice.pack(side="left", padx=2)
+        self.start_choice = ttk.Combobox(filter_row, state="readonly", width=9)
+        self.start_choice.set(start)
+        self.start_choice.pack(side="left", padx=2)
+        ttk.Label(filter_row, text="to").pack(side="left")
+        self.end_choice = ttk.Combobox(filter_row, state="readonly", width=9)
+        self.end_choice.set(end)
+        self.end_choice.pack(side="left", padx=2)
+        ttk.Button(filter_row, text="Apply", command=self.apply_queue_filter, style='TButton').pack(side="left", padx=5)
+        self.index_label = ttk.Label(filter_row, text=self.index_status, font=('Arial', 9))
+        self.index_label.pack(side="left", padx=5)
+        self.update_filter_choices()
 
         # Control buttons
         button_row2 = ttk.Frame(main_frame)
@@ -245,10 +711,412 @@ class SortifyV1:
         ttk.Button(button_row2, text="Delete", command=self.delete_image, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
         ttk.Button(button_row2, text="Next", command=self.next_image, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
         ttk.Button(button_row2, text="Undo", command=self.undo_last_action, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row2, text="Grid", command=self.show_grid, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
         ttk.Button(button_row2, text="Change Folder", command=self.change_folder_during_sorting, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
 
         self.github_credit()
 
+        # Keyboard shortcuts: 1-9 and 0 for the first ten categories
+        self.root.bind("<Key>", self.on_sorting_key)
+        self.root.bind("<Delete>", lambda e: self.sorting_view is not None and self.delete_image())
+        self.root.bind("<Right>", lambda e: self.sorting_view is not None and self.next_image())
+        self.root.bind("<Return>", lambda e: self.sorting_view is not None and self.accept_suggestion())
+        self.root.bind("<Control-z>", lambda e: self.sorting_view is not None and self.undo_last_action())
+        self.root.bind("<g>", lambda e: self.sorting_view is not None and self.show_grid())
+        self.root.bind("<F2>", lambda e: self.sorting_view is not None and self.toggle_metrics_overlay())
+        self.root.bind("<F3>", lambda e: self.export_metrics())
+
+        self.sorting_view = main_frame
+
+    def update_filter_choices(self):
+        """Fill the camera and date filters with the values found by the metadata index"""
+        if self.sorting_view is None:
+            return
+        if self.metadata_index is None or not self.metadata_index.ready:
+            cameras, months = [], []
+        else:
+            cameras = [camera for camera, _ in self.metadata_index.cameras()]
+            months = self.metadata_index.months()
+        self.camera_choice.configure(values=[ALL_CAMERAS] + cameras)
+        self.start_choice.configure(values=[ANY_DATE] + months)
+        self.end_choice.configure(values=[ANY_DATE] + months)
+        self.index_label.configure(text=self.index_status)
+
+    def apply_queue_filter(self):
+        """Reorder and filter the unsorted images by capture time, camera and date range"""
+        if self.metadata_index is None or not self.metadata_index.ready:
+            self.show_notification("Metadata index is still being built", "info")
+            return
+
+        self.queue_filter = (self.order_choice.get(), self.camera_choice.get(),
+                             self.start_choice.get(), self.end_choice.get())
+        order, camera, start, end = self.queue_filter
+        matching, rest = self.metadata_index.query(
+            self.image_list + self.hidden_images,
+            camera=None if camera == ALL_CAMERAS else camera,
+            start=None if start == ANY_DATE else start,
+            end=None if end == ANY_DATE else end,
+            order_by_time=order == ORDER_CAPTURE_TIME)
+
+        if not matching:
+            self.show_notification("No images match the filter", "info")
+            return
+        self.image_list[:] = matching
+        self.hidden_images = rest
+        self.current_index = 0
+        self.show_image()
+        if rest:
+            self.show_notification(f"{len(rest)} images hidden by the filter", "info")
+
+    def update_category_buttons(self):
+        """Rebuild the category buttons only when the category list changed"""
+        if self.button_categories == tuple(self.categories):
+            return
+
+        for widget in self.category_button_frame.winfo_children():
+            widget.destroy()
+
+        # The same buttons move the current image or the grid selection
+        move = self.move_selection_to_category if self.grid is not None else self.move_image_to_category
+        self.category_buttons = {}
+        for position, category in enumerate(self.categories):
+            text = f"{(position + 1) % 10} {category}" if position < 10 else category
+            button = ttk.Button(self.category_button_frame, text=text, 
+                                command=lambda cat=category: move(cat), 
+                                style='TButton')
+            button.pack(side="left", padx=5, ipadx=10, ipady=5)
+            self.category_buttons[category] = button
+        self.suggested_category = None
+
+        self.button_categories = tuple(self.categories)
+
+    def on_sorting_key(self, event):
+        """Move the current image, or the grid selection, with the number key of a category"""
+        if not event.char.isdigit():
+            return
+        position = (int(event.char) - 1) % 10
+        if position >= len(self.categories):
+            return
+        if self.grid is not None:
+            self.move_selection_to_category(self.categories[position])
+        elif self.sorting_view is not None:
+            self.move_image_to_category(self.categories[position])
+
+    def show_grid(self):
+        """Switch to the thumbnail grid to sort many images at once"""
+        self.clear_window()
+
+        main_frame = ttk.Frame(self.root, padding=10)
+        main_frame.pack(fill="both", expand=True)
+
+        self.progress_label = ttk.Label(main_frame, text=f"Images: {self.sorted_images}/{self.total_images}",
+                                        font=('Arial', 12))
+        self.progress_label.pack(pady=5)
+        self.pending_label = ttk.Label(main_frame, text="", font=('Arial', 10))
+        self.pending_label.pack()
+
+        # Only the visible rows are drawn and decoded, so large folders stay responsive
+        self.grid = ThumbnailGrid(main_frame, self.load_preview, bg_color=self.root.bg_color,
+                                  select_color=self.root.accent_color, on_open=self.open_from_grid)
+        self.grid.frame.pack(fill="both", expand=True, pady=5)
+
+        # Category buttons move every selected image
+        self.category_button_frame = ttk.Frame(main_frame)
+        self.category_button_frame.pack(pady=5)
+        self.button_categories = None
+        self.update_category_buttons()
+
+        button_row2 = ttk.Frame(main_frame)
+        button_row2.pack(pady=5)
+
+        ttk.Button(button_row2, text="Select All", command=self.grid.select_all, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row2, text="Undo", command=self.undo_last_action, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+        ttk.Button(button_row2, text="Single View", command=self.show_single_view, style='TButton').pack(side="left", padx=5, ipadx=10, ipady=5)
+
+        self.github_credit()
+
+        self.root.bind("<Key>", self.on_sorting_key)
+        self.root.bind("<Control-z>", lambda e: (self.sorting_view is not None or self.grid is not None)
+                       and self.undo_last_action())
+        self.root.bind("<Control-a>", lambda e: self.grid is not None and self.grid.select_all())
+        self.root.bind("<Escape>", lambda e: self.grid is not None and self.show_single_view())
+
+        self.grid.set_items(self.folder_path, self.image_list)
+
+    def show_single_view(self):
+        """Leave the grid for the one-image-at-a-time view"""
+        self.clear_window()
+        if self.current_index >= len(self.image_list):
+            self.current_index = 0
+        self.show_image()
+
+    def open_from_grid(self, index):
+        """Show a double-clicked thumbnail in the single image view"""
+        self.current_index = index
+        self.show_single_view()
+
+    def move_selection_to_category(self, category):
+        """Move every image selected in the grid to a category folder as one undoable batch"""
+        filenames = self.grid.selected_paths()
+        if not filenames:
+            self.show_notification("No images selected", "info")
+            return
+
+        destination_folder = os.path.join(self.folder_path, category)
+        batch = {
+            'original_paths': [os.path.join(self.folder_path, filename) for filename in filenames],
+            'destination_path': destination_folder,
+            'filenames': filenames,
+            'action': 'move'
+        }
+
+        self.file_ops.submit(move_images, batch['original_paths'], destination_folder,
+                             self.transfer_workers, self.verify_transfers,
+                             on_done=lambda results: self.rollback_batch(batch, results),
+                             on_error=lambda error: self.rollback_batch(batch, [None] * len(filenames), error))
+
+        # The grid shares image_list, so filter it in place
+        moved = set(filenames)
+        self.image_list[:] = [filename for filename in self.image_list if filename not in moved]
+        self.sorted_images += len(filenames)
+        if self.current_index >= len(self.image_list):
+            self.current_index = 0
+        self.refresh_view()
+
+    def rollback_batch(self, batch, results, error=None):
+        """Put images whose background batch move failed back into the queue"""
+        failed = [filename for filename, result in zip(batch['filenames'], results) if result is None]
+        if not failed:
+            return
+        if batch['original_paths'][0] == os.path.join(self.folder_path, batch['filenames'][0]):
+            restored = [filename for filename in failed if os.path.exists(os.path.join(self.folder_path, filename))]
+            self.requeue_images(restored)
+            self.sorted_images -= len(restored)
+            if restored:
+                self.refresh_view()
+        reason = f": {error}" if error else ""
+        self.show_notification(f"Failed to move {len(failed)} of {len(batch['filenames'])} images{reason}", "error")
+
+    def refresh_view(self):
+        """Redisplay the grid or the current image after the queue changed"""
+        if self.grid is not None:
+            self.progress_label.configure(text=f"Images: {self.sorted_images}/{self.total_images}")
+            self.grid.refresh()
+        elif self.sorting_view is not None and self.image_list:
+            self.show_image()
+
+    def show_image(self):
+        """Display current image with controls"""
+        if self.sorting_view is None:
+            self.build_sorting_view()
+        self.update_category_buttons()
+        
+        self.progress_label.configure(text=f"Images: {self.sorted_images}/{self.total_images}")
+        self.update_pending_label()
+        
+        if self.current_index < len(self.image_list):
+            image_path = os.path.join(self.folder_path, self.image_list[self.current_index])
+            
+            try:
+                # The prefetch threads fitted the image to the window already; the decoded mip level
+                # it came from is kept to serve resizes
+                display_size = self.preview_size()
+                self.current_mip_level = mip_level(display_size)
+                image = self.prefetcher.get_display(image_path, self.current_mip_level, display_size)
+                self.current_mip = self.prefetcher.get(image_path, self.current_mip_level)
+                self.current_mip_path = image_path
+                self.schedule_prefetch()
+                self.display_image(image)
+                self.record_transition()
+                self.highlight_suggestion(image_path)
+            
+            except Exception as e:
+                self.current_mip = None
+                self.image_label.configure(image="")
+                self.highlight_suggestion(None)
+                self.show_notification(f"Failed to load image: {e}", "error")
+        else:
+            self.current_mip = None
+            self.image_label.configure(image="")
+            self.highlight_suggestion(None)
+
+    def highlight_suggestion(self, image_path):
+        """
+        Mark the category button the suggester expects for an image; Enter accepts it
+        Args:
+            image_path: Displayed image, None to clear the mark
+        """
+        suggestion = None
+        if self.suggester is not None and image_path is not None:
+            suggestion = self.suggester.suggestion(image_path, self.categories)
+        category = suggestion.category if suggestion is not None else None
+        if category == self.suggested_category:
+            return
+        for name in (self.suggested_category, category):
+            if name in self.category_buttons:
+                self.category_buttons[name].configure(style='Suggested.TButton' if name == category else 'TButton')
+        self.suggested_category = category
+
+    def accept_suggestion(self):
+        """Move the current image to the highlighted category"""
+        if self.suggested_category is not None:
+            self.move_image_to_category(self.suggested_category)
+
+    def learn_from_moves(self):
+        """Update the suggestion model with moves and undos that finished, in the background"""
+        if self.suggester is not None:
+            self.suggester.refresh()
+
+    def render_current_image(self, resample):
+        """Fit the current mip level into the window and display it"""
+        with metrics.timer("resize", self.current_mip_path):
+            image = fit_image(self.current_mip, self.preview_size(), resample)
+        self.display_image(image)
+
+    def display_image(self, image):
+        """Show an image already fitted to the window"""
+        with metrics.timer("photoimage", self.current_mip_path):
+            self.current_image = ImageTk.PhotoImage(image)
+        with metrics.timer("widget", self.current_mip_path):
+            self.image_label.configure(image=self.current_image)
+
+    def on_window_resize(self, event):
+        """Rescale the current image while the window is being resized"""
+        if event.widget is not self.root or self.sorting_view is None or self.current_mip is None:
+            return
+        if (event.width, event.height) == self.window_size:
+            return
+        self.window_size = (event.width, event.height)
+
+        # Cheap filter while dragging, throttled to one render per frame batch
+        if self.resize_render_job is None:
+            self.resize_render_job = self.root.after(30, self.render_while_resizing)
+
+        # High quality render once the drag has stopped
+        if self.resize_settle_job is not None:
+            self.root.after_cancel(self.resize_settle_job)
+        self.resize_settle_job = self.root.after(250, self.finish_resize)
+
+    def render_while_resizing(self):
+        """Fast preview render during a drag"""
+        self.resize_render_job = None
+        if self.sorting_view is not None and self.current_mip is not None:
+            self.render_current_image(Image.BILINEAR)
+
+    def finish_resize(self):
+        """Final render after resizing, moving to a larger mip level if the window outgrew this one"""
+        self.resize_settle_job = None
+        if self.sorting_view is None or self.current_mip is None:
+            return
+        level = mip_level(self.preview_size())
+        # A larger level only helps if the current one was limited by the level, not by the source
+        if level[0] > self.current_mip_level[0] and max(self.current_mip.size) >= self.current_mip_level[0]:
+            # Decode once at the larger level; later resizes are served from it again
+            self.current_mip = self.prefetcher.get(self.current_mip_path, level)
+            self.current_mip_level = level
+            self.schedule_prefetch()
+        self.render_current_image(Image.LANCZOS)
+
+    def record_transition(self):
+        """Record time-to-next-image for the action that led to the current image"""
+        if self.transition_start is not None:
+            metrics.record("next_image", time.perf_counter() - self.transition_start)
+            self.transition_start = None
+        if self.show_metrics_overlay:
+            self.update_metrics_overlay()
+
+    def update_metrics_overlay(self):
+        """Show the latest and typical time-to-next-image"""
+        last = metrics.last("next_image")
+        rows = [row for row in metrics.summary() if row['stage'] == "next_image"]
+        text = f"Next image: {last * 1000:.0f} ms" if last is not None else "Next image: -"
+        if rows:
+            text += f"  (p50 {rows[0]['p50_ms']:.0f} ms, p90 {rows[0]['p90_ms']:.0f} ms)"
+        self.metrics_label.configure(text=text)
+
+    def toggle_metrics_overlay(self):
+        """Show or hide the timing overlay; showing it turns metrics collection on"""
+        self.show_metrics_overlay = not self.show_metrics_overlay
+        if self.show_metrics_overlay:
+            metrics.enabled = True
+            self.metrics_label.pack(after=self.image_label)
+            self.update_metrics_overlay()
+        else:
+            self.metrics_label.pack_forget()
+
+    def export_metrics(self):
+        """Write collected timing percentiles to metrics.json in the app directory"""
+        if not metrics.enabled:
+            self.show_notification("Metrics are off, press F2 or set SORTIFY_METRICS=1", "info")
+            return
+        path = os.path.join(get_app_dir(), "metrics.json")
+        metrics.export(path)
+        self.show_notification(f"Metrics written to {path}", "info")
+
+    def load_preview(self, image_path, max_size):
+        """Prefetch loader: persistent preview cache first, then a decode in the selected RAW mode"""
+        if not self.persistent_cache:
+            image = self.decode_preview(image_path, max_size)
+        else:
+            image = preview_store.load(image_path, max_size, self.decode_preview, variant=self.raw_mode)
+        if self.suggester is not None:
+            # Features come from the preview just decoded, so the suggestion is ready before the image is shown
+            try:
+                self.suggester.observe(image_path, image, self.categories)
+            except Exception as e:
+                logger.debug("No category suggestion for %s: %s", image_path, e)
+        return image
+
+    def decode_preview(self, image_path, max_size):
+        """Decode a preview, taking the orientation from the metadata index when it has the file"""
+        index = self.metadata_index
+        orientation = index.orientation(image_path) if index is not None else None
+        return load_preview(image_path, max_size, self.raw_mode, orientation)
+
+    def set_raw_mode(self, mode):
+        """Switch RAW preview quality and redisplay the current image"""
+        if mode not in RAW_MODES:
+            raise ValueError(f"Unknown RAW preview mode: {mode}")
+        self.raw_mode = mode
+        self.prefetcher.cancel()
+        self.prefetcher.cache.clear()
+        if self.image_list:
+            self.show_image()
+
+    def preview_size(self):
+        """Return the maximum preview size for the current window"""
+        window_width = self.root.winfo_width()
+        window_height = self.root.winfo_height()
+        if window_width <= 1 or window_height <= 1:
+            # Window not mapped yet: wait for pending geometry, else use the requested size
+            self.root.update_idletasks()
+            window_width = max(self.root.winfo_width(), DEFAULT_WINDOW_SIZE[0])
+            window_height = max(self.root.winfo_height(), DEFAULT_WINDOW_SIZE[1])
+        return (int(window_width * 0.8), int(window_height * 0.8))
+
+    def schedule_prefetch(self):
+        """Queue background decoding of upcoming images and the last moved one"""
+        self.prefetch_level = mip_level(self.preview_size())
+        upcoming = self.image_list[self.current_index + 1:self.current_index + 1 + self.prefetcher.lookahead]
+        paths = [os.path.join(self.folder_path, filename) for filename in upcoming]
+
+        # Keep the previous image warm so undo can redisplay it instantly
+        last_action = getattr(self.root, 'last_action', None)
+        if last_action and last_action['action'] == 'move':
+            paths.append(last_action['original_path'])
+
+        self.prefetcher.schedule(paths, self.prefetch_level, self.preview_size())
+
+    def reset_prefetch(self):
+        """Drop queued and cached previews when the image queue is replaced"""
+        self.scan_generation += 1  # Stop feeding the old folder's scan into the queue
+        self.stop_watching()
+        self.prefetcher.cancel()
+        self.prefetcher.cache.clear()
+        self.root.last_action = None
+        self.metadata_index = None
+        self.hidden_images = []
+
     def change_folder_during_sorting(self):
         """Handle folder change during sorting process"""
         confirmation = messagebox.askyesno(
@@ -260,11 +1128,11 @@ class SortifyV1:
             self.categories = []
             folder = filedialog.askdirectory()
 
-            if folder and is_valid_folder(folder):
+            if folder and is_valid_folder(folder, self.recursive_scan):
                 self.folder_path = folder
-                subfolders = [f for f in os.listdir(folder) 
-                              if os.path.isdir(os.path.join(folder, f))]
-                self.categories = subfolders
+                self.reset_prefetch()
+                self.categories = list_subfolders(folder)
+                self.start_duplicate_scan()
                 self.create_category_menu()
             else:
                 self.show_notification("Invalid folder or no images found!", "error")
@@ -272,70 +1140,137 @@ class SortifyV1:
     def move_image_to_category(self, category):
         """Move image to selected category folder"""
         if self.current_index < len(self.image_list):
-            image_path = os.path.join(self.folder_path, self.image_list[self.current_index])
+            filename = self.image_list[self.current_index]
+            image_path = os.path.join(self.folder_path, filename)
             destination_folder = os.path.join(self.folder_path, category)
             
             # Save action details for undo
             current_image = {
                 'original_path': image_path, 
                 'destination_path': destination_folder, 
-                'filename': self.image_list[self.current_index],
+                'filename': filename,
                 'action': 'move'
             }
             
-            move_image(image_path, destination_folder)
-            del self.image_list[self.current_index]
-            self.sorted_images += 1
-            
-            if self.current_index >= len(self.image_list):
-                self.current_index = 0
-            
+            # The move runs in the background; the view advances right away
+            self.transition_start = time.perf_counter()
+            self.file_ops.submit(move_image, image_path, destination_folder, self.verify_transfers,
+                                 on_done=lambda result: result or self.rollback_operation(current_image),
+                                 on_error=lambda error: self.rollback_operation(current_image, error))
+            self.remove_current_image()
             self.root.last_action = current_image
             self.show_image()
     
     def delete_image(self):
         """Delete current image permanently"""
         if self.current_index < len(self.image_list):
-            image_path = os.path.join(self.folder_path, self.image_list[self.current_index])
+            filename = self.image_list[self.current_index]
+            image_path = os.path.join(self.folder_path, filename)
             
             # Save action details for undo
             current_image = {
                 'original_path': image_path, 
-                'filename': self.image_list[self.current_index],
+                'filename': filename,
                 'action': 'delete'
             }
             
-            delete_image(image_path)
-            del self.image_list[self.current_index]
-            self.sorted_images += 1
-            
-            if self.current_index >= len(self.image_list):
-                self.current_index = 0
-            
+            self.transition_start = time.perf_counter()
+            self.file_ops.submit(delete_image, image_path,
+                                 on_done=lambda result: result or self.rollback_operation(current_image),
+                                 on_error=lambda error: self.rollback_operation(current_image, error))
+            self.prefetcher.discard(image_path)
+            self.remove_current_image()
             self.root.last_action = current_image
             self.show_image()
+
+    def remove_current_image(self):
+        """Take the current image out of the queue after it was sorted"""
+        del self.image_list[self.current_index]
+        self.sorted_images += 1
+        
+        if self.current_index >= len(self.image_list):
+            self.current_index = 0
+
+    def rollback_operation(self, action, error=None):
+        """Put an image whose background move or delete failed back into the queue"""
+        if action['original_path'] != os.path.join(self.folder_path, action['filename']):
+            return  # Folder changed since the operation was queued
+        if os.path.exists(action['original_path']):
+            self.requeue_images([action['filename']])
+            self.sorted_images -= 1
+            self.refresh_view()
+        reason = f": {error}" if error else ""
+        self.show_notification(f"Failed to {action['action']} {action['filename']}{reason}", "error")
     
     def undo_last_action(self):
-        """Undo the last performed action"""
-        last_action = undo_last_action()
+        """Undo the last performed action once every queued file operation before it has finished"""
+        self.transition_start = time.perf_counter()
+        self.file_ops.submit(undo_last_action, on_done=self.finish_undo,
+                             on_error=lambda error: self.show_notification(f"Undo failed: {error}", "error"))
+        self.update_pending_label()
 
+    def finish_undo(self, last_action):
+        """Update the view after an undo completed in the background"""
         if last_action:
             if last_action['type'] == 'move':
-                self.image_list.insert(self.current_index, os.path.basename(last_action['original_path']))
+                relative_path = relative_to_folder(last_action['original_path'], self.folder_path)
+                if relative_path is None:
+                    # Undo history survives restarts, so the file may belong to another folder
+                    self.show_notification(f"Restored {last_action['original_path']}", "info")
+                    return
+                self.requeue_images([relative_path])
                 self.sorted_images -= 1
-                self.show_image()
+                self.refresh_view()
+            elif last_action['type'] == 'batch':
+                # Actions come newest first
+                relative_paths = [relative_to_folder(action['original_path'], self.folder_path)
+                                  for action in reversed(last_action['actions']) if action['type'] == 'move']
+                relative_paths = [path for path in relative_paths if path is not None]
+                self.requeue_images(relative_paths)
+                self.sorted_images -= len(relative_paths)
+                self.show_notification(f"Restored {len(last_action['actions'])} images", "info")
+                if relative_paths:
+                    self.refresh_view()
             elif last_action['type'] == 'delete':
                 self.show_notification("Undo delete not fully supported yet", "error")
         else:
             self.show_notification("No action to undo", "info")
+
+    def poll_file_ops(self):
+        """Apply results of finished background file operations on the Tk thread"""
+        try:
+            if self.file_ops.process_completed():
+                self.learn_from_moves()
+            self.update_pending_label()
+        finally:
+            self.root.after(50, self.poll_file_ops)
+
+    def update_pending_label(self):
+        """Show how many file operations are still running"""
+        if self.pending_label is not None and self.pending_label.winfo_exists():
+            pending = self.file_ops.pending()
+            self.pending_label.configure(text=f"Pending: {pending}" if pending else "")
+
+    def on_close(self):
+        """Let queued file operations finish before the window closes"""
+        self.file_ops.wait()
+        self.stop_watching()
+        if self.suggester is not None:
+            self.suggester.close()
+        self.prefetcher.shutdown()
+        if self.grid is not None:
+            self.grid.close()
+        self.root.destroy()
     
     def next_image(self):
         """Skip to next image in queue"""
+        self.transition_start = time.perf_counter()
         self.current_index += 1
         if self.current_index < len(self.image_list):
             self.show_image()
         else:
             self.show_notification("No more images to sort!", "info")
+            self.stop_watching()
             self.create_main_menu()
     
     def show_notification(self, message, level="info"):
@@ -0,0 +1,341 @@
+import io
+import logging
+import math
+import os
+import threading
+import time
+from PIL import ExifTags, Image, ImageOps
+from metrics import metrics
+from utils import HEIF_EXTENSIONS, RAW_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION_TAG = 0x0112  # EXIF orientation
+MODEL_TAG = 0x0110        # EXIF camera model
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# EXIF orientations mapped to the transpose that puts the image upright
+ORIENTATION_TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+
+_codec_lock = threading.Lock()
+_heif_registered = False
+
+# Full HEIC decodes allowed at once and libheif threads each of them uses
+HEIF_DECODE_WORKERS = 2
+_heif_decode_slots = threading.BoundedSemaphore(HEIF_DECODE_WORKERS)
+_heif_decode_threads = max(1, (os.cpu_count() or 2) // HEIF_DECODE_WORKERS)
+
+def ensure_heif_support():
+    """Import pillow_heif and register its Pillow opener the first time a HEIF file is seen"""
+    global _heif_registered
+    if _heif_registered:
+        return
+    with _codec_lock:
+        if not _heif_registered:
+            import pillow_heif
+            pillow_heif.register_heif_opener()  # Enable HEIF/HEIC support
+            pillow_heif.options.DECODE_THREADS = _heif_decode_threads
+            _heif_registered = True
+
+def configure_heif_decoding(workers=HEIF_DECODE_WORKERS, threads=None):
+    """
+    Bound the CPU used by full HEIC decodes
+    Args:
+        workers: Number of HEIC images decoded at the same time
+        threads: libheif threads per decode, defaults to the CPU count shared among the workers
+    """
+    global _heif_decode_slots, _heif_decode_threads
+    with _codec_lock:
+        _heif_decode_slots = threading.BoundedSemaphore(workers)
+        _heif_decode_threads = threads or max(1, (os.cpu_count() or 2) // workers)
+        if _heif_registered:
+            import pillow_heif
+            pillow_heif.options.DECODE_THREADS = _heif_decode_threads
+
+def import_rawpy():
+    """Import rawpy on demand; it is only needed once a RAW file is opened"""
+    import rawpy
+    return rawpy
+
+# Long edges of the decoded intermediates (mip levels) that displayed previews are resized from
+MIP_LEVELS = (640, 1280, 2560, 5120)
+
+def mip_level(max_size):
+    """
+    Pick the smallest mip level that can serve a display size without upscaling
+    Args:
+        max_size: (max_width, max_height) display bounding box
+    Returns:
+        (edge, edge) bounding box of the mip level
+    """
+    needed = max(max_size)
+    for level in MIP_LEVELS:
+        if level >= needed:
+            return (level, level)
+    return (MIP_LEVELS[-1], MIP_LEVELS[-1])
+
+# RAW preview quality modes, from fastest to most accurate
+RAW_MODE_EMBEDDED = "embedded"  # Camera JPEG preview, falling back to half-size decode
+RAW_MODE_HALF = "half"          # Half-size demosaicing
+RAW_MODE_FULL = "full"          # Full resolution postprocess
+RAW_MODES = (RAW_MODE_EMBEDDED, RAW_MODE_HALF, RAW_MODE_FULL)
+
+# LibRaw flip codes mapped to the transpose that puts the image upright
+RAW_FLIP_TRANSPOSE = {
+    3: Image.ROTATE_180,
+    5: Image.ROTATE_90,
+    6: Image.ROTATE_270,
+}
+
+def load_raw_image(raw_path, mode=RAW_MODE_EMBEDDED, min_size=None):
+    """
+    Reads RAW image files and converts them to Pillow format
+    Args:
+        raw_path: Path of the RAW file
+        mode: One of RAW_MODES
+        min_size: (width, height) the embedded preview must cover to be used
+    Returns:
+        Pillow image with the decode path used stored in info['raw_decode_path']
+        and the camera model, if known, in info['raw_camera']
+    """
+    if mode not in RAW_MODES:
+        raise ValueError(f"Unknown RAW preview mode: {mode}")
+
+    rawpy = import_rawpy()
+    with rawpy.imread(raw_path) as raw:
+        # Only the embedded JPEG carries the camera EXIF, so read it before picking a decode path
+        preview = read_embedded_preview(raw)
+        camera = preview.getexif().get(MODEL_TAG) if preview is not None else None
+
+        if mode == RAW_MODE_EMBEDDED:
+            image = load_embedded_preview(raw, min_size, preview)
+            if image is not None:
+                image.info['raw_decode_path'] = "embedded"
+                image.info['raw_camera'] = camera
+                return image
+
+        if mode == RAW_MODE_FULL:
+            rgb = raw.postprocess(use_camera_wb=True)  # Convert RAW to RGB array
+            decode_path = "full"
+        else:
+            rgb = raw.postprocess(half_size=True, use_camera_wb=True)
+            decode_path = "half"
+
+        image = Image.fromarray(rgb)  # Convert array to Pillow Image
+        image.info['raw_decode_path'] = decode_path
+        image.info['raw_camera'] = camera
+        return image
+
+def read_embedded_preview(raw):
+    """
+    Open the camera's embedded preview of an open RAW file as stored, without decoding its pixels
+    Args:
+        raw: Open rawpy RawPy object
+    Returns:
+        Pillow image or None if no preview in a known format is embedded
+    """
+    rawpy = import_rawpy()
+    try:
+        thumb = raw.extract_thumb()
+    except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+        return None
+
+    if thumb.format == rawpy.ThumbFormat.JPEG:
+        return Image.open(io.BytesIO(thumb.data))
+    if thumb.format == rawpy.ThumbFormat.BITMAP:
+        return Image.fromarray(thumb.data)
+    return None
+
+def load_embedded_preview(raw, min_size=None, image=None):
+    """
+    Extract the camera's embedded preview from an open RAW file
+    Args:
+        raw: Open rawpy RawPy object
+        min_size: (width, height) the preview must cover to be used
+        image: Preview already returned by read_embedded_preview, read from raw if None
+    Returns:
+        Upright Pillow image or None if no usable preview is embedded
+    """
+    if image is None:
+        image = read_embedded_preview(raw)
+        if image is None:
+            return None
+
+    # Prefer the preview's own EXIF orientation, otherwise use the RAW flip flag
+    if image.getexif().get(ORIENTATION_TAG, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    elif raw.sizes.flip in RAW_FLIP_TRANSPOSE:
+        image = image.transpose(RAW_FLIP_TRANSPOSE[raw.sizes.flip])
+
+    if min_size and image.width < min_size[0] and image.height < min_size[1]:
+        return None  # Too small for the display, a real decode looks better
+
+    return image
+
+def load_heif_image(heif_path, min_size=None):
+    """
+    Load the primary image of a HEIF container, from its EXIF thumbnail when that is large enough
+    Args:
+        heif_path: Path of the HEIC/HEIF file
+        min_size: (width, height) the thumbnail must cover to be used, None to always decode
+    Returns:
+        Upright Pillow image with the decode path used stored in info['heif_decode_path']
+    """
+    ensure_heif_support()
+    import pillow_heif
+
+    heif_file = pillow_heif.open_heif(heif_path, convert_hdr_to_8bit=True)
+    # Burst and edited photos store several images; the primary one is what the camera shows
+    primary = heif_file[heif_file.primary_index]
+    # libheif applies the container's rotation while decoding, so the EXIF tag only describes the thumbnail
+    orientation = pillow_heif.set_orientation(primary.info) or 1
+
+    if min_size:
+        image = load_exif_thumbnail(primary.info.get('exif'), orientation, primary.size, min_size)
+        if image is not None:
+            image.info['heif_decode_path'] = "thumbnail"
+            return image
+
+    with _heif_decode_slots:
+        image = primary.to_pillow()
+    image.info['heif_decode_path'] = "primary"
+    return image
+
+def load_exif_thumbnail(exif_data, orientation, image_size, min_size):
+    """
+    Decode the JPEG thumbnail cameras store in the second EXIF IFD
+    Args:
+        exif_data: Raw EXIF bytes, optionally starting with 'Exif\\0\\0'
+        orientation: EXIF orientation of the stored thumbnail pixels
+        image_size: Upright (width, height) of the full image, used to reject mismatched thumbnails
+        min_size: (width, height) the thumbnail must cover to be used
+    Returns:
+        Upright Pillow image or None if there is no usable thumbnail
+    """
+    if not exif_data:
+        return None
+    exif = Image.Exif()
+    exif.load(exif_data)
+    thumbnail_ifd = exif.get_ifd(ExifTags.IFD.IFD1)
+    offset = thumbnail_ifd.get(ExifTags.Base.JpegIFOffset)
+    length = thumbnail_ifd.get(ExifTags.Base.JpegIFByteCount)
+    if not offset or not length:
+        return None
+
+    # Offsets count from the TIFF header, which follows the optional 'Exif\0\0' prefix
+    start = offset + (6 if exif_data.startswith(b"Exif") else 0)
+    try:
+        image = Image.open(io.BytesIO(exif_data[start:start + length]))
+        image.load()
+    except Exception:
+        return None
+
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    if (image.width > image.height) != (image_size[0] > image_size[1]):
+        return None  # Rotated differently from the image, cannot be trusted
+    if image.width < min_size[0] and image.height < min_size[1]:
+        return None  # Too small for the display, a real decode looks better
+    return image
+
+def load_preview(image_path, max_size, raw_mode=RAW_MODE_EMBEDDED, orientation=None):
+    """
+    Decode an image of any supported format, upright and shrunk to fit max_size
+    Args:
+        image_path: Source file path
+        max_size: (max_width, max_height) bounding box
+        raw_mode: RAW preview quality, one of RAW_MODES
+        orientation: EXIF orientation already known from the metadata index, None to read it from the file
+    Returns:
+        Pillow image no larger than max_size
+    """
+    file_extension = os.path.splitext(image_path)[1].lower()
+
+    # Load image based on format
+    if file_extension in RAW_EXTENSIONS:
+        start = time.perf_counter()
+        image = load_raw_image(image_path, raw_mode, max_size)
+        elapsed = time.perf_counter() - start
+        metrics.record("decode", elapsed, image_path)
+        camera = image.info.get('raw_camera') or "unknown camera"
+        logger.info("RAW preview %s (%s): %s in %.0f ms", os.path.basename(image_path), camera,
+                    image.info['raw_decode_path'], elapsed * 1000)
+    else:
+        with metrics.timer("decode", image_path):
+            image = open_scaled(image_path, max_size, orientation)
+
+    with metrics.timer("resize", image_path):
+        return fit_image(image, max_size)
+
+def open_scaled(image_path, max_size, orientation=None):
+    """
+    Open an image upright, letting the JPEG decoder skip resolution it does not need
+    Args:
+        image_path: Source file path
+        max_size: (max_width, max_height) the image will be shown at
+        orientation: Known EXIF orientation, None to parse it from the file
+    Returns:
+        Decoded Pillow image at least as large as max_size where the source allows
+    """
+    if os.path.splitext(image_path)[1].lower() in HEIF_EXTENSIONS:
+        return load_heif_image(image_path, max_size)
+
+    image = Image.open(image_path)
+    if orientation is None:
+        orientation = image.getexif().get(ORIENTATION_TAG, 1)
+
+    # The draft size is in stored pixels, so rotate the request along with the image
+    box = max_size
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        box = (max_size[1], max_size[0])
+
+    # JPEG DCT scaling: decode at the smallest 1/2, 1/4 or 1/8 scale still covering the fitted size
+    scale = min(box[0] / image.width, box[1] / image.height)
+    if image.format == "JPEG" and scale < 1:
+        image.draft(None, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+
+    image.load()  # Decode now, on the calling (worker) thread
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    return image
+
+def fit_image(image, max_size, resample=Image.LANCZOS):
+    """
+    Shrink an image to fit a bounding box, never enlarging it
+    Args:
+        image: Pillow image
+        max_size: (max_width, max_height) bounding box
+        resample: Filter used for the final resize
+    Returns:
+        Resized image, or the original one if it already fits
+    """
+    scale = min(max_size[0] / image.width, max_size[1] / image.height)
+    if scale >= 1:
+        return image
+
+    target = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+
+    # reduce rejects palette, bilevel and 16-bit images, and resize would filter palette indices as NEAREST
+    if image.mode in ("P", "PA"):
+        image = image.convert("RGBA" if image.mode == "PA" or "transparency" in image.info else "RGB")
+    elif image.mode == "1":
+        image = image.convert("L")
+    elif image.mode.startswith("I;16"):
+        image = image.convert("I")
+
+    # Cheap box reduction down to twice the target keeps the final filter fast
+    factor = int(1 / scale / 2)
+    if factor > 1:
+        image = image.reduce(factor)
+
+    return image.resize(target, resample)
\ No newline at end of file
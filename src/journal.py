@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ActionJournal:
+    """Append-only JSON lines file with batched fsync and atomic compaction"""
+    def __init__(self, path, flush_interval=1.0, flush_batch=64):
+        """
+        Args:
+            path: Journal file path
+            flush_interval: Longest time in seconds a record may wait for fsync
+            flush_batch: Number of pending records that triggers an early fsync
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = None
+
+    def read(self):
+        """
+        Read every intact record of the journal
+        Returns:
+            List of records; a torn last line from a crash is ignored
+        """
+        records = []
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as journal:
+                for line in journal:
+                    if not line.endswith("\n"):
+                        break  # Partial write at the point of a crash, cut off by _open
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        logger.warning("Skipping damaged journal record in %s", self.path)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def append(self, record):
+        """
+        Append one record; it is handed to the OS right away and reaches the disk with the next batched fsync
+        Args:
+            record: JSON serializable list
+        """
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            # Survives a crash of the process itself (e.g. in a decoder); only power loss waits for the fsync
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.flush_batch:
+                self._wakeup.set()
+
+    def rewrite(self, records):
+        """
+        Atomically replace the journal with a compacted record list
+        Args:
+            records: Records that fully describe the current state
+        """
+        temp_path = self.path + ".tmp"
+        with self._lock:
+            with open(temp_path, "w", encoding="utf-8") as journal:
+                for record in records:
+                    journal.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(temp_path, self.path)
+            self._pending = 0
+            self._open()
+
+    def flush(self):
+        """Write buffered records and fsync them"""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def close(self):
+        """Flush outstanding records and close the file"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        """Open the journal for appending and start the background flusher"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._truncate_torn_tail()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+            self._flusher.start()
+
+    def _truncate_torn_tail(self):
+        """Cut a half-written last line so new records start on a line of their own"""
+        try:
+            journal = open(self.path, "rb+")
+        except FileNotFoundError:
+            return
+        with journal:
+            end = journal.seek(0, os.SEEK_END)
+            position = end
+            # Search backwards for the end of the last complete record
+            while position > 0:
+                start = max(0, position - 4096)
+                journal.seek(start)
+                chunk = journal.read(position - start)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position != end:
+                logger.warning("Dropping %d bytes of a torn journal record in %s", end - position, self.path)
+                journal.truncate(position)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def _flush_loop(self):
+        """Background fsync so callers never wait on the disk"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("Journal flush error: %s", e)
\ No newline at end of file
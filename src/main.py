@@ -1,11 +1,22 @@
+# Start the startup timer before the heavier imports
+from utils import startup_timer
+import logging
+import multiprocessing
+
 # Import custom GUI components from the gui module
 from gui import ThemedTk, SortifyV1
+startup_timer.mark("imports")
 
 if __name__ == "__main__":
     """Main entry point for the application"""
+    multiprocessing.freeze_support()  # Metadata indexing uses a process pool
+    
+    # File operations and decode paths are reported through logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # Create the themed root window
     root = ThemedTk()
+    startup_timer.mark("window")
     
     # Initialize the main application with the root window
     app = SortifyV1(root)
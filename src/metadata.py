@@ -0,0 +1,122 @@
+import io
+import os
+from datetime import datetime
+from PIL import Image, ExifTags
+from image_loader import TRANSPOSED_ORIENTATIONS, ensure_heif_support, import_rawpy
+from utils import HEIF_EXTENSIONS, RAW_EXTENSIONS
+
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# LibRaw flip codes mapped to the equivalent EXIF orientation
+RAW_FLIP_ORIENTATION = {3: 3, 5: 8, 6: 6}
+
+def read_header(image_path):
+    """
+    Read EXIF tags and pixel dimensions without decoding pixels
+    Args:
+        image_path: Source file path
+    Returns:
+        (Pillow Exif object, (width, height) or None); the Exif is empty if the file carries none
+    """
+    extension = os.path.splitext(image_path)[1].lower()
+    if extension in HEIF_EXTENSIONS:
+        ensure_heif_support()
+
+    try:
+        with Image.open(image_path) as image:
+            return image.getexif(), image.size
+    except Exception:
+        pass
+
+    # RAW containers Pillow cannot parse usually embed a JPEG preview with the camera EXIF
+    if extension in RAW_EXTENSIONS:
+        try:
+            rawpy = import_rawpy()
+            with rawpy.imread(image_path) as raw:
+                size = (raw.sizes.width, raw.sizes.height)
+                flip = raw.sizes.flip
+                thumb = raw.extract_thumb()
+            exif = Image.Exif()
+            if thumb.format == rawpy.ThumbFormat.JPEG:
+                with Image.open(io.BytesIO(thumb.data)) as image:
+                    exif = image.getexif()
+            if ExifTags.Base.Orientation not in exif and flip in RAW_FLIP_ORIENTATION:
+                exif[ExifTags.Base.Orientation] = RAW_FLIP_ORIENTATION[flip]
+            return exif, size
+        except Exception:
+            pass
+
+    return Image.Exif(), None
+
+def read_exif(image_path):
+    """
+    Read EXIF tags without decoding pixels
+    Args:
+        image_path: Source file path
+    Returns:
+        Pillow Exif object, empty if the file carries none
+    """
+    return read_header(image_path)[0]
+
+def parse_exif_date(value):
+    """
+    Convert an EXIF date string to a datetime
+    Args:
+        value: 'YYYY:MM:DD HH:MM:SS' string or None
+    Returns:
+        datetime or None if missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip("\x00 ")[:19], EXIF_DATE_FORMAT)
+    except ValueError:
+        return None
+
+def clean_text(value):
+    """Strip the NUL padding cameras leave in EXIF strings"""
+    return str(value or "").strip("\x00 ")
+
+def extract_metadata(image_path):
+    """
+    Collect the metadata used by sorting rules and the metadata index. Safe to run in a worker process.
+    Args:
+        image_path: Source file path
+    Returns:
+        Dictionary with path, extension, file_size, mtime, mtime_ns, capture_time, camera, lens,
+        orientation, width and height (upright pixel size, None if unreadable)
+    """
+    stat = os.stat(image_path)
+    exif, size = read_header(image_path)
+    exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+
+    capture_time = (parse_exif_date(exif_ifd.get(ExifTags.Base.DateTimeOriginal))
+                    or parse_exif_date(exif.get(ExifTags.Base.DateTime))
+                    or datetime.fromtimestamp(stat.st_mtime))
+
+    make = clean_text(exif.get(ExifTags.Base.Make))
+    model = clean_text(exif.get(ExifTags.Base.Model))
+    # Many cameras repeat the make at the start of the model name
+    camera = model if model.lower().startswith(make.lower()) else f"{make} {model}".strip()
+    lens = clean_text(exif_ifd.get(ExifTags.Base.LensModel))
+
+    orientation = exif.get(ExifTags.Base.Orientation, 1)
+    if orientation not in range(1, 9):
+        orientation = 1
+    width, height = size or (None, None)
+    if size and orientation in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+
+    return {
+        'path': image_path,
+        'extension': os.path.splitext(image_path)[1].lower(),
+        'file_size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'mtime_ns': stat.st_mtime_ns,
+        'capture_time': capture_time,
+        'camera': camera or None,
+        'lens': lens or None,
+        'orientation': orientation,
+        'width': width,
+        'height': height
+    }
\ No newline at end of file
@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import as_completed
+from metadata import extract_metadata
+from metrics import metrics
+from utils import get_app_dir, open_database, process_pool
+
+logger = logging.getLogger(__name__)
+
+# Fields stored per image, in table column order after path
+INDEX_COLUMNS = ('file_size', 'mtime_ns', 'capture_time', 'camera', 'lens', 'orientation', 'width', 'height')
+
+def index_path(folder_path):
+    """
+    Location of a folder's metadata index
+    Args:
+        folder_path: Indexed folder
+    Returns:
+        SQLite file path in the app directory, named after a hash of the folder path
+    """
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(folder_path)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_app_dir(), "index", f"{key}.db")
+
+def index_record(metadata):
+    """Convert extract_metadata output to a table row without the path"""
+    return (metadata['file_size'], metadata['mtime_ns'],
+            metadata['capture_time'].isoformat(timespec="seconds"), metadata['camera'], metadata['lens'],
+            metadata['orientation'], metadata['width'], metadata['height'])
+
+class MetadataIndex:
+    """Per-folder SQLite index of EXIF fields, keyed by relative path and checked against size and mtime"""
+    def __init__(self, folder_path, db_path=None, workers=None, commit_batch=256):
+        """
+        Args:
+            folder_path: Folder whose images are indexed; paths are stored relative to it
+            db_path: SQLite file, defaults to index_path(folder_path)
+            workers: Extraction worker processes, defaults to the CPU count
+            commit_batch: Rows written per transaction while indexing
+        """
+        self.folder_path = folder_path
+        self.db_path = db_path or index_path(folder_path)
+        self.workers = workers
+        self.commit_batch = commit_batch
+        self.ready = False  # Set once a full update() has finished
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the folder's index, creating the index directory the first time"""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._connection = open_database(self.db_path, """
+                CREATE TABLE IF NOT EXISTS metadata (
+                    path TEXT PRIMARY KEY,
+                    file_size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    capture_time TEXT NOT NULL,
+                    camera TEXT,
+                    lens TEXT,
+                    orientation INTEGER NOT NULL,
+                    width INTEGER,
+                    height INTEGER
+                )""", "CREATE INDEX IF NOT EXISTS metadata_capture_time ON metadata (capture_time)")
+        return self._connection
+
+    def update(self, relative_paths, progress=None):
+        """
+        Bring the index up to date, extracting EXIF only for new or changed files
+        Args:
+            relative_paths: Every image currently in the folder; rows for other paths are dropped
+            progress: Optional callable (done, total) called as extraction results arrive
+        Returns:
+            Number of files that were (re)extracted
+        """
+        with self._lock:
+            stored = {row[0]: (row[1], row[2]) for row in
+                      self._connect().execute("SELECT path, file_size, mtime_ns FROM metadata")}
+
+        stale = []
+        for relative_path in relative_paths:
+            try:
+                stat = os.stat(os.path.join(self.folder_path, relative_path))
+            except OSError:
+                continue
+            if stored.pop(relative_path, None) != (stat.st_size, stat.st_mtime_ns):
+                stale.append(relative_path)
+
+        # Whatever is left in stored was moved, renamed or deleted since the last run
+        if stored:
+            with self._lock:
+                self._connection.executemany("DELETE FROM metadata WHERE path = ?", [(path,) for path in stored])
+                self._connection.commit()
+
+        if stale:
+            with metrics.timer("index"):
+                self._extract(stale, progress)
+        self.ready = True
+        return len(stale)
+
+    def _extract(self, relative_paths, progress):
+        """Run extract_metadata in a process pool and write the rows in batches"""
+        rows = []
+        done = 0
+        with process_pool(self.workers) as executor:
+            futures = {executor.submit(extract_metadata, os.path.join(self.folder_path, relative_path)): relative_path
+                       for relative_path in relative_paths}
+            for future in as_completed(futures):
+                done += 1
+                try:
+                    rows.append((futures[future],) + index_record(future.result()))
+                except Exception as e:
+                    logger.warning("Cannot index %s: %s", futures[future], e)
+                if len(rows) >= self.commit_batch:
+                    self._write(rows)
+                    rows = []
+                if progress is not None:
+                    progress(done, len(relative_paths))
+        self._write(rows)
+
+    def _write(self, rows):
+        """Insert or replace a batch of rows in one transaction"""
+        if not rows:
+            return
+        with self._lock:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO metadata VALUES ({', '.join('?' * (len(INDEX_COLUMNS) + 1))})", rows)
+            self._connection.commit()
+
+    def get(self, relative_path):
+        """
+        Indexed metadata of one image
+        Args:
+            relative_path: Path relative to the indexed folder
+        Returns:
+            Dictionary of INDEX_COLUMNS or None if not indexed
+        """
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(INDEX_COLUMNS)} FROM metadata WHERE path = ?", (relative_path,)).fetchone()
+        return dict(zip(INDEX_COLUMNS, row)) if row else None
+
+    def orientation(self, image_path):
+        """
+        EXIF orientation of an image if the index still matches the file
+        Args:
+            image_path: Absolute file path
+        Returns:
+            Orientation 1-8, or None when the file is not indexed or changed since
+        """
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        row = self.get(os.path.relpath(image_path, self.folder_path))
+        if row is None or (row['file_size'], row['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return row['orientation']
+
+    def cameras(self):
+        """
+        Cameras present in the index
+        Returns:
+            List of (camera, image count) pairs, most common first
+        """
+        with self._lock:
+            return self._connect().execute(
+                "SELECT camera, COUNT(*) FROM metadata WHERE camera IS NOT NULL "
+                "GROUP BY camera ORDER BY COUNT(*) DESC, camera").fetchall()
+
+    def months(self):
+        """
+        Capture months present in the index
+        Returns:
+            Sorted list of 'YYYY-MM' strings
+        """
+        with self._lock:
+            return [row[0] for row in self._connect().execute(
+                "SELECT DISTINCT substr(capture_time, 1, 7) FROM metadata ORDER BY 1")]
+
+    def query(self, relative_paths, camera=None, start=None, end=None, order_by_time=True):
+        """
+        Filter and order images using only indexed metadata
+        Args:
+            relative_paths: Images to choose from
+            camera: Keep only this camera, None for all
+            start: Earliest capture date as an ISO prefix such as 'YYYY-MM' or 'YYYY-MM-DD', None for no limit
+            end: Latest capture date as an ISO prefix (inclusive), None for no limit
+            order_by_time: Sort by capture time; otherwise keep the input order
+        Returns:
+            (matching, rest): matching paths in display order, and the remaining paths in input order.
+            Images missing from the index only match when no filter is set and go last.
+        """
+        with self._lock:
+            rows = {path: (capture_time, row_camera) for path, capture_time, row_camera in
+                    self._connect().execute("SELECT path, capture_time, camera FROM metadata")}
+
+        filtered = camera is not None or start is not None or end is not None
+        matching, rest, unindexed = [], [], []
+        for relative_path in relative_paths:
+            row = rows.get(relative_path)
+            if row is None:
+                (rest if filtered else unindexed).append(relative_path)
+                continue
+            capture_time, row_camera = row
+            if ((camera is not None and row_camera != camera)
+                    or (start is not None and capture_time[:len(start)] < start)
+                    or (end is not None and capture_time[:len(end)] > end)):
+                rest.append(relative_path)
+            else:
+                matching.append((capture_time, relative_path))
+
+        if order_by_time:
+            matching.sort()
+        return [relative_path for _, relative_path in matching] + unindexed, rest
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
\ No newline at end of file
@@ -0,0 +1,174 @@
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bounds of the file size buckets metrics are grouped by
+SIZE_BUCKETS = (
+    (1024 * 1024, "<1MB"),
+    (10 * 1024 * 1024, "1-10MB"),
+    (50 * 1024 * 1024, "10-50MB"),
+)
+
+def size_bucket(file_size):
+    """
+    Group a file size into a coarse bucket
+    Args:
+        file_size: Size in bytes, or None
+    Returns:
+        Bucket label
+    """
+    if file_size is None:
+        return ""
+    for limit, label in SIZE_BUCKETS:
+        if file_size < limit:
+            return label
+    return ">50MB"
+
+def file_labels(path):
+    """
+    Format and size bucket labels of a file
+    Args:
+        path: File path
+    Returns:
+        (format, size bucket) tuple
+    """
+    try:
+        file_size = os.path.getsize(path)
+    except OSError:
+        file_size = None
+    return os.path.splitext(path)[1].lower().lstrip("."), size_bucket(file_size)
+
+class _NullTimer:
+    """Timer used while metrics are disabled; does nothing"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    """Context manager recording the duration of one stage"""
+    __slots__ = ("metrics", "key", "start")
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics._add(self.key, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """Rolling per-stage timings, grouped by file format and size"""
+    def __init__(self, enabled=False, window=1024):
+        """
+        Args:
+            enabled: Start collecting immediately
+            window: Number of most recent samples kept per stage/format/size
+        """
+        self.enabled = enabled
+        self.window = window
+        self._samples = {}  # (stage, format, size bucket) -> deque of seconds
+        self._last = {}     # stage -> most recent seconds
+        self._lock = threading.Lock()
+
+    def timer(self, stage, path=None):
+        """
+        Time a block of code
+        Args:
+            stage: Stage name such as 'decode' or 'move'
+            path: File the stage works on, used for format and size grouping
+        Returns:
+            Context manager; a shared no-op one while disabled
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, (stage,) + (file_labels(path) if path else ("", "")))
+
+    def record(self, stage, seconds, path=None):
+        """
+        Record a duration measured elsewhere
+        Args:
+            stage: Stage name
+            seconds: Duration
+            path: File the stage worked on
+        """
+        if self.enabled:
+            self._add((stage,) + (file_labels(path) if path else ("", "")), seconds)
+
+    def _add(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._last[key[0]] = seconds
+
+    def last(self, stage):
+        """
+        Most recent duration of a stage
+        Returns:
+            Seconds or None if never recorded
+        """
+        with self._lock:
+            return self._last.get(stage)
+
+    def summary(self):
+        """
+        Percentiles of every stage/format/size group
+        Returns:
+            List of dictionaries with count, mean and p50/p90/p99 in milliseconds
+        """
+        with self._lock:
+            groups = {key: sorted(samples) for key, samples in self._samples.items()}
+
+        rows = []
+        for (stage, file_format, size), samples in sorted(groups.items()):
+            def percentile(fraction):
+                return round(samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000, 2)
+            rows.append({
+                'stage': stage,
+                'format': file_format,
+                'size': size,
+                'count': len(samples),
+                'mean_ms': round(sum(samples) / len(samples) * 1000, 2),
+                'p50_ms': percentile(0.5),
+                'p90_ms': percentile(0.9),
+                'p99_ms': percentile(0.99)
+            })
+        return rows
+
+    def export(self, path):
+        """
+        Write the summary to a .json or .csv file
+        Args:
+            path: Output path; the extension picks the format
+        """
+        rows = self.summary()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="", encoding="utf-8") as output:
+                writer = csv.DictWriter(output, fieldnames=['stage', 'format', 'size', 'count',
+                                                            'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms'])
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(path, "w", encoding="utf-8") as output:
+                json.dump(rows, output, indent=2)
+
+    def reset(self):
+        """Drop every recorded sample"""
+        with self._lock:
+            self._samples.clear()
+            self._last.clear()
+
+# Global instance; set SORTIFY_METRICS=1 to collect from startup
+metrics = Metrics(enabled=bool(os.environ.get("SORTIFY_METRICS")))
\ No newline at end of file
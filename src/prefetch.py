@@ -0,0 +1,237 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+class PreviewCache:
+    """Thread-safe LRU cache of decoded previews bounded by memory usage"""
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (path, size) or (path, size, display size) -> Pillow image
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def image_bytes(image):
+        """
+        Estimate memory used by a decoded image
+        Args:
+            image: Pillow image
+        Returns:
+            Approximate size in bytes
+        """
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key):
+        """
+        Look up a cached preview and mark it as recently used
+        Args:
+            key: (path, size) or (path, size, display size) tuple
+        Returns:
+            Cached image or None
+        """
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, image):
+        """
+        Store a preview, evicting least recently used entries over the memory cap
+        Args:
+            key: (path, size) or (path, size, display size) tuple
+            image: Pillow image
+        """
+        size = self.image_bytes(image)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self.image_bytes(self._entries.pop(key))
+            self._entries[key] = image
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self.image_bytes(evicted)
+
+    def discard(self, path):
+        """
+        Drop every cached size of a file
+        Args:
+            path: Source file path
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._bytes -= self.image_bytes(self._entries.pop(key))
+
+    def clear(self):
+        """Remove all cached previews"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+class ImagePrefetcher:
+    """Decode upcoming previews on a worker pool ahead of display"""
+    def __init__(self, loader, lookahead=3, max_workers=2, max_bytes=256 * 1024 * 1024, fitter=None):
+        """
+        Args:
+            loader: Callable (path, size) -> Pillow image, run on worker threads
+            lookahead: Number of upcoming queue entries to decode in advance
+            max_workers: Size of the decode thread pool
+            max_bytes: Memory cap for the decoded preview cache
+            fitter: Callable (image, display size) -> Pillow image, run on worker threads to prepare
+                    the image actually shown from the decoded one
+        """
+        self.loader = loader
+        self.fitter = fitter
+        self.lookahead = lookahead
+        self.cache = PreviewCache(max_bytes)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending = {}  # Cache key -> Future
+        self.failed = set()  # Keys whose decode raised; not scheduled again until discarded or cancelled
+        self._generation = 0
+        # Reentrant: cancel() and add_done_callback() on a finished future call _forget synchronously
+        self._lock = threading.RLock()
+
+    def get(self, path, size):
+        """
+        Return the preview for a file, waiting on or running its decode if needed
+        Args:
+            path: Source file path
+            size: (max_width, max_height) target size
+        Returns:
+            Decoded Pillow image
+        """
+        key = (path, tuple(size))
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+
+        with self._lock:
+            # A display job decodes and caches the preview before fitting it
+            pending_key = key if key in self._pending else next((k for k in self._pending if k[:2] == key), None)
+            future = self._pending.get(pending_key)
+
+        if future is not None:
+            try:
+                image = future.result()
+                if pending_key == key:
+                    return image
+            except CancelledError:
+                pass
+            image = self.cache.get(key)
+            if image is not None:
+                return image
+
+        image = self.loader(path, key[1])
+        self.cache.put(key, image)
+        return image
+
+    def get_display(self, path, size, display_size):
+        """
+        Return a preview fitted to the display, waiting on or running its preparation if needed
+        Args:
+            path: Source file path
+            size: (max_width, max_height) size of the decoded preview
+            display_size: (max_width, max_height) box the shown image must fit
+        Returns:
+            Pillow image ready to be shown
+        """
+        key = (path, tuple(size), tuple(display_size))
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+
+        with self._lock:
+            future = self._pending.get(key)
+
+        if future is not None:
+            try:
+                return future.result()
+            except CancelledError:
+                pass
+
+        image = self.fitter(self.get(path, size), key[2])
+        self.cache.put(key, image)
+        return image
+
+    def schedule(self, paths, size, display_size=None):
+        """
+        Queue background decodes and cancel queued work that is no longer wanted
+        Args:
+            paths: Source paths in display priority order
+            size: (max_width, max_height) target size
+            display_size: Also prepare images fitted to this box with the fitter, for get_display
+        """
+        size = tuple(size)
+        if display_size is not None and self.fitter is not None:
+            wanted = [(path, size, tuple(display_size)) for path in paths]
+        else:
+            wanted = [(path, size) for path in paths]
+
+        with self._lock:
+            for key in [k for k in self._pending if k not in wanted]:
+                self._pending.pop(key).cancel()  # Only stops work that has not started
+
+            for key in wanted:
+                if key in self._pending or key in self.cache or key in self.failed:
+                    continue
+                future = self._executor.submit(self._load, key, self._generation)
+                self._pending[key] = future
+                future.add_done_callback(lambda f, key=key: self._forget(key, f))
+
+    def cancel(self):
+        """Cancel all queued decodes and ignore results of those already running"""
+        with self._lock:
+            self._generation += 1
+            futures = list(self._pending.values())
+            self._pending.clear()
+            self.failed.clear()
+            for future in futures:
+                future.cancel()
+
+    def discard(self, path):
+        """
+        Forget cached previews for a file that left the queue
+        Args:
+            path: Source file path
+        """
+        self.cache.discard(path)
+        with self._lock:
+            self.failed = {key for key in self.failed if key[0] != path}
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _load(self, key, generation):
+        """Worker body: decode one preview, and fit it for display if asked, caching both unless cancelled meanwhile"""
+        try:
+            image = self.cache.get(key[:2])
+            if image is None:
+                image = self.loader(*key[:2])
+                if generation == self._generation:
+                    self.cache.put(key[:2], image)
+            if len(key) == 3:
+                image = self.fitter(image, key[2])
+                if generation == self._generation:
+                    self.cache.put(key, image)
+            return image
+        except Exception:
+            with self._lock:
+                if generation == self._generation:
+                    self.failed.add(key)
+            raise
+
+    def _forget(self, key, future):
+        """Drop a finished future from the pending table"""
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
\ No newline at end of file
@@ -0,0 +1,237 @@
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, features
+from utils import get_app_dir, open_database
+
+logger = logging.getLogger(__name__)
+
+class PreviewStore:
+    """Persistent SQLite cache of encoded previews keyed by file identity and target size"""
+    def __init__(self, db_path=None, max_bytes=512 * 1024 * 1024, quality=85):
+        """
+        Args:
+            db_path: SQLite file, defaults to previews.db in the app directory
+            max_bytes: Total size of stored previews before LRU eviction
+            quality: Lossy encoding quality of stored previews
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.format = "WEBP" if features.check("webp") else "JPEG"
+        self._connection = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Encodes and inserts previews decoded on a miss, so the decoding caller never waits for them
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview-store")
+
+    def _connect(self):
+        """Open previews.db on first use and total the stored bytes for eviction"""
+        if self._connection is None:
+            if self.db_path is None:
+                self.db_path = os.path.join(get_app_dir(), "previews.db")
+            connection = open_database(self.db_path, """
+                CREATE TABLE IF NOT EXISTS previews (
+                    path TEXT NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    variant TEXT NOT NULL,
+                    file_size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (path, width, height, variant)
+                )""", "CREATE INDEX IF NOT EXISTS previews_last_used ON previews (last_used)")
+            self._bytes = connection.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM previews").fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    def open(self):
+        """Open the database now instead of on the first lookup"""
+        with self._lock:
+            self._connect()
+
+    def get(self, path, size, variant=""):
+        """
+        Fetch a stored preview if the source file is unchanged
+        Args:
+            path: Source file path
+            size: (max_width, max_height) target size
+            variant: Decoder setting the preview depends on, such as the RAW mode
+        Returns:
+            Decoded Pillow image or None on a miss
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT file_size, mtime_ns, data FROM previews WHERE path = ? AND width = ? AND height = ? AND variant = ?",
+                (path, size[0], size[1], variant)).fetchone()
+            if row is None:
+                return None
+
+            if (row[0], row[1]) != (stat.st_size, stat.st_mtime_ns):
+                # Source changed since the preview was stored
+                connection.execute(
+                    "DELETE FROM previews WHERE path = ? AND width = ? AND height = ? AND variant = ?",
+                    (path, size[0], size[1], variant))
+                connection.commit()
+                self._bytes -= len(row[2])
+                return None
+
+            connection.execute(
+                "UPDATE previews SET last_used = ? WHERE path = ? AND width = ? AND height = ? AND variant = ?",
+                (time.time(), path, size[0], size[1], variant))
+            connection.commit()
+
+        image = Image.open(io.BytesIO(row[2]))
+        image.load()
+        return image
+
+    def put(self, path, size, image, variant=""):
+        """
+        Store a preview for a source file
+        Args:
+            path: Source file path
+            size: (max_width, max_height) target size the preview was made for
+            image: Pillow image
+            variant: Decoder setting the preview depends on, such as the RAW mode
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._store(path, size, image, variant, stat)
+
+    def _store(self, path, size, image, variant, stat):
+        """Encode and insert a preview for the file identity given by stat"""
+        if image.mode not in ("RGB", "RGBA") or (self.format == "JPEG" and image.mode != "RGB"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, self.format, quality=self.quality)
+        data = buffer.getvalue()
+
+        with self._lock:
+            connection = self._connect()
+            old = connection.execute(
+                "SELECT LENGTH(data) FROM previews WHERE path = ? AND width = ? AND height = ? AND variant = ?",
+                (path, size[0], size[1], variant)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO previews VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size[0], size[1], variant, stat.st_size, stat.st_mtime_ns, data, time.time()))
+            self._bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+            connection.commit()
+
+    def load(self, path, size, loader, variant=""):
+        """
+        Return a stored preview, decoding and storing it with loader on a miss
+        Args:
+            path: Source file path
+            size: (max_width, max_height) target size
+            loader: Callable (path, size) -> Pillow image
+            variant: Decoder setting the preview depends on, such as the RAW mode
+        Returns:
+            Pillow image
+        """
+        image = self.get(path, size, variant)
+        if image is None:
+            try:
+                stat = os.stat(path)  # Before decoding, so a file changed meanwhile is not stored as current
+            except OSError:
+                stat = None
+            image = loader(path, size)
+            if stat is not None:
+                self._writer.submit(self._write_in_background, path, size, image, variant, stat)
+        return image
+
+    def _write_in_background(self, path, size, image, variant, stat):
+        """Writer thread body of load"""
+        try:
+            self._store(path, size, image, variant, stat)
+        except Exception as e:
+            logger.error("Preview cache error: %s", e)
+
+    def flush(self):
+        """Wait until previews queued by load are written"""
+        self._writer.submit(lambda: None).result()
+
+    def relocate(self, old_path, new_path):
+        """
+        Carry stored previews over to a file's new location after a move
+        Args:
+            old_path: Path the file was moved from
+            new_path: Path the file now lives at
+        """
+        try:
+            stat = os.stat(new_path)
+        except OSError:
+            return
+
+        self.flush()  # A queued write of the old path must not land after the move
+        try:
+            with self._lock:
+                connection = self._connect()
+                self._bytes -= self._delete_path(new_path)
+                # Only entries whose content still matches are kept; a cross-device move may reset mtime
+                connection.execute(
+                    "UPDATE previews SET path = ?, mtime_ns = ? WHERE path = ? AND file_size = ?",
+                    (new_path, stat.st_mtime_ns, old_path, stat.st_size))
+                self._bytes -= self._delete_path(old_path)
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.error("Preview cache error: %s", e)
+
+    def discard(self, path):
+        """
+        Forget stored previews of a file that no longer exists
+        Args:
+            path: Source file path
+        """
+        self.flush()
+        try:
+            with self._lock:
+                self._connect()
+                self._bytes -= self._delete_path(path)
+                self._connection.commit()
+        except sqlite3.Error as e:
+            logger.error("Preview cache error: %s", e)
+
+    def _delete_path(self, path):
+        """Delete every preview of a path and return the bytes freed"""
+        connection = self._connection
+        freed = connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM previews WHERE path = ?", (path,)).fetchone()[0]
+        connection.execute("DELETE FROM previews WHERE path = ?", (path,))
+        return freed
+
+    def _evict(self):
+        """Delete least recently used previews until the store fits max_bytes"""
+        connection = self._connection
+        while self._bytes > self.max_bytes:
+            rows = connection.execute(
+                "SELECT path, width, height, variant, LENGTH(data) FROM previews "
+                "ORDER BY last_used LIMIT 64").fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            # Stop at the row that brings the total under the limit instead of dropping the whole batch
+            victims = []
+            for row in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                victims.append(row[:4])
+                self._bytes -= row[4]
+            connection.executemany(
+                "DELETE FROM previews WHERE path = ? AND width = ? AND height = ? AND variant = ?", victims)
+
+# Global instance shared by the GUI loaders and the sorter
+preview_store = PreviewStore()
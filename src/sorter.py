@@ -1,11 +1,152 @@
+import atexit
+import logging
 import os
-import shutil
+import re
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from journal import ActionJournal
+from metrics import metrics
+from preview_store import preview_store
+from transfer import DEFAULT_WORKERS, same_contents, temp_path, transfer_file
+from utils import get_app_dir
+
+logger = logging.getLogger(__name__)
+
+# Compact in-memory form of one recorded file operation; batch groups actions undone together
+Action = namedtuple('Action', ['seq', 'type', 'original_path', 'destination_path', 'category', 'batch'],
+                    defaults=(None,))
 
 class ActionTracker:
-    """Class to track and manage file operations history"""
-    def __init__(self):
-        self.action_history = []  # Stores all tracked actions
-    
+    """Class to track and manage file operations history, backed by an on-disk journal"""
+    def __init__(self, journal_path=None, max_in_memory=10000, compact_threshold=5000):
+        """
+        Args:
+            journal_path: Journal file, defaults to journal.log in the app directory
+            max_in_memory: Most recent actions kept in memory; older ones are reloaded on demand
+            compact_threshold: Number of obsolete journal records that triggers compaction
+        """
+        self.action_history = []  # Most recent live actions, oldest first
+        self.journal_path = journal_path
+        self.max_in_memory = max_in_memory
+        self.compact_threshold = compact_threshold
+        self._journal = None
+        self._pending = {}  # seq -> Action of moves started but not finished
+        self._next_seq = 1
+        self._dead_records = 0
+        self._trimmed = False  # Older live actions exist only in the journal
+        self._batch = None  # Batch id given to actions recorded inside batch()
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group every action recorded inside the block so one undo reverts all of them
+        Yields:
+            Batch id
+        """
+        with self._lock:
+            self._ensure_loaded()
+            batch_id = self._next_seq
+            self._next_seq += 1
+            self._batch = batch_id
+        try:
+            yield batch_id
+        finally:
+            with self._lock:
+                self._batch = None
+
+    def load(self):
+        """Restore history from the journal now instead of on the first file operation"""
+        with self._lock:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        """Open the journal and restore history from previous sessions on first use"""
+        if self._journal is not None:
+            return
+        if self.journal_path is None:
+            self.journal_path = os.path.join(get_app_dir(), "journal.log")
+        self._journal = ActionJournal(self.journal_path)
+
+        records = self._journal.read()
+        live, self._pending = self._replay(records)
+        self._dead_records = len(records) - len(live) - len(self._pending)
+        self.action_history = live[-self.max_in_memory:]
+        self._trimmed = len(live) > len(self.action_history)
+        self._compact_if_needed()
+
+    def _replay(self, records):
+        """
+        Rebuild state from journal records
+        Args:
+            records: Journal records in write order
+        Returns:
+            (live actions oldest first, pending moves by seq)
+        """
+        live = {}
+        pending = {}
+        for record in records:
+            kind, seq = record[0], record[1]
+            self._next_seq = max(self._next_seq, seq + 1)
+            if kind == "M":
+                live[seq] = Action(seq, 'move', record[2], record[3], sys.intern(record[4]), *record[5:6])
+            elif kind == "B":
+                pending[seq] = Action(seq, 'move', record[2], record[3], sys.intern(record[4]), *record[5:6])
+            elif kind == "C":
+                if seq in pending:
+                    live[seq] = pending.pop(seq)
+            elif kind == "A":
+                pending.pop(seq, None)
+            elif kind == "D":
+                live[seq] = Action(seq, 'delete', record[2], None, None)
+            elif kind == "U":
+                live.pop(seq, None)
+        return list(live.values()), pending
+
+    @staticmethod
+    def _to_record(action, kind=None):
+        """Serialize an action as a journal record"""
+        if action.type == 'delete':
+            return ["D", action.seq, action.original_path]
+        record = [kind or "M", action.seq, action.original_path, action.destination_path, action.category]
+        if action.batch is not None:
+            record.append(action.batch)
+        return record
+
+    def _new_action(self, action_type, original_path, destination_path=None, category=None):
+        """Allocate the next sequence number for an action"""
+        action = Action(self._next_seq, action_type, original_path, destination_path,
+                        sys.intern(category) if category is not None else None, self._batch)
+        self._next_seq += 1
+        return action
+
+    def _append_history(self, action):
+        """Add a live action, dropping the oldest from memory past max_in_memory"""
+        self.action_history.append(action)
+        if len(self.action_history) > self.max_in_memory:
+            del self.action_history[:len(self.action_history) - self.max_in_memory]
+            self._trimmed = True
+
+    def _compact_if_needed(self):
+        """Rewrite the journal without obsolete records once enough have piled up"""
+        if self._dead_records < self.compact_threshold:
+            return
+        self._journal.flush()
+        live, pending = self._replay(self._journal.read())
+        self._journal.rewrite([self._to_record(action) for action in live] +
+                              [self._to_record(action, "B") for action in pending.values()])
+        self._dead_records = 0
+
+    def _reload(self):
+        """Bring every live action back into memory from the journal"""
+        self._journal.flush()
+        live, _ = self._replay(self._journal.read())
+        self.action_history = live
+        self._trimmed = False
+
     def record_move(self, original_path, destination_path, category):
         """
         Record a file move operation
@@ -14,16 +155,54 @@ class ActionTracker:
             destination_path: Destination file path
             category: Target category/folder name
         Returns:
-            Recorded action dictionary
-        """
-        action = {
-            'type': 'move',
-            'original_path': original_path,
-            'destination_path': destination_path,
-            'category': category
-        }
-        self.action_history.append(action)
-        return action
+            Recorded action
+        """
+        with self._lock:
+            self._ensure_loaded()
+            action = self._new_action('move', original_path, destination_path, category)
+            self._journal.append(self._to_record(action))
+            self._append_history(action)
+            return action
+
+    def begin_move(self, original_path, destination_path, category):
+        """
+        Journal a move before the file is touched so an interruption can be repaired
+        Args:
+            original_path: Source file path
+            destination_path: Destination file path
+            category: Target category/folder name
+        Returns:
+            Pending action to pass to commit_move or abort_move
+        """
+        with self._lock:
+            self._ensure_loaded()
+            action = self._new_action('move', original_path, destination_path, category)
+            self._journal.append(self._to_record(action, "B"))
+            self._pending[action.seq] = action
+            return action
+
+    def commit_move(self, action):
+        """
+        Mark a pending move as finished and make it undoable
+        Args:
+            action: Action returned by begin_move
+        """
+        with self._lock:
+            self._pending.pop(action.seq, None)
+            self._journal.append(["C", action.seq])
+            self._dead_records += 1
+            self._append_history(action)
+
+    def abort_move(self, action):
+        """
+        Mark a pending move as failed before the file changed place
+        Args:
+            action: Action returned by begin_move
+        """
+        with self._lock:
+            self._pending.pop(action.seq, None)
+            self._journal.append(["A", action.seq])
+            self._dead_records += 2
     
     def record_delete(self, original_path):
         """
@@ -31,97 +210,409 @@ class ActionTracker:
         Args:
             original_path: Path of deleted file
         Returns:
-            Recorded action dictionary
+            Recorded action
         """
-        action = {
-            'type': 'delete',
-            'original_path': original_path
-        }
-        self.action_history.append(action)
-        return action
-    
-    def undo_last_action(self):
+        with self._lock:
+            self._ensure_loaded()
+            action = self._new_action('delete', original_path)
+            self._journal.append(self._to_record(action))
+            self._append_history(action)
+            return action
+
+    def _forget(self, action):
+        """Journal that an action no longer needs undoing"""
+        self._journal.append(["U", action.seq])
+        self._dead_records += 2
+        self._compact_if_needed()
+
+    def _undo(self, action):
         """
-        Reverse the last recorded action
+        Reverse one action that was already removed from action_history
         Returns:
             The undone action dictionary or None if unsuccessful
         """
-        if not self.action_history:
-            return None
-        
-        last_action = self.action_history.pop()
-        
         try:
-            if last_action['type'] == 'move':
+            if action.type == 'move':
                 # Ensure original directory exists
-                os.makedirs(os.path.dirname(last_action['original_path']), exist_ok=True)
+                os.makedirs(os.path.dirname(action.original_path), exist_ok=True)
                 
                 # Move file back to original location
-                shutil.move(last_action['destination_path'], last_action['original_path'])
-                print(f"Undo move: {last_action['destination_path']} -> {last_action['original_path']}")
-                return last_action
+                with metrics.timer("undo", action.destination_path):
+                    transfer_file(action.destination_path, action.original_path)
+                destination_index.release(action.destination_path)
+                destination_index.add(action.original_path)
+                preview_store.relocate(action.destination_path, action.original_path)
+                logger.info("Undo move: %s -> %s", action.destination_path, action.original_path)
+                return action._asdict()
             
-            elif last_action['type'] == 'delete':
+            elif action.type == 'delete':
                 # Note: Actual undelete implementation would require a backup system
-                print(f"Delete undo not fully implemented for {last_action['original_path']}")
+                logger.warning("Delete undo not fully implemented for %s", action.original_path)
                 return None
         
         except Exception as e:
-            print(f"Undo error: {e}")
+            logger.error("Undo error: %s", e)
             return None
 
+        finally:
+            self._forget(action)
+    
+    def undo_last_action(self):
+        """
+        Reverse the last recorded action
+        Returns:
+            The undone action dictionary or None if unsuccessful
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not self.action_history and self._trimmed:
+                self._reload()
+            if not self.action_history:
+                return None
+
+            last_action = self.action_history.pop()
+            if last_action.batch is None:
+                return self._undo(last_action)
+
+            # Revert the whole batch, newest first
+            batch = [last_action]
+            taken = {last_action.seq}
+            while True:
+                if not self.action_history and self._trimmed:
+                    self._reload()
+                    # The journal still lists the actions taken so far as live until they are undone
+                    self.action_history = [action for action in self.action_history if action.seq not in taken]
+                if not self.action_history or self.action_history[-1].batch != last_action.batch:
+                    break
+                action = self.action_history.pop()
+                batch.append(action)
+                taken.add(action.seq)
+
+            undone = [result for result in map(self._undo, batch) if result]
+            if not undone:
+                return None
+            return {
+                'type': 'batch',
+                'batch': last_action.batch,
+                'category': last_action.category,
+                'actions': undone
+            }
+
+    def undo_last(self, count):
+        """
+        Reverse the most recent actions, newest first
+        Args:
+            count: Number of actions to undo
+        Returns:
+            List of successfully undone action dictionaries
+        """
+        undone = []
+        with self._lock:
+            for _ in range(count):
+                self._ensure_loaded()
+                if not self.action_history and self._trimmed:
+                    self._reload()
+                if not self.action_history:
+                    break
+                result = self._undo(self.action_history.pop())
+                if result:
+                    undone.append(result)
+        return undone
+
+    def undo_category(self, category):
+        """
+        Move every file recorded into a category back, newest first
+        Args:
+            category: Target category/folder name
+        Returns:
+            List of successfully undone action dictionaries
+        """
+        undone = []
+        with self._lock:
+            self._ensure_loaded()
+            if self._trimmed:
+                self._reload()
+            matching = [action for action in self.action_history
+                        if action.type == 'move' and action.category == category]
+            remaining = set(action.seq for action in matching)
+            self.action_history = [action for action in self.action_history if action.seq not in remaining]
+            for action in reversed(matching):
+                result = self._undo(action)
+                if result:
+                    undone.append(result)
+            if len(self.action_history) > self.max_in_memory:
+                del self.action_history[:len(self.action_history) - self.max_in_memory]
+                self._trimmed = True
+        return undone
+
+    def moves(self):
+        """
+        List finished moves that were not undone, such as for learning category suggestions
+        Returns:
+            List of move actions held in memory, oldest first
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [action for action in self.action_history if action.type == 'move']
+
+    def pending_moves(self):
+        """
+        List moves that were started but never finished, e.g. because of a crash
+        Returns:
+            List of pending actions, oldest first
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return sorted(self._pending.values())
+
+    def repair_interrupted(self, replay=True):
+        """
+        Resolve moves interrupted halfway
+        Args:
+            replay: Finish moves whose source is still in place instead of abandoning them
+        Returns:
+            List of (action, outcome) pairs, outcome being 'completed', 'replayed', 'aborted' or 'missing'
+        """
+        results = []
+        with self._lock:
+            for action in self.pending_moves():
+                source_exists = os.path.exists(action.original_path)
+                destination_exists = os.path.exists(action.destination_path)
+
+                if not source_exists and destination_exists:
+                    # The move went through but was never confirmed
+                    self.commit_move(action)
+                    results.append((action, 'completed'))
+                    continue
+
+                if source_exists and destination_exists:
+                    if same_contents(action.original_path, action.destination_path):
+                        # A cross-device copy finished but the source was not removed yet
+                        os.remove(action.original_path)
+                        self.commit_move(action)
+                        results.append((action, 'completed'))
+                    else:
+                        # The name went to another file since the crash: leave both files alone
+                        self.abort_move(action)
+                        results.append((action, 'aborted'))
+                    continue
+                try:
+                    os.remove(temp_path(action.destination_path))  # Copy interrupted before its rename
+                except OSError:
+                    pass
+
+                if source_exists and replay:
+                    try:
+                        os.makedirs(os.path.dirname(action.destination_path), exist_ok=True)
+                        transfer_file(action.original_path, action.destination_path)
+                        destination_index.add(action.destination_path)
+                        self.commit_move(action)
+                        results.append((action, 'replayed'))
+                        continue
+                    except OSError as e:
+                        logger.error("Replay error: %s", e)
+
+                self.abort_move(action)
+                results.append((action, 'aborted' if source_exists else 'missing'))
+        return results
+
+    def close(self):
+        """Flush the journal to disk"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+
+class DestinationIndex:
+    """In-memory index of the file names in each destination folder, used for conflict resolution"""
+    # Names produced by conflict renaming: <base>_<counter><ext>
+    SUFFIX_PATTERN = re.compile(r"^(.*)_(\d+)$")
+
+    def __init__(self):
+        self._folders = {}  # Normalized folder path -> (set of names, {(base, ext): highest counter})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name):
+        """Normalize a name the way the filesystem compares it"""
+        return os.path.normcase(name)
+
+    def _folder(self, folder):
+        """Get the index of a folder, scanning it once on first use"""
+        folder_key = os.path.normcase(os.path.abspath(folder))
+        entry = self._folders.get(folder_key)
+        if entry is None:
+            entry = (set(), {})
+            try:
+                with os.scandir(folder) as entries:
+                    for dir_entry in entries:
+                        self._add_name(entry, dir_entry.name)
+            except FileNotFoundError:
+                pass
+            self._folders[folder_key] = entry
+        return entry
+
+    def _add_name(self, entry, name):
+        """Record a name and the counter it carries, if any"""
+        names, counters = entry
+        names.add(self._key(name))
+        stem, ext = os.path.splitext(name)
+        match = self.SUFFIX_PATTERN.match(stem)
+        if match:
+            counter_key = (self._key(match.group(1)), self._key(ext))
+            counters[counter_key] = max(counters.get(counter_key, 0), int(match.group(2)))
+
+    def reserve(self, folder, filename):
+        """
+        Pick a free destination path for a file and mark it as taken
+        Args:
+            folder: Destination directory path
+            filename: Name the file would like to keep
+        Returns:
+            Destination path, with a counter appended after the highest one in use if the name is taken
+        """
+        with self._lock:
+            entry = self._folder(folder)
+            names, counters = entry
+            candidate = filename
+
+            if self._key(filename) in names:
+                base, ext = os.path.splitext(filename)
+                counter = counters.get((self._key(base), self._key(ext)), 0) + 1
+                candidate = f"{base}_{counter}{ext}"
+
+            # One real check guards against files created behind the index's back
+            while os.path.exists(os.path.join(folder, candidate)):
+                self._add_name(entry, candidate)
+                base, ext = os.path.splitext(filename)
+                counter = counters.get((self._key(base), self._key(ext)), 0) + 1
+                candidate = f"{base}_{counter}{ext}"
+
+            self._add_name(entry, candidate)
+            return os.path.join(folder, candidate)
+
+    def add(self, path):
+        """
+        Note that a file appeared in an indexed folder
+        Args:
+            path: File path
+        """
+        with self._lock:
+            folder_key = os.path.normcase(os.path.abspath(os.path.dirname(path)))
+            entry = self._folders.get(folder_key)
+            if entry is not None:
+                self._add_name(entry, os.path.basename(path))
+
+    def release(self, path):
+        """
+        Note that a file left an indexed folder; counters are kept so numbering stays monotonic
+        Args:
+            path: File path
+        """
+        with self._lock:
+            folder_key = os.path.normcase(os.path.abspath(os.path.dirname(path)))
+            entry = self._folders.get(folder_key)
+            if entry is not None:
+                entry[0].discard(self._key(os.path.basename(path)))
+
+    def clear(self):
+        """Forget every indexed folder"""
+        with self._lock:
+            self._folders.clear()
+
 # Global instance for tracking file operations
 action_tracker = ActionTracker()
+atexit.register(action_tracker.close)
+
+# Global index of destination folder contents, built lazily per folder during the session
+destination_index = DestinationIndex()
 
-def move_image(image_path, destination_folder):
+def move_image(image_path, destination_folder, verify=False):
     """
     Move image to target folder with conflict resolution
     Args:
         image_path: Source file path
         destination_folder: Target directory path
+        verify: Checksum cross-device copies before removing the source
     Returns:
         New file path if successful, None otherwise
     """
     try:
         os.makedirs(destination_folder, exist_ok=True)
-        filename = os.path.basename(image_path)
-        destination_path = os.path.join(destination_folder, filename)
         
-        # Handle filename conflicts by appending counter
-        if os.path.exists(destination_path):
-            base, ext = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(destination_path):
-                filename = f"{base}_{counter}{ext}"
-                destination_path = os.path.join(destination_folder, filename)
-                counter += 1
+        # Handle filename conflicts by appending a counter, looked up in the destination index
+        destination_path = destination_index.reserve(destination_folder, os.path.basename(image_path))
+        filename = os.path.basename(destination_path)
         
-        shutil.move(image_path, destination_path)
-        
-        # Record the move operation
-        action_tracker.record_move(image_path, destination_path, os.path.basename(destination_folder))
+        # Journal the move before touching the file so a crash can be repaired
+        action = action_tracker.begin_move(image_path, destination_path, os.path.basename(destination_folder))
+        try:
+            with metrics.timer("move", image_path):
+                transfer_file(image_path, destination_path, verify)
+        except Exception:
+            action_tracker.abort_move(action)
+            destination_index.release(destination_path)
+            raise
+        action_tracker.commit_move(action)
+        destination_index.release(image_path)
+        preview_store.relocate(image_path, destination_path)
         
-        print(f"Moved {filename} to {destination_folder}")
+        logger.info("Moved %s to %s", filename, destination_folder)
         return destination_path
     
     except Exception as e:
-        print(f"Error moving image: {e}")
+        logger.error("Error moving image: %s", e)
         return None
 
+def move_images(image_paths, destination_folder, workers=DEFAULT_WORKERS, verify=False):
+    """
+    Move several images to a target folder as one batch that a single undo reverts
+    Args:
+        image_paths: Source file paths
+        destination_folder: Target directory path
+        workers: Files transferred at the same time; only cross-device copies gain from more than one
+        verify: Checksum cross-device copies before removing the sources
+    Returns:
+        List of new file paths, None for each image that failed
+    """
+    with action_tracker.batch():
+        if workers <= 1 or len(image_paths) <= 1:
+            return [move_image(image_path, destination_folder, verify) for image_path in image_paths]
+        # Reserving names and journaling are thread-safe, so independent files can move concurrently
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transfer") as executor:
+            return list(executor.map(lambda image_path: move_image(image_path, destination_folder, verify),
+                                     image_paths))
+
 def delete_image(image_path):
     """
     Permanently delete an image file
     Args:
         image_path: Path of file to delete
+    Returns:
+        True if the file was deleted, False otherwise
     """
     try:
         # Record deletion before executing
         action_tracker.record_delete(image_path)
         
-        os.remove(image_path)
-        print(f"Deleted {image_path}")
+        with metrics.timer("delete", image_path):
+            os.remove(image_path)
+        destination_index.release(image_path)
+        preview_store.discard(image_path)
+        logger.info("Deleted %s", image_path)
+        return True
     except Exception as e:
-        print(f"Error deleting image: {e}")
+        logger.error("Error deleting image: %s", e)
+        return False
+
+def delete_images(image_paths):
+    """
+    Permanently delete several image files
+    Args:
+        image_paths: Paths of files to delete
+    Returns:
+        List of True/False results in the same order
+    """
+    return [delete_image(image_path) for image_path in image_paths]
 
 def undo_last_action():
     """
@@ -0,0 +1,407 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from image_loader import load_preview
+from metadata import extract_metadata
+from sorter import action_tracker
+from utils import get_app_dir, open_database
+
+logger = logging.getLogger(__name__)
+
+# Most likely category of an image and the share of the neighbor votes it received
+Suggestion = namedtuple('Suggestion', ['category', 'confidence'])
+
+# Sorted examples as arrays; labels index into categories, version changes on every rebuild
+NeighborModel = namedtuple('NeighborModel', ['vectors', 'labels', 'categories', 'version'])
+
+FEATURE_THUMB = 32        # Images are reduced to this square before any feature is taken
+HISTOGRAM_LEVELS = 4      # Per channel, 64 color bins
+PIXEL_GRID = 8            # 8x8 brightness layout
+CAMERA_BUCKETS = 8
+FEATURE_SIZE = HISTOGRAM_LEVELS ** 3 + PIXEL_GRID ** 2 + 3 + CAMERA_BUCKETS
+BLOCK_WEIGHTS = (1.0, 1.0, 0.5)  # Color, layout and EXIF share of the similarity
+BOOTSTRAP_LIMIT = 2000    # Most recent past moves turned into examples in one learning pass
+MAX_EXAMPLES = 20000      # Examples kept in the model, newest first
+MAX_SEEN = 4096           # Feature vectors of previewed images kept in memory
+FLUSH_BATCH = 64          # Feature rows written per transaction
+
+def normalize(rows):
+    """Scale rows to unit length, leaving all-zero rows as they are"""
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows / np.where(norms > 0, norms, 1)
+
+def feature_vectors(images, metadata):
+    """
+    Compact descriptors of a batch of images, compared by cosine similarity
+    Args:
+        images: Upright Pillow images of any size
+        metadata: extract_metadata dictionaries, or None where unavailable, one per image
+    Returns:
+        float32 array of shape (len(images), FEATURE_SIZE) with unit-length rows
+    """
+    count = len(images)
+    pixels = np.stack([np.asarray(image.resize((FEATURE_THUMB, FEATURE_THUMB), Image.BILINEAR, reducing_gap=2.0)
+                                  .convert("RGB")) for image in images])
+
+    # Color: square root of the bin frequencies, so large uniform areas do not dominate the distance
+    levels = (pixels // (256 // HISTOGRAM_LEVELS)).astype(np.int64)
+    bins = (levels[..., 0] * HISTOGRAM_LEVELS + levels[..., 1]) * HISTOGRAM_LEVELS + levels[..., 2]
+    bins = bins.reshape(count, -1) + np.arange(count)[:, None] * HISTOGRAM_LEVELS ** 3
+    histogram = np.sqrt(np.bincount(bins.ravel(), minlength=count * HISTOGRAM_LEVELS ** 3)
+                        .reshape(count, -1) / (FEATURE_THUMB * FEATURE_THUMB))
+
+    # Layout: block-averaged brightness with the mean removed, so exposure changes matter less
+    cell = FEATURE_THUMB // PIXEL_GRID
+    gray = pixels @ np.array([0.299, 0.587, 0.114])
+    layout = gray.reshape(count, PIXEL_GRID, cell, PIXEL_GRID, cell).mean(axis=(2, 4)).reshape(count, -1)
+    layout -= layout.mean(axis=1, keepdims=True)
+
+    # EXIF: aspect ratio, time of day on a circle and a hashed camera model
+    exif = np.zeros((count, 3 + CAMERA_BUCKETS))
+    for row, (image, fields) in enumerate(zip(images, metadata)):
+        fields = fields or {}
+        width = fields.get('width') or image.width
+        height = fields.get('height') or image.height
+        exif[row, 0] = np.clip(math.log(width / height), -1, 1)
+        capture_time = fields.get('capture_time')
+        if capture_time is not None:
+            angle = 2 * math.pi * (capture_time.hour * 60 + capture_time.minute) / (24 * 60)
+            exif[row, 1:3] = math.cos(angle), math.sin(angle)
+        if fields.get('camera'):
+            bucket = int.from_bytes(hashlib.blake2b(fields['camera'].encode("utf-8"), digest_size=2).digest(), "big")
+            exif[row, 3 + bucket % CAMERA_BUCKETS] = 1
+
+    vectors = np.hstack([weight * normalize(block) for weight, block in zip(BLOCK_WEIGHTS, (histogram, layout, exif))])
+    return normalize(vectors).astype(np.float32)
+
+def load_example(image_path):
+    """
+    Decode a small upright image and its metadata for feature_vectors
+    Args:
+        image_path: Source file path
+    Returns:
+        (Pillow image, metadata or None), or None if the file cannot be decoded
+    """
+    try:
+        image = load_preview(image_path, (FEATURE_THUMB * 4, FEATURE_THUMB * 4))
+    except Exception as e:
+        logger.debug("Cannot compute features of %s: %s", image_path, e)
+        return None
+    try:
+        fields = extract_metadata(image_path)
+    except Exception:
+        fields = None
+    return image, fields
+
+class FeatureStore:
+    """Persistent SQLite store of image feature vectors and of the sorting examples built from them"""
+    def __init__(self, db_path=None):
+        """
+        Args:
+            db_path: SQLite file, defaults to features.db in the app directory
+        """
+        self.db_path = db_path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open features.db, which also keeps the labelled examples, on first use"""
+        if self._connection is None:
+            if self.db_path is None:
+                self.db_path = os.path.join(get_app_dir(), "features.db")
+            self._connection = open_database(self.db_path, """
+                CREATE TABLE IF NOT EXISTS features (
+                    path TEXT PRIMARY KEY,
+                    file_size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    vector BLOB NOT NULL
+                )""", """
+                CREATE TABLE IF NOT EXISTS examples (
+                    path TEXT PRIMARY KEY,
+                    seq INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    vector BLOB NOT NULL
+                )""")
+        return self._connection
+
+    def lookup(self, paths):
+        """
+        Fetch stored feature vectors
+        Args:
+            paths: File paths
+        Returns:
+            Dictionary of path -> (file_size, mtime_ns, vector) for the paths that have one
+        """
+        paths = list(paths)
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                for path, file_size, mtime_ns, vector in connection.execute(
+                        f"SELECT path, file_size, mtime_ns, vector FROM features "
+                        f"WHERE path IN ({', '.join('?' * len(chunk))})", chunk):
+                    found[path] = (file_size, mtime_ns, np.frombuffer(vector, dtype=np.float32))
+        return found
+
+    def store(self, rows):
+        """
+        Save feature vectors
+        Args:
+            rows: Iterable of (path, file_size, mtime_ns, float32 vector)
+        """
+        with self._lock:
+            self._connect().executemany("INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)",
+                                        [(path, file_size, mtime_ns, vector.tobytes())
+                                         for path, file_size, mtime_ns, vector in rows])
+            self._connection.commit()
+
+    def examples(self):
+        """
+        Load every sorting example
+        Returns:
+            Dictionary of destination path -> (seq, category, vector)
+        """
+        with self._lock:
+            return {path: (seq, category, np.frombuffer(vector, dtype=np.float32)) for path, seq, category, vector in
+                    self._connect().execute("SELECT path, seq, category, vector FROM examples")}
+
+    def update_examples(self, added, removed):
+        """
+        Add and drop sorting examples in one transaction
+        Args:
+            added: Iterable of (destination path, seq, category, vector)
+            removed: Destination paths of examples to drop
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.executemany("INSERT OR REPLACE INTO examples VALUES (?, ?, ?, ?)",
+                                   [(path, seq, category, vector.tobytes()) for path, seq, category, vector in added])
+            connection.executemany("DELETE FROM examples WHERE path = ?", [(path,) for path in removed])
+            connection.commit()
+
+class CategorySuggester:
+    """Suggest the category of upcoming images from the most similar images sorted before"""
+    def __init__(self, store=None, tracker=None, neighbors=7, min_examples=5, min_confidence=0.5, workers=2):
+        """
+        Args:
+            store: FeatureStore, defaults to the shared one
+            tracker: ActionTracker whose moves are learned, defaults to the shared one
+            neighbors: Examples voting on each suggestion
+            min_examples: Examples in the offered categories needed before anything is suggested
+            min_confidence: Smallest vote share worth suggesting
+            workers: Decode threads for past moves whose features are not stored
+        """
+        self.store = store or feature_store
+        self.tracker = tracker or action_tracker
+        self.neighbors = neighbors
+        self.min_examples = min_examples
+        self.min_confidence = min_confidence
+        self.workers = workers
+        self._seen = OrderedDict()  # Path -> [vector, model version, categories, Suggestion or None]
+        self._unsaved = []          # Feature rows waiting for the next batched write
+        self._model = None
+        self._examples = None       # Destination path -> (seq, category, vector), loaded on the first learn
+        self._tracked = None        # Destination paths of the moves seen by the last learn
+        self._unreadable = set()    # Destination paths that could not be decoded, not retried
+        self._learn_queued = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="suggest")
+        self._lock = threading.Lock()
+
+    def observe(self, image_path, image, categories):
+        """
+        Compute the features and suggestion of an image from a preview decoded anyway, on a prefetch thread
+        Args:
+            image_path: Source file path
+            image: Decoded upright preview
+            categories: Categories that can be suggested
+        """
+        with self._lock:
+            entry = self._seen.get(image_path)
+            model = self._model
+        if entry is None:
+            try:
+                fields = extract_metadata(image_path)
+            except Exception:
+                fields = None
+            entry = [feature_vectors([image], [fields])[0], None, None, None]
+            rows = None
+            with self._lock:
+                self._seen[image_path] = entry
+                while len(self._seen) > MAX_SEEN:
+                    self._seen.popitem(last=False)
+                if fields is not None:
+                    self._unsaved.append((image_path, fields['file_size'], fields['mtime_ns'], entry[0]))
+                if len(self._unsaved) >= FLUSH_BATCH:
+                    rows, self._unsaved = self._unsaved, []
+            if rows:
+                self.store.store(rows)
+        if model is not None:
+            self._update_entry(entry, model, tuple(categories))
+
+    def suggestion(self, image_path, categories):
+        """
+        Suggested category of an observed image
+        Args:
+            image_path: Source file path
+            categories: Categories that can be suggested
+        Returns:
+            Suggestion, or None if the image was not observed yet or no category is likely enough
+        """
+        with self._lock:
+            entry = self._seen.get(image_path)
+            model = self._model
+        if entry is None or model is None:
+            return None
+        # Precomputed on the prefetch thread; only a model rebuilt since needs the (sub-millisecond) lookup again
+        return self._update_entry(entry, model, tuple(categories))
+
+    def _update_entry(self, entry, model, categories):
+        """Fill a seen entry's suggestion for the current model and categories"""
+        vector, version, entry_categories, suggestion = entry
+        if version != model.version or entry_categories != categories:
+            suggestion = self._predict(model, vector, categories)
+            entry[1:] = [model.version, categories, suggestion]
+        return suggestion
+
+    def _predict(self, model, vector, categories):
+        """Weighted vote of the nearest examples among the offered categories"""
+        allowed = np.isin(model.labels, [label for label, name in enumerate(model.categories) if name in categories])
+        candidates = int(allowed.sum())
+        if candidates < self.min_examples:
+            return None
+
+        similarities = np.where(allowed, model.vectors @ vector, -np.inf)
+        count = min(self.neighbors, candidates)
+        nearest = np.argpartition(-similarities, count - 1)[:count]
+        votes = np.bincount(model.labels[nearest], weights=np.maximum(similarities[nearest], 0),
+                            minlength=len(model.categories))
+        total = votes.sum()
+        if total <= 0:
+            return None
+        best = int(np.argmax(votes))
+        confidence = float(votes[best] / total)
+        if confidence < self.min_confidence:
+            return None
+        return Suggestion(model.categories[best], confidence)
+
+    def refresh(self):
+        """Learn from new moves on the background thread; requests made while one is queued are merged"""
+        with self._lock:
+            if self._learn_queued:
+                return
+            self._learn_queued = True
+        self._executor.submit(self._learn_queued_moves)
+
+    def _learn_queued_moves(self):
+        """Background body of refresh"""
+        with self._lock:
+            self._learn_queued = False
+        try:
+            self.learn()
+        except Exception as e:
+            logger.warning("Learning category suggestions failed: %s", e)
+
+    def learn(self):
+        """Turn the tracker's moves into examples, drop undone ones and rebuild the model"""
+        moves = {action.destination_path: action for action in self.tracker.moves()}
+        if self._examples is None:
+            self._examples = self.store.examples()
+
+        # Moves leave the tracker when undone, but also when trimmed from memory: only a missing file means undone
+        candidates = self._examples.keys() - moves.keys() if self._tracked is None else self._tracked - moves.keys()
+        removed = [path for path in candidates if path in self._examples and not os.path.exists(path)]
+        self._tracked = set(moves)
+
+        # The first passes also learn from earlier sessions, the most recent moves first
+        new_moves = [action for path, action in moves.items()
+                     if path not in self._examples and path not in self._unreadable][-BOOTSTRAP_LIMIT:]
+        added = self._example_rows(new_moves)
+
+        if not added and not removed and self._model is not None:
+            return
+        for path in removed:
+            del self._examples[path]
+        for path, seq, category, vector in added:
+            self._examples[path] = (seq, category, vector)
+        self.store.update_examples(added, removed)
+        self._rebuild()
+        logger.debug("Category suggestions: %d examples (%d new, %d removed)",
+                    len(self._examples), len(added), len(removed))
+
+    def _example_rows(self, actions):
+        """Feature vectors of moved images: from memory, from the store, or decoded from the destination"""
+        if not actions:
+            return []
+        with self._lock:
+            seen = {action.original_path: self._seen[action.original_path][0]
+                    for action in actions if action.original_path in self._seen}
+        stored = self.store.lookup([action.original_path for action in actions if action.original_path not in seen])
+
+        rows, missing = [], []
+        for action in actions:
+            vector = seen.get(action.original_path)
+            if vector is None and action.original_path in stored:
+                # Moves keep size and mtime, so a stored vector still matches the file at its destination
+                file_size, mtime_ns, stored_vector = stored[action.original_path]
+                try:
+                    stat = os.stat(action.destination_path)
+                    if (stat.st_size, stat.st_mtime_ns) == (file_size, mtime_ns):
+                        vector = stored_vector
+                except OSError:
+                    self._unreadable.add(action.destination_path)
+                    continue
+            if vector is not None:
+                rows.append((action.destination_path, action.seq, action.category, vector))
+            elif os.path.exists(action.destination_path):
+                missing.append(action)
+            else:
+                self._unreadable.add(action.destination_path)
+
+        # Decode the rest in small batches so features are vectorized but memory stays bounded
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for start in range(0, len(missing), 32):
+                    batch = missing[start:start + 32]
+                    loaded = []
+                    for action, result in zip(batch, pool.map(load_example,
+                                                              [action.destination_path for action in batch])):
+                        if result is None:
+                            self._unreadable.add(action.destination_path)
+                        else:
+                            loaded.append((action, result))
+                    if not loaded:
+                        continue
+                    vectors = feature_vectors([image for _, (image, _) in loaded], [fields for _, (_, fields) in loaded])
+                    rows.extend((action.destination_path, action.seq, action.category, vector)
+                                for (action, _), vector in zip(loaded, vectors))
+        return rows
+
+    def _rebuild(self):
+        """Stack the newest examples into the arrays used for nearest-neighbor search"""
+        examples = sorted(self._examples.values(), key=lambda example: example[0])[-MAX_EXAMPLES:]
+        categories = sorted({category for _, category, _ in examples})
+        label_of = {category: label for label, category in enumerate(categories)}
+        vectors = np.stack([vector for _, _, vector in examples]) if examples else np.zeros((0, FEATURE_SIZE), np.float32)
+        labels = np.array([label_of[category] for _, category, _ in examples], dtype=np.int64)
+        with self._lock:
+            version = self._model.version + 1 if self._model is not None else 1
+            self._model = NeighborModel(vectors, labels, categories, version)
+
+    def close(self):
+        """Write pending feature vectors and stop the background thread"""
+        with self._lock:
+            rows, self._unsaved = self._unsaved, []
+        if rows:
+            self.store.store(rows)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Global instance shared by every folder
+feature_store = FeatureStore()
\ No newline at end of file
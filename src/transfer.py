@@ -0,0 +1,160 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Parallel file transfers used for batch moves
+DEFAULT_WORKERS = 4
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+TEMP_SUFFIX = ".sortify-part"
+
+# Errors meaning a kernel copy call does not support this pair of files
+_UNSUPPORTED_COPY = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP}
+
+def temp_path(destination_path):
+    """
+    Hidden name a cross-device copy is written to before it is renamed into place
+    Args:
+        destination_path: Final file path
+    Returns:
+        Temporary path in the same folder
+    """
+    folder, filename = os.path.split(destination_path)
+    return os.path.join(folder, f".{filename}{TEMP_SUFFIX}")
+
+def file_checksum(path):
+    """
+    Checksum of a file's bytes
+    Args:
+        path: File path
+    Returns:
+        Hex blake2b digest
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb") as source:
+        while chunk := source.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def same_contents(first_path, second_path):
+    """
+    Check whether two files hold the same bytes
+    Args:
+        first_path: File path
+        second_path: File path
+    Returns:
+        True if sizes and checksums match
+    """
+    if os.path.getsize(first_path) != os.path.getsize(second_path):
+        return False
+    return file_checksum(first_path) == file_checksum(second_path)
+
+def _copy_file_range(source_fd, destination_fd, size):
+    """Copy inside the kernel with copy_file_range; returns False if unsupported for these files"""
+    copied = 0
+    while copied < size:
+        try:
+            sent = os.copy_file_range(source_fd, destination_fd, min(COPY_CHUNK_SIZE, size - copied))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_COPY:
+                return False
+            raise
+        if sent == 0:
+            if copied == 0:
+                return False  # Nothing copied, the Python fallback can start from scratch
+            raise OSError(errno.EIO, f"Copy stopped after {copied} of {size} bytes")
+        copied += sent
+    return True
+
+def _sendfile(source_fd, destination_fd, size):
+    """Copy inside the kernel with sendfile; returns False if unsupported for these files"""
+    copied = 0
+    while copied < size:
+        try:
+            sent = os.sendfile(destination_fd, source_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED_COPY:
+                return False
+            raise
+        if sent == 0:
+            if copied == 0:
+                return False  # Nothing copied, the Python fallback can start from scratch
+            raise OSError(errno.EIO, f"Copy stopped after {copied} of {size} bytes")
+        copied += sent
+    return True
+
+def copy_file(source_path, destination_path):
+    """
+    Copy a file's bytes and timestamps, without passing the data through Python where the OS allows
+    Args:
+        source_path: File to copy
+        destination_path: New file, created or truncated
+    Returns:
+        Name of the copy method used
+    """
+    with open(source_path, "rb") as source, open(destination_path, "wb") as destination:
+        size = os.fstat(source.fileno()).st_size
+        if hasattr(os, "copy_file_range") and _copy_file_range(source.fileno(), destination.fileno(), size):
+            method = "copy_file_range"
+        elif sys.platform.startswith("linux") and _sendfile(source.fileno(), destination.fileno(), size):
+            method = "sendfile"
+        else:
+            shutil.copyfileobj(source, destination, COPY_CHUNK_SIZE)
+            method = "copyfileobj"
+        destination.flush()
+        os.fsync(destination.fileno())
+    shutil.copystat(source_path, destination_path)
+    return method
+
+def _sync_folder(folder):
+    """Persist a rename in a folder on systems that allow fsync on directories"""
+    if os.name != "posix":
+        return
+    descriptor = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def transfer_file(source_path, destination_path, verify=False):
+    """
+    Move a file: a rename on the same device, an atomic copy and delete across devices
+    Args:
+        source_path: File to move
+        destination_path: Free path to move it to
+        verify: Compare checksums of a cross-device copy before the source is removed
+    Returns:
+        'rename' or the copy method used
+    """
+    try:
+        os.rename(source_path, destination_path)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    # Another filesystem: the destination name only appears once the copy is complete and on disk
+    partial_path = temp_path(destination_path)
+    try:
+        method = copy_file(source_path, partial_path)
+        # Never trade the source for a truncated copy, even without verify
+        if os.path.getsize(partial_path) != os.path.getsize(source_path):
+            raise OSError(errno.EIO, "Copy is shorter than the source", source_path)
+        if verify and file_checksum(source_path) != file_checksum(partial_path):
+            raise OSError(errno.EIO, "Copy does not match the source", source_path)
+        os.replace(partial_path, destination_path)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+    _sync_folder(os.path.dirname(destination_path) or ".")
+
+    os.remove(source_path)
+    logger.debug("Copied %s across devices with %s", source_path, method)
+    return method
\ No newline at end of file
@@ -1,11 +1,93 @@
+import json
+import multiprocessing
 import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def is_valid_folder(folder_path):
+def get_app_dir():
+    """
+    Get the per-user directory for SortifyV1 caches and state, creating it if needed.
+    
+    The location can be overridden with the SORTIFY_HOME environment variable.
+    
+    Returns:
+    str: Absolute path of the application data directory
+    """
+    app_dir = os.environ.get("SORTIFY_HOME") or os.path.join(os.path.expanduser("~"), ".sortify")
+    os.makedirs(app_dir, exist_ok=True)
+    return app_dir
+
+# Supported image extensions grouped by type, shared by every scanner and loader
+COMMON_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+HEIF_EXTENSIONS = ('.heif', '.heic')
+RAW_EXTENSIONS = ('.dng', '.cr2', '.nef', '.arw', '.rw2', '.orf')
+IMAGE_EXTENSIONS = frozenset(COMMON_EXTENSIONS + HEIF_EXTENSIONS + RAW_EXTENSIONS)
+
+def is_supported_image(filename):
+    """
+    Check if a file name has a supported image extension.
+    
+    Parameters:
+    filename (str): File name or path
+    
+    Returns:
+    bool: True if the extension is in IMAGE_EXTENSIONS
+    """
+    return os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+
+def iter_images(folder_path, recursive=False, exclude=()):
+    """
+    Stream supported image files of a folder without listing it up front.
+    
+    Parameters:
+    folder_path (str): Folder to scan
+    recursive (bool): Also scan subfolders
+    exclude (iterable): Names of top-level subfolders to skip when recursing
+    
+    Yields:
+    str: Image path relative to folder_path
+    """
+    exclude = set(exclude)
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(folder_path, relative_dir))
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                # Extension check first: it needs no stat call
+                if is_supported_image(entry.name):
+                    if entry.is_file():
+                        yield relative_path
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    if relative_dir or entry.name not in exclude:
+                        pending.append(relative_path)
+
+def list_subfolders(folder_path):
+    """
+    List the immediate subfolders of a folder.
+    
+    Parameters:
+    folder_path (str): Folder to inspect
+    
+    Returns:
+    list: Subfolder names
+    """
+    with os.scandir(folder_path) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+def is_valid_folder(folder_path, recursive=False):
     """
     Check if the selected folder contains supported image files.
     
     Parameters:
     folder_path (str): Path to the folder to validate
+    recursive (bool): Also look inside subfolders
     
     Returns:
     bool: True if folder contains valid image files, False otherwise
@@ -14,20 +96,103 @@ def is_valid_folder(folder_path):
     if not os.path.isdir(folder_path):
         return False
     
-    # Supported image extensions grouped by type
-    image_extensions = [
-        # Common image formats
-        '.jpg', '.jpeg', '.png', '.gif', '.bmp',
-        # HEIF/HEIC formats
-        '.heif', '.heic',
-        # RAW camera formats
-        '.dng', '.cr2', '.nef', '.arw', '.rw2', '.orf'
-    ]
-    
-    # Check for at least one valid image file in the folder
-    image_files = [f for f in os.listdir(folder_path) 
-                   if os.path.isfile(os.path.join(folder_path, f)) 
-                   and os.path.splitext(f)[1].lower() in image_extensions]
-    
-    # Return True if any valid images found
-    return len(image_files) > 0
\ No newline at end of file
+    # Stop at the first valid image file in the folder
+    return next(iter_images(folder_path, recursive), None) is not None
+
+def relative_to_folder(path, folder_path):
+    """
+    Express a path relative to a folder it may or may not lie in.
+    
+    Parameters:
+    path (str): File path
+    folder_path (str): Folder the path is expected in
+    
+    Returns:
+    str: Relative path, or None if the path lies outside the folder or on another drive
+    """
+    try:
+        relative_path = os.path.relpath(path, folder_path)
+    except ValueError:
+        return None  # Windows cannot relate paths on different drives
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        return None
+    return relative_path
+
+def open_database(db_path, *schema):
+    """
+    Open a SQLite cache shared by worker threads and create its tables.
+    
+    Write-ahead logging keeps readers going during a write, and synchronous=NORMAL
+    skips the fsync of every commit; a power loss can only drop the newest rows.
+    
+    Parameters:
+    db_path (str): SQLite file
+    schema (str): CREATE TABLE and CREATE INDEX statements
+    
+    Returns:
+    sqlite3.Connection: Connection usable from any thread, with access serialized by the caller
+    """
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    for statement in schema:
+        connection.execute(statement)
+    return connection
+
+def process_pool(workers=None):
+    """
+    Create a pool of worker processes for CPU-bound scans.
+    
+    Parameters:
+    workers (int): Number of processes, defaults to the CPU count
+    
+    Returns:
+    ProcessPoolExecutor: Pool whose workers are spawned fresh
+    """
+    # Spawn, not fork: the GUI runs Tk, decode and file operation threads whose locks a fork would copy held
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+class StartupTimer:
+    """Record how long each stage of application startup takes"""
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = []  # (stage name, seconds since the previous mark)
+        self._last = self.start
+
+    def mark(self, stage):
+        """
+        Close the current startup stage.
+        
+        Parameters:
+        stage (str): Name of the stage that just finished
+        """
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def report(self):
+        """
+        Write the stage timings to startup.json in the app directory.
+        
+        The report is also printed when SORTIFY_STARTUP_REPORT is set.
+        
+        Returns:
+        dict: Stage durations and the total, in milliseconds
+        """
+        report = {
+            'stages': {stage: round(seconds * 1000, 1) for stage, seconds in self.stages},
+            'total_ms': round((self._last - self.start) * 1000, 1)
+        }
+        try:
+            with open(os.path.join(get_app_dir(), "startup.json"), "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
+        except OSError:
+            pass
+        if os.environ.get("SORTIFY_STARTUP_REPORT"):
+            for stage, milliseconds in report['stages'].items():
+                print(f"startup {stage}: {milliseconds} ms")
+            print(f"startup total: {report['total_ms']} ms")
+        return report
+
+# Global timer, started when the first application module is imported
+startup_timer = StartupTimer()
\ No newline at end of file
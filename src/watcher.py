@@ -0,0 +1,417 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from utils import is_supported_image
+
+logger = logging.getLogger(__name__)
+
+# A change to the watched folder; paths are relative to it and old_path is only set for renames
+WatchEvent = namedtuple('WatchEvent', ['kind', 'path', 'old_path'])
+ADDED = "added"
+REMOVED = "removed"
+RENAMED = "renamed"
+
+POLL_INTERVAL = 1.0  # Seconds between polls, and how long a new file must stay unchanged before it is reported
+# Coarsest folder mtime resolution in use (FAT on memory cards): folders changed this recently are checked again
+MTIME_GRANULARITY_NS = 2 * 1000 * 1000 * 1000
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+def load_inotify():
+    """
+    Bind the inotify calls of the C library
+    Returns:
+        ctypes library handle, or None where inotify is unavailable
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def entry_identity(entry):
+    """
+    Key of a directory entry that survives a rename, read without an extra stat call
+    Args:
+        entry: os.DirEntry
+    Returns:
+        The inode on POSIX; size and mtime elsewhere, where scandir already has them but no inode
+    """
+    if os.name == "posix":
+        return entry.inode()
+    stat = entry.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+class FolderState:
+    """Last seen contents of one watched folder"""
+    __slots__ = ('mtime_ns', 'files', 'subfolders', 'watch')
+
+    def __init__(self, mtime_ns, files, subfolders):
+        self.mtime_ns = mtime_ns
+        self.files = files            # Image name -> entry_identity
+        self.subfolders = subfolders  # Names of watched subfolders
+        self.watch = None             # inotify watch descriptor
+
+class FolderWatcher:
+    """Report images added to, removed from or renamed in a folder from a background thread"""
+    def __init__(self, folder_path, recursive=False, exclude=(), interval=POLL_INTERVAL, use_inotify=True):
+        """
+        Args:
+            folder_path: Folder to watch
+            recursive: Also watch subfolders
+            exclude: Top-level subfolder names to skip, such as the categories
+            interval: Seconds between polls and before a new file counts as complete
+            use_inotify: Use inotify where available instead of polling
+        """
+        self.folder_path = folder_path
+        self.recursive = recursive
+        self.exclude = set(exclude)
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.events = queue.Queue()  # WatchEvent items, read by the caller
+        self.backend = None          # "inotify" or "polling" once the watch is running
+        self._folders = {}           # Relative folder -> FolderState
+        self._settling = {}          # Relative path -> (size, mtime_ns) of new files that may still be written
+        self._watches = {}           # inotify watch descriptor -> relative folder
+        self._libc = None
+        self._fd = None
+        self._stop = threading.Event()
+
+    def start(self, known=()):
+        """
+        Begin watching in a daemon thread
+        Args:
+            known: Relative paths the caller already has; differences found on the first scan are reported
+        """
+        threading.Thread(target=self._run, args=(set(known),), daemon=True, name="folder-watch").start()
+
+    def stop(self):
+        """Ask the watch thread to exit"""
+        self._stop.set()
+
+    def _run(self, known):
+        """Watch thread body"""
+        try:
+            if self.use_inotify:
+                self._open_inotify()
+            self.backend = "inotify" if self._fd is not None else "polling"
+            self._add_folder("", report=False)
+
+            # Reconcile with the caller's scan: files may have arrived or left before the watch began
+            for relative_dir, state in self._folders.items():
+                for name in state.files:
+                    if os.path.join(relative_dir, name) not in known:
+                        self._settling[os.path.join(relative_dir, name)] = None
+            for relative_path in known:
+                relative_dir, name = os.path.split(relative_path)
+                state = self._folders.get(relative_dir)
+                if state is None or name not in state.files:
+                    self._emit(REMOVED, relative_path)
+            logger.info("Watching %s with %s (%d folders)", self.folder_path, self.backend, len(self._folders))
+
+            if self._fd is not None:
+                self._watch_inotify()
+            self._watch_polling()
+        except Exception as e:
+            logger.error("Folder watch stopped: %s", e)
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _emit(self, kind, relative_path, old_path=None):
+        """Hand an event to the caller"""
+        self.events.put(WatchEvent(kind, relative_path, old_path))
+
+    def _scan(self, relative_dir):
+        """
+        Read one folder
+        Returns:
+            (mtime_ns, image name -> identity, subfolder names)
+        """
+        absolute_dir = os.path.join(self.folder_path, relative_dir)
+        # Stat before listing, so a change during the listing shows up as a new mtime on the next poll
+        mtime_ns = os.stat(absolute_dir).st_mtime_ns
+        files, subfolders = {}, set()
+        with os.scandir(absolute_dir) as entries:
+            for entry in entries:
+                if is_supported_image(entry.name):
+                    if entry.is_file():
+                        files[entry.name] = entry_identity(entry)
+                elif self.recursive and entry.is_dir(follow_symlinks=False):
+                    if relative_dir or entry.name not in self.exclude:
+                        subfolders.add(entry.name)
+        return mtime_ns, files, subfolders
+
+    def _add_folder(self, relative_dir, report=True):
+        """Start watching a folder and its subfolders; with report, their images are announced as new"""
+        watch = None
+        if self._fd is not None:
+            # Watch before listing so nothing created in between is missed
+            try:
+                watch = self._add_watch(relative_dir)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    return
+                self._give_up_inotify(e)
+        try:
+            mtime_ns, files, subfolders = self._scan(relative_dir)
+        except OSError:
+            return
+
+        state = self._folders[relative_dir] = FolderState(mtime_ns, files, subfolders)
+        if watch is not None:
+            state.watch = watch
+            self._watches[watch] = relative_dir
+        if report:
+            for name in files:
+                self._settling[os.path.join(relative_dir, name)] = None
+        for name in subfolders:
+            self._add_folder(os.path.join(relative_dir, name), report)
+
+    def _remove_folder(self, relative_dir):
+        """Stop watching a folder that disappeared and report its images as removed"""
+        state = self._folders.pop(relative_dir, None)
+        if state is None:
+            return
+        for name in state.files:
+            self._remove_file(os.path.join(relative_dir, name))
+        for name in state.subfolders:
+            self._remove_folder(os.path.join(relative_dir, name))
+        if state.watch is not None and self._fd is not None:
+            self._watches.pop(state.watch, None)
+            self._libc.inotify_rm_watch(self._fd, state.watch)  # Fails harmlessly if the kernel dropped it
+
+    def _remove_file(self, relative_path):
+        """Report a removed image unless it was never announced"""
+        if self._settling.pop(relative_path, False) is False:
+            self._emit(REMOVED, relative_path)
+
+    def _rename_file(self, old_path, relative_path):
+        """Report a renamed image; one still being written stays unannounced under its new name"""
+        if self._settling.pop(old_path, False) is False:
+            self._emit(RENAMED, relative_path, old_path)
+        else:
+            self._settling[relative_path] = None
+
+    def _rescan(self, relative_dir, gone, arrived):
+        """
+        Compare a folder with its last listing and report the changed subfolders
+        Args:
+            relative_dir: Folder to list again
+            gone: Identity -> relative path of images that left, filled in for _pair_renames
+            arrived: Identity -> relative path of images that appeared, filled in for _pair_renames
+        """
+        state = self._folders[relative_dir]
+        try:
+            mtime_ns, files, subfolders = self._scan(relative_dir)
+        except OSError:
+            self._remove_folder(relative_dir)
+            return
+
+        for name in state.files.keys() - files.keys():
+            if state.files[name] is None:
+                self._remove_file(os.path.join(relative_dir, name))
+            else:
+                gone[state.files[name]] = os.path.join(relative_dir, name)
+        for name in files.keys() - state.files.keys():
+            arrived[files[name]] = os.path.join(relative_dir, name)
+        state.mtime_ns, state.files = mtime_ns, files
+
+        for name in state.subfolders - subfolders:
+            self._remove_folder(os.path.join(relative_dir, name))
+        for name in subfolders - state.subfolders:
+            self._add_folder(os.path.join(relative_dir, name))
+        state.subfolders = subfolders
+
+    def _pair_renames(self, gone, arrived):
+        """Report a round of rescans, pairing an image that left one name and appeared under another as a rename"""
+        for identity, relative_path in arrived.items():
+            old_path = gone.pop(identity, None)
+            if old_path is not None:
+                self._rename_file(old_path, relative_path)
+            else:
+                self._settling[relative_path] = None
+        for relative_path in gone.values():
+            self._remove_file(relative_path)
+
+    def _settle(self):
+        """Report new files whose size and mtime stayed the same since the last check"""
+        for relative_path, seen in list(self._settling.items()):
+            try:
+                stat = os.stat(os.path.join(self.folder_path, relative_path))
+            except OSError:
+                continue  # Removed: the folder listing drops it
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current == seen:
+                del self._settling[relative_path]
+                self._emit(ADDED, relative_path)
+            else:
+                self._settling[relative_path] = current
+
+    def _watch_polling(self):
+        """Poll folder mtimes and list only the folders that changed"""
+        while not self._stop.wait(self.interval):
+            # Collected over all folders, so a move between two watched folders is paired like one within a folder
+            gone, arrived = {}, {}
+            for relative_dir in list(self._folders):
+                state = self._folders.get(relative_dir)
+                if state is None:
+                    continue  # Removed along with its parent
+                try:
+                    mtime_ns = os.stat(os.path.join(self.folder_path, relative_dir)).st_mtime_ns
+                except OSError:
+                    mtime_ns = None
+                # A second change within the mtime resolution would not move it again, so recent folders are relisted
+                if mtime_ns is None or mtime_ns != state.mtime_ns or time.time_ns() - mtime_ns < MTIME_GRANULARITY_NS:
+                    self._rescan(relative_dir, gone, arrived)
+            self._pair_renames(gone, arrived)
+            self._settle()
+
+    def _open_inotify(self):
+        """Create the inotify descriptor, leaving it None where inotify cannot be used"""
+        self._libc = load_inotify()
+        if self._libc is None:
+            return
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning("inotify unavailable: %s", os.strerror(ctypes.get_errno()))
+            return
+        self._fd = fd
+
+    def _add_watch(self, relative_dir):
+        """Add an inotify watch for a folder"""
+        absolute_dir = os.path.join(self.folder_path, relative_dir)
+        watch = self._libc.inotify_add_watch(self._fd, os.fsencode(absolute_dir), WATCH_MASK)
+        if watch < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), absolute_dir)
+        return watch
+
+    def _give_up_inotify(self, error):
+        """Switch to polling, for instance when the inotify watch limit is reached"""
+        logger.warning("inotify failed (%s), polling %s instead", error, self.folder_path)
+        os.close(self._fd)
+        self._fd = None
+        self._watches.clear()
+        self.backend = "polling"
+        for state in self._folders.values():
+            state.watch = None
+            state.mtime_ns = None  # Relist every folder on the first poll
+
+    def _watch_inotify(self):
+        """Apply inotify events until stopped or inotify has to be given up"""
+        last_settle = time.monotonic()
+        while not self._stop.is_set() and self._fd is not None:
+            readable, _, _ = select.select([self._fd], [], [], self.interval)
+            if readable:
+                try:
+                    data = os.read(self._fd, INOTIFY_BUFFER_SIZE)
+                except BlockingIOError:
+                    data = b""
+                moved = {}  # Cookie -> relative path of images moved away, paired with a later IN_MOVED_TO
+                offset = 0
+                while offset < len(data) and self._fd is not None:
+                    watch, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+                    offset += INOTIFY_EVENT.size
+                    name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                    offset += length
+                    self._handle_event(watch, mask, cookie, name, moved)
+                # Moves without a second half left the watched folders
+                for relative_path in moved.values():
+                    self._remove_file(relative_path)
+
+            if time.monotonic() - last_settle >= self.interval:
+                self._settle()
+                last_settle = time.monotonic()
+
+    def _handle_event(self, watch, mask, cookie, name, moved):
+        """Update the folder state for one inotify event"""
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost: compare every folder with the disk instead
+            gone, arrived = {}, {}
+            for relative_dir in list(self._folders):
+                if relative_dir in self._folders:
+                    self._rescan(relative_dir, gone, arrived)
+            self._pair_renames(gone, arrived)
+            return
+
+        relative_dir = self._watches.get(watch)
+        state = self._folders.get(relative_dir)
+        if state is None or not name:
+            return  # Watch already removed, or an event about the folder itself
+        relative_path = os.path.join(relative_dir, name)
+
+        if mask & IN_ISDIR:
+            if not self.recursive or (not relative_dir and name in self.exclude):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                state.subfolders.add(name)
+                self._add_folder(relative_path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                state.subfolders.discard(name)
+                self._remove_folder(relative_path)
+            return
+
+        if not is_supported_image(name):
+            return
+        if mask & IN_MOVED_FROM:
+            if name in state.files:
+                del state.files[name]
+                moved[cookie] = relative_path
+        elif mask & IN_MOVED_TO:
+            old_path = moved.pop(cookie, None)
+            if name in state.files:
+                # Replaced an image of the same name
+                if old_path is not None:
+                    self._remove_file(old_path)
+                return
+            state.files[name] = self._identity(relative_path)
+            if old_path is not None:
+                self._rename_file(old_path, relative_path)
+            else:
+                self._emit(ADDED, relative_path)  # Moved in whole, nothing left to wait for
+        elif mask & IN_CLOSE_WRITE:
+            if name not in state.files:
+                state.files[name] = self._identity(relative_path)
+                self._emit(ADDED, relative_path)
+            elif self._settling.pop(relative_path, False) is not False:
+                self._emit(ADDED, relative_path)
+        elif mask & IN_DELETE:
+            if name in state.files:
+                del state.files[name]
+                self._remove_file(relative_path)
+
+    def _identity(self, relative_path):
+        """entry_identity of a file by path, None if it is already gone"""
+        try:
+            return os.stat(os.path.join(self.folder_path, relative_path)).st_ino
+        except OSError:
+            return None
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The modules in src import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Keep the shared stores (journal, preview cache) out of the real app directory
+os.environ["SORTIFY_HOME"] = tempfile.mkdtemp(prefix="sortify-test-")
\ No newline at end of file
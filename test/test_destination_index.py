@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from sorter import DestinationIndex
+
+class DestinationIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.index = DestinationIndex()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def touch(self, name):
+        open(os.path.join(self.folder.name, name), "wb").close()
+
+    def reserve(self, filename):
+        return os.path.basename(self.index.reserve(self.folder.name, filename))
+
+    def test_free_name_is_kept(self):
+        self.assertEqual(self.reserve("a.jpg"), "a.jpg")
+
+    def test_taken_name_gets_a_counter(self):
+        self.touch("a.jpg")
+        self.assertEqual(self.reserve("a.jpg"), "a_1.jpg")
+        self.assertEqual(self.reserve("a.jpg"), "a_2.jpg")
+
+    def test_counter_continues_after_highest_in_use(self):
+        self.touch("a.jpg")
+        self.touch("a_7.jpg")
+        self.assertEqual(self.reserve("a.jpg"), "a_8.jpg")
+
+    def test_reservations_do_not_collide_before_files_exist(self):
+        names = [self.reserve("a.jpg") for _ in range(3)]
+        self.assertEqual(names, ["a.jpg", "a_1.jpg", "a_2.jpg"])
+
+    def test_counters_stay_monotonic_after_release(self):
+        self.touch("a.jpg")
+        taken = self.index.reserve(self.folder.name, "a.jpg")
+        self.index.release(taken)
+        self.assertEqual(self.reserve("a.jpg"), "a_2.jpg")
+
+    def test_released_name_can_be_reused(self):
+        self.touch("a.jpg")
+        self.index.reserve(self.folder.name, "b.jpg")
+        self.index.release(os.path.join(self.folder.name, "a.jpg"))
+        os.remove(os.path.join(self.folder.name, "a.jpg"))
+        self.assertEqual(self.reserve("a.jpg"), "a.jpg")
+
+    def test_file_created_behind_the_index_is_not_overwritten(self):
+        self.assertEqual(self.reserve("b.jpg"), "b.jpg")
+        self.touch("a.jpg")  # Appears after the folder was scanned
+        self.assertEqual(self.reserve("a.jpg"), "a_1.jpg")
+
+    def test_extensions_are_counted_separately(self):
+        self.touch("a.jpg")
+        self.touch("a_3.png")
+        self.assertEqual(self.reserve("a.jpg"), "a_1.jpg")
+
+    def test_added_file_takes_its_name(self):
+        self.reserve("b.jpg")  # Scan the folder
+        self.index.add(os.path.join(self.folder.name, "a.jpg"))
+        self.assertEqual(self.reserve("a.jpg"), "a_1.jpg")
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
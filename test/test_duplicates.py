@@ -0,0 +1,68 @@
+import random
+import unittest
+import numpy as np
+from duplicates import DuplicateFinder, hamming_pairs
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+class HammingPairsTest(unittest.TestCase):
+    def test_pairs_within_threshold(self):
+        hashes = np.array([0, 0b111, 0b1111, 0b1111 << 60], dtype=np.uint64)
+        self.assertEqual(sorted(hamming_pairs(hashes, 3, block=2)), [(0, 1), (1, 2)])
+
+class GroupTest(unittest.TestCase):
+    def setUp(self):
+        self.finder = DuplicateFinder("/photos", threshold=6)
+
+    def group(self, perceptual):
+        hashes = {f"{number}.jpg": (None, value) for number, value in enumerate(perceptual)}
+        return [paths for paths, _ in self.finder.group(hashes)]
+
+    def test_threshold_bits_spread_across_bands_are_grouped(self):
+        # One flipped bit in six of the seven bands leaves a single band shared exactly
+        base = 0x0123456789ABCDEF
+        self.assertEqual(self.group([base, flip(base, [0, 10, 20, 30, 40, 50])]), [["0.jpg", "1.jpg"]])
+
+    def test_one_bit_over_the_threshold_is_not_grouped(self):
+        base = 0x0123456789ABCDEF
+        self.assertEqual(self.group([base, flip(base, [0, 10, 20, 30, 40, 50, 60])]), [])
+        self.assertEqual(self.group([base, flip(base, range(7))]), [])
+
+    def test_matches_a_full_comparison(self):
+        generator = random.Random(7)
+        values = []
+        for _ in range(40):
+            base = generator.getrandbits(64)
+            values.append(base)
+            for _ in range(3):
+                values.append(flip(base, generator.sample(range(64), generator.randint(0, 8))))
+
+        parent = list(range(len(values)))
+
+        def find(i):
+            while parent[i] != i:
+                i = parent[i]
+            return i
+
+        for i in range(len(values)):
+            for j in range(i + 1, len(values)):
+                if bin(values[i] ^ values[j]).count("1") <= 6:
+                    parent[find(i)] = find(j)
+        expected = {}
+        for i in range(len(values)):
+            expected.setdefault(find(i), []).append(f"{i}.jpg")
+        expected = sorted(sorted(paths) for paths in expected.values() if len(paths) > 1)
+
+        self.assertEqual(sorted(sorted(paths) for paths in self.group(values)), expected)
+
+    def test_identical_contents_are_exact(self):
+        hashes = {"a.jpg": ("x", 1), "b.jpg": ("x", 1 << 40), "c.jpg": ("y", 1)}
+        self.assertEqual(self.finder.group(hashes), [(["a.jpg", "b.jpg", "c.jpg"], False)])
+        self.assertEqual(self.finder.group({"a.jpg": ("x", None), "b.jpg": ("x", None)}),
+                         [(["a.jpg", "b.jpg"], True)])
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from PIL import Image
+from image_loader import fit_image, load_preview
+
+class FitImageTest(unittest.TestCase):
+    def test_small_image_is_returned_unchanged(self):
+        image = Image.new("RGB", (300, 200))
+        self.assertIs(fit_image(image, (640, 640)), image)
+
+    def test_aspect_ratio_is_kept(self):
+        self.assertEqual(fit_image(Image.new("RGB", (4000, 3000)), (640, 640)).size, (640, 480))
+
+    def test_modes_reduce_cannot_handle(self):
+        for mode in ("P", "1", "I;16"):
+            with self.subTest(mode=mode):
+                self.assertEqual(fit_image(Image.new(mode, (4000, 3000)), (640, 640)).size, (640, 480))
+
+    def test_palette_image_keeps_its_colors(self):
+        image = Image.new("RGB", (2000, 1000), (200, 30, 40)).quantize(16)
+        fitted = fit_image(image, (500, 500))
+        self.assertEqual(fitted.mode, "RGB")
+        self.assertEqual(fitted.getpixel((100, 100)), image.convert("RGB").getpixel((0, 0)))
+
+    def test_palette_transparency_becomes_alpha(self):
+        image = Image.new("P", (2000, 1000))
+        image.info["transparency"] = 0
+        self.assertEqual(fit_image(image, (500, 500)).mode, "RGBA")
+
+class LoadPreviewTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_large_gif(self):
+        path = os.path.join(self.folder.name, "large.gif")
+        Image.new("RGB", (4000, 3000), (10, 120, 200)).quantize(8).save(path)
+        preview = load_preview(path, (640, 640))
+        self.assertEqual(preview.size, (640, 480))
+
+    def test_palette_png(self):
+        path = os.path.join(self.folder.name, "palette.png")
+        Image.new("RGB", (1600, 1600), (10, 120, 200)).quantize(8).save(path)
+        self.assertEqual(load_preview(path, (640, 640)).size, (640, 640))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,187 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+from journal import ActionJournal
+from sorter import ActionTracker
+
+class ActionJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "journal.log")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_records_survive_reopening(self):
+        journal = ActionJournal(self.path)
+        journal.append(["M", 1, "a.jpg", "cats/a.jpg", "cats"])
+        journal.append(["U", 1])
+        journal.close()
+        self.assertEqual(ActionJournal(self.path).read(), [["M", 1, "a.jpg", "cats/a.jpg", "cats"], ["U", 1]])
+
+    def test_torn_tail_is_ignored_and_cut_before_appending(self):
+        journal = ActionJournal(self.path)
+        journal.append(["D", 1, "a.jpg"])
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as torn:
+            torn.write('["D",2,"b.j')  # Crash in the middle of a write
+
+        journal = ActionJournal(self.path)
+        self.assertEqual(journal.read(), [["D", 1, "a.jpg"]])
+        journal.append(["D", 3, "c.jpg"])
+        journal.close()
+        self.assertEqual(ActionJournal(self.path).read(), [["D", 1, "a.jpg"], ["D", 3, "c.jpg"]])
+
+    def test_damaged_record_is_skipped(self):
+        with open(self.path, "w", encoding="utf-8") as damaged:
+            damaged.write('["D",1,"a.jpg"]\n{not json\n["D",2,"b.jpg"]\n')
+        self.assertEqual(ActionJournal(self.path).read(), [["D", 1, "a.jpg"], ["D", 2, "b.jpg"]])
+
+    def test_rewrite_replaces_contents(self):
+        journal = ActionJournal(self.path)
+        for seq in range(1, 4):
+            journal.append(["D", seq, f"{seq}.jpg"])
+        journal.rewrite([["D", 3, "3.jpg"]])
+        journal.append(["D", 4, "4.jpg"])
+        journal.close()
+        self.assertEqual(ActionJournal(self.path).read(), [["D", 3, "3.jpg"], ["D", 4, "4.jpg"]])
+
+    @unittest.skipUnless(hasattr(signal, "SIGKILL"), "needs SIGKILL")
+    def test_records_survive_a_killed_process(self):
+        # The child records moves, then dies before the background fsync or close could run
+        script = (
+            "import os, signal, sys\n"
+            "from sorter import ActionTracker\n"
+            "tracker = ActionTracker(sys.argv[1])\n"
+            "for number in range(5):\n"
+            "    tracker.record_move(f'{number}.jpg', f'cats/{number}.jpg', 'cats')\n"
+            "tracker.begin_move('d.jpg', 'dogs/d.jpg', 'dogs')\n"
+            "os.kill(os.getpid(), signal.SIGKILL)\n"
+        )
+        source_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        subprocess.run([sys.executable, "-c", script, self.path], cwd=source_folder,
+                       env=dict(os.environ, PYTHONPATH=source_folder))
+
+        tracker = ActionTracker(self.path)
+        tracker.load()
+        self.assertEqual(len(tracker.action_history), 5)
+        self.assertEqual([action.original_path for action in tracker.pending_moves()], ["d.jpg"])
+        tracker.close()
+
+class ActionTrackerReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "journal.log")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def reopen(self, tracker, **options):
+        """Close a tracker and load its journal into a new one, as on the next start"""
+        tracker.close()
+        reopened = ActionTracker(self.path, **options)
+        reopened.load()
+        return reopened
+
+    def test_replay_restores_history_and_pending_moves(self):
+        tracker = ActionTracker(self.path)
+        finished = tracker.begin_move("a.jpg", "cats/a.jpg", "cats")
+        tracker.commit_move(finished)
+        failed = tracker.begin_move("b.jpg", "cats/b.jpg", "cats")
+        tracker.abort_move(failed)
+        deleted = tracker.record_delete("c.jpg")
+        interrupted = tracker.begin_move("d.jpg", "dogs/d.jpg", "dogs")
+
+        tracker = self.reopen(tracker)
+        self.assertEqual(tracker.action_history, [finished, deleted])
+        self.assertEqual(tracker.pending_moves(), [interrupted])
+
+        # Sequence numbers keep growing across sessions
+        later = tracker.record_delete("e.jpg")
+        self.assertGreater(later.seq, interrupted.seq)
+        tracker.close()
+
+    def test_batch_id_is_replayed(self):
+        tracker = ActionTracker(self.path)
+        with tracker.batch() as batch_id:
+            first = tracker.record_move("a.jpg", "cats/a.jpg", "cats")
+            second = tracker.record_move("b.jpg", "cats/b.jpg", "cats")
+
+        tracker = self.reopen(tracker)
+        self.assertEqual([action.batch for action in tracker.action_history], [batch_id, batch_id])
+        self.assertEqual(tracker.action_history, [first, second])
+        tracker.close()
+
+    def test_compaction_drops_obsolete_records(self):
+        tracker = ActionTracker(self.path, compact_threshold=10)
+        kept = tracker.record_move("keep.jpg", "cats/keep.jpg", "cats")
+        for number in range(10):
+            tracker.abort_move(tracker.begin_move(f"{number}.jpg", f"cats/{number}.jpg", "cats"))
+        interrupted = tracker.begin_move("d.jpg", "dogs/d.jpg", "dogs")
+        tracker.close()
+        self.assertEqual(len(ActionJournal(self.path).read()), 22)
+
+        # Loading compacts once enough dead records piled up
+        tracker = self.reopen(tracker, compact_threshold=10)
+        self.assertEqual(len(ActionJournal(self.path).read()), 2)
+        self.assertEqual(tracker.action_history, [kept])
+        self.assertEqual(tracker.pending_moves(), [interrupted])
+
+        tracker = self.reopen(tracker)
+        self.assertEqual(tracker.action_history, [kept])
+        self.assertEqual(tracker.pending_moves(), [interrupted])
+        tracker.close()
+
+class RepairInterruptedTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.tracker = ActionTracker(os.path.join(self.folder.name, "journal.log"))
+        os.makedirs(os.path.join(self.folder.name, "cats"))
+
+    def tearDown(self):
+        self.tracker.close()
+        self.folder.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.folder.name, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_finished_rename_is_committed(self):
+        destination = self.write("cats/a.jpg", b"a")
+        action = self.tracker.begin_move(os.path.join(self.folder.name, "a.jpg"), destination, "cats")
+        self.assertEqual(self.tracker.repair_interrupted(), [(action, 'completed')])
+        self.assertEqual(self.tracker.action_history, [action])
+
+    def test_untouched_source_is_moved(self):
+        source = self.write("a.jpg", b"a")
+        destination = os.path.join(self.folder.name, "cats", "a.jpg")
+        action = self.tracker.begin_move(source, destination, "cats")
+        self.assertEqual(self.tracker.repair_interrupted(), [(action, 'replayed')])
+        self.assertFalse(os.path.exists(source))
+        self.assertTrue(os.path.exists(destination))
+
+    def test_finished_copy_removes_the_source(self):
+        source = self.write("a.jpg", b"same bytes")
+        destination = self.write("cats/a.jpg", b"same bytes")
+        action = self.tracker.begin_move(source, destination, "cats")
+        self.assertEqual(self.tracker.repair_interrupted(), [(action, 'completed')])
+        self.assertFalse(os.path.exists(source))
+
+    def test_unrelated_destination_is_left_alone(self):
+        source = self.write("a.jpg", b"the photo being moved")
+        destination = self.write("cats/a.jpg", b"another photo that took the name")
+        action = self.tracker.begin_move(source, destination, "cats")
+        self.assertEqual(self.tracker.repair_interrupted(), [(action, 'aborted')])
+        with open(source, "rb") as file:
+            self.assertEqual(file.read(), b"the photo being moved")
+        with open(destination, "rb") as file:
+            self.assertEqual(file.read(), b"another photo that took the name")
+        self.assertEqual(self.tracker.pending_moves(), [])
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
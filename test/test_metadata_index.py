@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from metadata_index import MetadataIndex, index_record
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.index = MetadataIndex(self.folder.name, os.path.join(self.folder.name, "index.db"))
+        self.index._connect()
+        shots = [("a.jpg", "2024-03-31T23:59:59", "X100V"),
+                 ("b.jpg", "2024-01-05T10:00:00", "EOS R6"),
+                 ("c.jpg", "2024-04-01T00:00:00", "X100V"),
+                 ("d.jpg", "2023-12-31T18:30:00", "X100V")]
+        self.index._write([(path,) + index_record({
+            'file_size': 1, 'mtime_ns': 1, 'capture_time': datetime.fromisoformat(capture_time),
+            'camera': camera, 'lens': None, 'orientation': 1, 'width': 6000, 'height': 4000})
+            for path, capture_time, camera in shots])
+        self.paths = ["a.jpg", "new.jpg", "b.jpg", "c.jpg", "d.jpg"]
+
+    def tearDown(self):
+        self.index.close()
+        self.folder.cleanup()
+
+    def test_no_filter_orders_by_time_with_unindexed_last(self):
+        self.assertEqual(self.index.query(self.paths), (["d.jpg", "b.jpg", "a.jpg", "c.jpg", "new.jpg"], []))
+
+    def test_input_order_is_kept_without_time_order(self):
+        self.assertEqual(self.index.query(self.paths, order_by_time=False),
+                         (["a.jpg", "b.jpg", "c.jpg", "d.jpg", "new.jpg"], []))
+
+    def test_camera(self):
+        self.assertEqual(self.index.query(self.paths, camera="X100V"),
+                         (["d.jpg", "a.jpg", "c.jpg"], ["new.jpg", "b.jpg"]))
+
+    def test_month_range_includes_whole_end_month(self):
+        self.assertEqual(self.index.query(self.paths, start="2024-01", end="2024-03"),
+                         (["b.jpg", "a.jpg"], ["new.jpg", "c.jpg", "d.jpg"]))
+
+    def test_day_prefixes(self):
+        self.assertEqual(self.index.query(self.paths, start="2024-03-31", end="2024-04-01"),
+                         (["a.jpg", "c.jpg"], ["new.jpg", "b.jpg", "d.jpg"]))
+        self.assertEqual(self.index.query(self.paths, end="2023-12-31", camera="X100V"),
+                         (["d.jpg"], ["a.jpg", "new.jpg", "b.jpg", "c.jpg"]))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
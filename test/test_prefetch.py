@@ -0,0 +1,132 @@
+import threading
+import unittest
+from PIL import Image
+from image_loader import fit_image
+from prefetch import ImagePrefetcher, PreviewCache
+
+class PreviewCacheTest(unittest.TestCase):
+    def setUp(self):
+        # Room for three 10x10 RGB images of 300 bytes each
+        self.cache = PreviewCache(max_bytes=900)
+
+    def image(self):
+        return Image.new("RGB", (10, 10))
+
+    def test_least_recently_used_is_evicted_over_the_budget(self):
+        for name in ("a", "b", "c"):
+            self.cache.put((name, (10, 10)), self.image())
+        self.cache.get(("a", (10, 10)))
+        self.cache.put(("d", (10, 10)), self.image())
+        self.assertNotIn(("b", (10, 10)), self.cache)
+        for name in ("a", "c", "d"):
+            self.assertIn((name, (10, 10)), self.cache)
+        self.assertEqual(self.cache._bytes, 900)
+
+    def test_image_larger_than_the_budget_is_not_cached(self):
+        self.cache.put(("a", (10, 10)), self.image())
+        self.cache.put(("huge", (20, 20)), Image.new("RGB", (20, 20)))
+        self.assertNotIn(("huge", (20, 20)), self.cache)
+        self.assertIn(("a", (10, 10)), self.cache)
+
+    def test_replacing_an_entry_counts_it_once(self):
+        self.cache.put(("a", (10, 10)), self.image())
+        self.cache.put(("a", (10, 10)), self.image())
+        self.assertEqual(self.cache._bytes, 300)
+
+    def test_discard_releases_every_size_of_a_file(self):
+        self.cache.put(("a", (10, 10)), self.image())
+        self.cache.put(("a", (10, 10), (5, 5)), Image.new("RGB", (5, 5)))
+        self.cache.put(("b", (10, 10)), self.image())
+        self.cache.discard("a")
+        self.assertEqual(self.cache._bytes, 300)
+        self.cache.put(("c", (10, 10)), self.image())
+        self.cache.put(("d", (10, 10)), self.image())
+        self.assertIn(("b", (10, 10)), self.cache)
+
+class DisplayPrefetchTest(unittest.TestCase):
+    def setUp(self):
+        self.fitted_on = []
+        self.loaded = []
+
+        def loader(path, size):
+            self.loaded.append(path)
+            return Image.new("RGB", size)
+
+        def fitter(image, display_size):
+            self.fitted_on.append(threading.current_thread().name)
+            return fit_image(image, display_size)
+
+        self.prefetcher = ImagePrefetcher(loader, fitter=fitter)
+
+    def tearDown(self):
+        self.prefetcher.shutdown()
+
+    def wait(self):
+        with self.prefetcher._lock:
+            futures = list(self.prefetcher._pending.values())
+        for future in futures:
+            future.result()
+
+    def test_scheduled_display_image_is_fitted_on_a_worker(self):
+        self.prefetcher.schedule(["a.jpg", "b.jpg"], (1280, 1280), (1000, 700))
+        self.wait()
+        image = self.prefetcher.get_display("a.jpg", (1280, 1280), (1000, 700))
+        self.assertEqual(image.size, (700, 700))
+        self.assertTrue(all(name.startswith("prefetch") for name in self.fitted_on))
+
+        # The decoded level stays available for resizes without decoding again
+        self.assertEqual(self.prefetcher.get("a.jpg", (1280, 1280)).size, (1280, 1280))
+        self.assertEqual(sorted(self.loaded), ["a.jpg", "b.jpg"])
+
+    def test_new_display_size_reuses_the_decoded_level(self):
+        self.prefetcher.schedule(["a.jpg"], (1280, 1280), (1000, 700))
+        self.wait()
+        self.prefetcher.schedule(["a.jpg"], (1280, 1280), (800, 600))
+        self.wait()
+        self.assertEqual(self.prefetcher.get_display("a.jpg", (1280, 1280), (800, 600)).size, (600, 600))
+        self.assertEqual(self.loaded, ["a.jpg"])
+
+    def test_unscheduled_display_image_is_prepared_on_demand(self):
+        image = self.prefetcher.get_display("a.jpg", (640, 640), (500, 400))
+        self.assertEqual(image.size, (400, 400))
+        self.assertIs(self.prefetcher.get_display("a.jpg", (640, 640), (500, 400)), image)
+        self.assertEqual(self.loaded, ["a.jpg"])
+
+class FailedDecodeTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def loader(path, size):
+            self.calls.append(path)
+            if path.startswith("broken"):
+                raise OSError("cannot identify image file")
+            return Image.new("RGB", size)
+
+        self.prefetcher = ImagePrefetcher(loader)
+
+    def tearDown(self):
+        self.prefetcher.shutdown()
+
+    def schedule_and_wait(self, paths):
+        self.prefetcher.schedule(paths, (160, 160))
+        with self.prefetcher._lock:
+            futures = list(self.prefetcher._pending.values())
+        for future in futures:
+            future.exception()
+
+    def test_failed_decode_is_not_scheduled_again(self):
+        self.schedule_and_wait(["broken.jpg", "a.jpg"])
+        self.schedule_and_wait(["broken.jpg", "a.jpg"])
+        self.assertEqual(sorted(self.calls), ["a.jpg", "broken.jpg"])
+        self.assertIn(("broken.jpg", (160, 160)), self.prefetcher.failed)
+
+    def test_discard_and_cancel_allow_a_retry(self):
+        self.schedule_and_wait(["broken.jpg"])
+        self.prefetcher.discard("broken.jpg")
+        self.schedule_and_wait(["broken.jpg"])
+        self.prefetcher.cancel()
+        self.schedule_and_wait(["broken.jpg"])
+        self.assertEqual(self.calls, ["broken.jpg"] * 3)
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from PIL import Image
+from preview_store import PreviewStore
+
+class PreviewStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.store = PreviewStore(os.path.join(self.folder.name, "previews.db"))
+        self.paths = []
+        for number in range(3):
+            path = os.path.join(self.folder.name, f"{number}.jpg")
+            Image.new("RGB", (64, 48), (number * 80, 20, 20)).save(path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.store.flush()
+        self.folder.cleanup()
+
+    def decode(self, path, size):
+        image = Image.open(path)
+        image.thumbnail(size)
+        return image
+
+    def test_miss_returns_before_the_preview_is_written(self):
+        written = threading.Event()
+        release = threading.Event()
+        store = self.store._store
+
+        def slow_store(*args):
+            release.wait(5)
+            store(*args)
+            written.set()
+
+        with mock.patch.object(self.store, "_store", slow_store):
+            image = self.store.load(self.paths[0], (32, 32), self.decode)
+            self.assertEqual(image.size, (32, 24))
+            self.assertFalse(written.is_set())
+            release.set()
+            self.store.flush()
+        self.assertTrue(written.is_set())
+        self.assertIsNotNone(self.store.get(self.paths[0], (32, 32)))
+
+    def test_stored_preview_is_served_without_decoding(self):
+        self.store.load(self.paths[0], (32, 32), self.decode)
+        self.store.flush()
+        loader = mock.Mock(side_effect=self.decode)
+        self.assertEqual(self.store.load(self.paths[0], (32, 32), loader).size, (32, 24))
+        loader.assert_not_called()
+
+    def test_changed_source_is_decoded_again(self):
+        self.store.load(self.paths[0], (32, 32), self.decode)
+        self.store.flush()
+        Image.new("RGB", (64, 64)).save(self.paths[0])
+        os.utime(self.paths[0], ns=(1, 1))
+        self.assertIsNone(self.store.get(self.paths[0], (32, 32)))
+
+    def test_variants_are_separate(self):
+        self.store.put(self.paths[0], (32, 32), Image.new("RGB", (32, 24)), variant="half")
+        self.assertIsNone(self.store.get(self.paths[0], (32, 32), variant="full"))
+        self.assertIsNotNone(self.store.get(self.paths[0], (32, 32), variant="half"))
+
+    def test_eviction_stops_under_the_limit(self):
+        for path in self.paths:
+            self.store.put(path, (64, 64), Image.open(path))
+        self.store.max_bytes = self.store._bytes - 1
+        self.store.put(self.paths[0], (32, 32), Image.new("RGB", (32, 24)))
+        count = self.store._connect().execute("SELECT COUNT(*) FROM previews").fetchone()[0]
+        self.assertEqual(count, 3)
+        self.assertLessEqual(self.store._bytes, self.store.max_bytes)
+
+    def test_relocate_waits_for_queued_writes(self):
+        self.store.load(self.paths[0], (32, 32), self.decode)
+        moved = os.path.join(self.folder.name, "moved.jpg")
+        os.rename(self.paths[0], moved)
+        self.store.relocate(self.paths[0], moved)
+        self.assertIsNotNone(self.store.get(moved, (32, 32)))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+import transfer
+from transfer import same_contents, temp_path, transfer_file
+
+def cross_device_rename(source_path, destination_path):
+    """Stand-in for os.rename between two filesystems"""
+    raise OSError(errno.EXDEV, "Invalid cross-device link", source_path)
+
+class TransferFileTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.folder.name, "a.jpg")
+        self.destination = os.path.join(self.folder.name, "cats", "a.jpg")
+        os.makedirs(os.path.dirname(self.destination))
+        self.data = os.urandom(256 * 1024)
+        with open(self.source, "wb") as source:
+            source.write(self.data)
+        os.utime(self.source, ns=(1_500_000_000_000_000_000, 1_500_000_000_000_000_000))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def assertMoved(self):
+        self.assertFalse(os.path.exists(self.source))
+        with open(self.destination, "rb") as destination:
+            self.assertEqual(destination.read(), self.data)
+        self.assertFalse(os.path.exists(temp_path(self.destination)))
+
+    def test_same_device_renames(self):
+        self.assertEqual(transfer_file(self.source, self.destination), "rename")
+        self.assertMoved()
+
+    def test_cross_device_copies_then_removes_the_source(self):
+        with mock.patch("transfer.os.rename", cross_device_rename):
+            method = transfer_file(self.source, self.destination)
+        self.assertIn(method, ("copy_file_range", "sendfile", "copyfileobj"))
+        self.assertMoved()
+        self.assertEqual(os.stat(self.destination).st_mtime_ns, 1_500_000_000_000_000_000)
+
+    def test_cross_device_with_verify(self):
+        with mock.patch("transfer.os.rename", cross_device_rename):
+            transfer_file(self.source, self.destination, verify=True)
+        self.assertMoved()
+
+    @unittest.skipUnless(os.path.isdir("/dev/shm") and os.stat("/dev/shm").st_dev != os.stat(tempfile.gettempdir()).st_dev,
+                         "needs a second filesystem")
+    def test_real_cross_device_move(self):
+        with tempfile.TemporaryDirectory(dir="/dev/shm") as other_device:
+            destination = os.path.join(other_device, "a.jpg")
+            self.assertNotEqual(transfer_file(self.source, destination, verify=True), "rename")
+            self.assertFalse(os.path.exists(self.source))
+            with open(destination, "rb") as moved:
+                self.assertEqual(moved.read(), self.data)
+
+    def test_failed_verification_keeps_the_source(self):
+        checksums = iter(["source", "damaged copy"])
+        with mock.patch("transfer.os.rename", cross_device_rename), \
+                mock.patch("transfer.file_checksum", lambda path: next(checksums)):
+            with self.assertRaises(OSError) as raised:
+                transfer_file(self.source, self.destination, verify=True)
+        self.assertEqual(raised.exception.errno, errno.EIO)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertFalse(os.path.exists(self.destination))
+        self.assertFalse(os.path.exists(temp_path(self.destination)))
+
+    def test_interrupted_copy_leaves_no_partial_file(self):
+        def failing_copy(source_path, destination_path):
+            with open(destination_path, "wb") as partial:
+                partial.write(b"half")
+            raise OSError(errno.ENOSPC, "No space left on device")
+
+        with mock.patch("transfer.os.rename", cross_device_rename), mock.patch("transfer.copy_file", failing_copy):
+            with self.assertRaises(OSError):
+                transfer_file(self.source, self.destination)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertFalse(os.path.exists(self.destination))
+        self.assertFalse(os.path.exists(temp_path(self.destination)))
+
+    @unittest.skipUnless(hasattr(os, "copy_file_range"), "needs copy_file_range")
+    def test_kernel_copy_that_copies_nothing_falls_back(self):
+        copy = os.path.join(self.folder.name, "copy.jpg")
+        with mock.patch("transfer.os.copy_file_range", return_value=0):
+            self.assertNotEqual(transfer.copy_file(self.source, copy), "copy_file_range")
+        self.assertTrue(same_contents(self.source, copy))
+
+    @unittest.skipUnless(hasattr(os, "copy_file_range"), "needs copy_file_range")
+    def test_short_kernel_copy_keeps_the_source(self):
+        with mock.patch("transfer.os.rename", cross_device_rename), \
+                mock.patch("transfer.os.copy_file_range", side_effect=[1024, 0]):
+            with self.assertRaises(OSError) as raised:
+                transfer_file(self.source, self.destination)
+        self.assertEqual(raised.exception.errno, errno.EIO)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertFalse(os.path.exists(self.destination))
+        self.assertFalse(os.path.exists(temp_path(self.destination)))
+
+    def test_truncated_copy_keeps_the_source(self):
+        def truncating_copy(source_path, destination_path):
+            with open(destination_path, "wb") as partial:
+                partial.write(self.data[:1000])
+            return "copyfileobj"
+
+        with mock.patch("transfer.os.rename", cross_device_rename), mock.patch("transfer.copy_file", truncating_copy):
+            with self.assertRaises(OSError):
+                transfer_file(self.source, self.destination)
+        self.assertTrue(os.path.exists(self.source))
+        self.assertFalse(os.path.exists(self.destination))
+
+    def test_other_rename_errors_are_raised(self):
+        with self.assertRaises(FileNotFoundError):
+            transfer_file(self.source + ".missing", self.destination)
+
+    def test_copy_file_falls_back_to_a_python_copy(self):
+        copy = os.path.join(self.folder.name, "copy.jpg")
+        with mock.patch.object(transfer, "_copy_file_range", return_value=False), \
+                mock.patch.object(transfer, "_sendfile", return_value=False):
+            self.assertEqual(transfer.copy_file(self.source, copy), "copyfileobj")
+        self.assertTrue(same_contents(self.source, copy))
+
+class SameContentsTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.folder.name, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_equal_and_different_files(self):
+        self.assertTrue(same_contents(self.write("a", b"abc"), self.write("b", b"abc")))
+        self.assertFalse(same_contents(self.write("c", b"abc"), self.write("d", b"abd")))
+        self.assertFalse(same_contents(self.write("e", b"abc"), self.write("f", b"abcd")))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from journal import ActionJournal
+from sorter import ActionTracker
+
+class BatchUndoTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.folder.name, "journal.log")
+        os.makedirs(os.path.join(self.folder.name, "cats"))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def record_moved_batch(self, tracker, count):
+        """Create files that were moved into cats as one batch"""
+        originals = []
+        with tracker.batch():
+            for number in range(count):
+                original = os.path.join(self.folder.name, f"{number}.jpg")
+                destination = os.path.join(self.folder.name, "cats", f"{number}.jpg")
+                open(destination, "wb").close()
+                tracker.record_move(original, destination, "cats")
+                originals.append(original)
+        return originals
+
+    def test_batch_larger_than_memory_is_undone_once(self):
+        tracker = ActionTracker(self.journal_path, max_in_memory=2)
+        tracker.record_delete(os.path.join(self.folder.name, "older.jpg"))
+        originals = self.record_moved_batch(tracker, 4)
+
+        with self.assertNoLogs("sorter", level="ERROR"):
+            result = tracker.undo_last_action()
+        self.assertEqual(result['type'], 'batch')
+        self.assertEqual(len(result['actions']), 4)
+        self.assertTrue(all(os.path.exists(original) for original in originals))
+
+        tracker.close()
+        undo_records = [record for record in ActionJournal(self.journal_path).read() if record[0] == "U"]
+        self.assertEqual(len(undo_records), len({record[1] for record in undo_records}))
+        self.assertEqual(len(undo_records), 4)
+
+        # The action before the batch is the next one to undo
+        tracker = ActionTracker(self.journal_path, max_in_memory=2)
+        tracker.load()
+        self.assertEqual([action.type for action in tracker.action_history], ['delete'])
+        tracker.close()
+
+    def test_batch_after_restart_is_undone_once(self):
+        tracker = ActionTracker(self.journal_path)
+        originals = self.record_moved_batch(tracker, 5)
+        tracker.close()
+
+        tracker = ActionTracker(self.journal_path, max_in_memory=2)
+        result = tracker.undo_last_action()
+        self.assertEqual(len(result['actions']), 5)
+        self.assertTrue(all(os.path.exists(original) for original in originals))
+        self.assertIsNone(tracker.undo_last_action())
+        tracker.close()
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
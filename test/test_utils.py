@@ -0,0 +1,26 @@
+import os
+import unittest
+from unittest import mock
+from utils import relative_to_folder
+
+class RelativeToFolderTest(unittest.TestCase):
+    def test_inside_folder(self):
+        folder = os.path.join(os.sep, "photos")
+        self.assertEqual(relative_to_folder(os.path.join(folder, "trip", "a.jpg"), folder),
+                         os.path.join("trip", "a.jpg"))
+
+    def test_outside_folder(self):
+        folder = os.path.join(os.sep, "photos")
+        self.assertIsNone(relative_to_folder(os.path.join(os.sep, "other", "a.jpg"), folder))
+
+    def test_name_starting_with_dots_is_inside(self):
+        folder = os.path.join(os.sep, "photos")
+        self.assertEqual(relative_to_folder(os.path.join(folder, "..a.jpg"), folder), "..a.jpg")
+
+    def test_other_drive(self):
+        # os.path.relpath raises ValueError for paths on different Windows drives
+        with mock.patch("utils.os.path.relpath", side_effect=ValueError("path is on mount 'D:'")):
+            self.assertIsNone(relative_to_folder("D:\\photos\\a.jpg", "C:\\sorted"))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
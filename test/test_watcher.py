@@ -0,0 +1,84 @@
+import os
+import queue
+import tempfile
+import time
+import unittest
+from watcher import ADDED, REMOVED, RENAMED, FolderWatcher, WatchEvent, load_inotify
+
+class PollingRenameTest(unittest.TestCase):
+    use_inotify = False
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path("a.jpg")
+        self.watcher = FolderWatcher(self.folder.name, recursive=True, interval=0.05, use_inotify=self.use_inotify)
+        self.watcher.start(known=["a.jpg"])
+        deadline = time.monotonic() + 5
+        while "" not in self.watcher._folders and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.folder.cleanup()
+
+    def path(self, relative_path, create=True):
+        path = os.path.join(self.folder.name, relative_path)
+        if create:
+            with open(path, "wb") as image:
+                image.write(b"jpeg")
+        return path
+
+    def events(self, count):
+        """Wait for a number of events, then make sure no more follow"""
+        events = [self.watcher.events.get(timeout=5) for _ in range(count)]
+        with self.assertRaises(queue.Empty):
+            self.watcher.events.get(timeout=0.3)
+        return events
+
+    def test_rename_is_one_event(self):
+        os.rename(self.path("a.jpg", create=False), self.path("b.jpg", create=False))
+        self.assertEqual(self.events(1), [WatchEvent(RENAMED, "b.jpg", "a.jpg")])
+
+    def test_rename_into_a_subfolder(self):
+        os.mkdir(self.path("trip", create=False))
+        time.sleep(0.3)  # Let the watch pick up the new folder
+        os.rename(self.path("a.jpg", create=False), self.path(os.path.join("trip", "a.jpg"), create=False))
+        self.assertEqual(self.events(1), [WatchEvent(RENAMED, os.path.join("trip", "a.jpg"), "a.jpg")])
+
+    def test_move_out_of_the_folder_is_a_removal(self):
+        with tempfile.TemporaryDirectory() as other:
+            os.rename(self.path("a.jpg", create=False), os.path.join(other, "a.jpg"))
+            self.assertEqual(self.events(1), [WatchEvent(REMOVED, "a.jpg", None)])
+
+    def test_new_file_renamed_before_it_settles_is_added_once(self):
+        self.path("new.tmp.jpg")
+        os.rename(self.path("new.tmp.jpg", create=False), self.path("new.jpg", create=False))
+        self.assertEqual(self.events(1), [WatchEvent(ADDED, "new.jpg", None)])
+
+    def test_renames_in_two_folders_at_once(self):
+        os.mkdir(self.path("trip", create=False))
+        self.path(os.path.join("trip", "b.jpg"))
+        time.sleep(0.3)
+        self.events(1)
+        os.rename(self.path("a.jpg", create=False), self.path("c.jpg", create=False))
+        os.rename(self.path(os.path.join("trip", "b.jpg"), create=False), self.path("b.jpg", create=False))
+        self.assertCountEqual(self.events(2), [WatchEvent(RENAMED, "c.jpg", "a.jpg"),
+                                               WatchEvent(RENAMED, "b.jpg", os.path.join("trip", "b.jpg"))])
+
+@unittest.skipIf(load_inotify() is None, "inotify is not available")
+class InotifyRenameTest(PollingRenameTest):
+    use_inotify = True
+
+    def setUp(self):
+        super().setUp()
+        self.assertEqual(self.watcher.backend, "inotify")
+
+    def test_new_file_renamed_before_it_settles_is_added_once(self):
+        # Closing the written file already completes it, so the rename is reported as such
+        self.path("new.tmp.jpg")
+        os.rename(self.path("new.tmp.jpg", create=False), self.path("new.jpg", create=False))
+        self.assertEqual(self.events(2), [WatchEvent(ADDED, "new.tmp.jpg", None),
+                                          WatchEvent(RENAMED, "new.jpg", "new.tmp.jpg")])
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file